@@ -6,6 +6,7 @@ Modular architecture with optional features:
 - Tower Detection (ML-based princess tower detection)
 """
 
+import argparse
 import cv2
 import sys
 import os
@@ -13,12 +14,18 @@ import time
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.capture import WindowCapture
-from src.vision import GridOverlay
-from src.events import GameEvents, apply_event_to_overlay
-from src.config import ENABLE_TOWER_DETECTION, ENABLE_GRID_OVERLAY, ENABLE_ELIXIR_TRACKING
+from src.frame_sources import create_frame_source, frame_timestamp
+from src.config import ENABLE_TOWER_DETECTION, ENABLE_GRID_OVERLAY, ENABLE_ELIXIR_TRACKING, FRAME_SOURCE
+from src.config import ELIXIR_BAR_ROI
+from src.config import ENABLE_THREADED_PIPELINE, PIPELINE_QUEUE_SIZE
+from src.config import ENABLE_PROFILER, PROFILER_DUMP_FILE
 from src.elixir_tracker_module import ElixirDisplay
 from src.settings_window import SettingsWindow
+from src.pipeline import OverlayPipeline
+from src.profiler import Profiler
+from src.clock import FrameClock
+from src.recorder import MatchRecorder
+from src.systems import OverlaySystems, analyze_frame, render_frame
 
 # Conditional imports
 try:
@@ -29,51 +36,212 @@ except Exception as e:
     TOWER_DETECTION_AVAILABLE = False
 
 
-def initialize_systems(frame_width, frame_height, settings):
-    """Initialize enabled subsystems based on settings window state"""
-    systems = {
-        'grid': None,
-        'events': None,
-        'elixir': None,
-        'towers': None,
-    }
-    
-    # Always initialize grid (opacity controls visibility)
-    systems['grid'] = GridOverlay(frame_width, frame_height)
-    systems['events'] = GameEvents()
-    
-    if settings.is_elixir_enabled():
-        systems['elixir'] = ElixirDisplay()
-    
-    if settings.is_towers_enabled() and TOWER_DETECTION_AVAILABLE:
-        try:
-            systems['towers'] = TowerDisplay(frame_width, frame_height)
-        except Exception as e:
-            print(f"[ERROR] Tower detection failed: {e}")
-            import traceback
-            traceback.print_exc()
-            systems['towers'] = None
+def create_tower_display(frame_width, frame_height, clock=None):
+    """Create the tower detection subsystem (None if unavailable)"""
+    if not TOWER_DETECTION_AVAILABLE:
+        return None
+    try:
+        return TowerDisplay(frame_width, frame_height, clock)
+    except Exception as e:
+        print(f"[ERROR] Tower detection failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def initialize_systems(frame_width, frame_height, settings, profiler=None, clock=None):
+    """Create the overlay subsystems and enable them per the settings window state
     
+    Args:
+        clock: Clock for elixir regeneration and tower timeouts (defaults to the wall clock)
+    """
+    systems = OverlaySystems(frame_width, frame_height, {
+        'elixir': lambda: ElixirDisplay(clock),
+        'towers': lambda: create_tower_display(frame_width, frame_height, clock),
+    }, profiler=profiler)
+    systems.configure(**read_settings(settings))
     return systems
 
 
+def read_settings(settings):
+    """Snapshot of the settings window state, as OverlaySystems.configure() arguments"""
+    return {
+        'grid_opacity': settings.get_grid_opacity(),
+        'elixir': settings.is_elixir_enabled(),
+        'towers': settings.is_towers_enabled(),
+        'profiler_hud': settings.is_profiler_hud_enabled()
+    }
+
+
+def close_systems(systems):
+    """Release resources held by subsystems (detector worker pools, sessions)"""
+    systems.close()
+
+
 def print_grid_info(grid):
     """Print grid configuration information"""
     pass
 
 
-def main():
+def recording_data(systems):
+    """Side-channel data stored next to each recorded frame (elixir, tower states, detections)"""
+    data = {}
+    elixir = systems.get('elixir')
+    if elixir:
+        data['elixir'] = {'count': elixir.last_elixir, 'estimate': elixir.last_estimate}
+    towers = systems.get('towers')
+    if towers:
+        data['towers'] = towers.get_tower_states()
+        data['detections'] = list(towers.detections_cache)
+        data['detections_frame'] = towers.detections_frame_id
+    return data
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Clash Royale Overlay")
+    parser.add_argument('--source', action='append',
+                        help="Frame source: window[:<n>], video:<path>, images:<dir>, recording:<path> or "
+                             "synthetic[:<count>]; repeat to track several games (default: FRAME_SOURCE)")
+    parser.add_argument('--instances', type=int, default=0,
+                        help="Track this many emulator windows at once (see src/instances.py)")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Pace file-backed sources to their frame rate instead of full speed")
+    parser.add_argument('--loop', action='store_true',
+                        help="Loop file-backed sources when they end")
+    parser.add_argument('--threaded', action='store_true', default=ENABLE_THREADED_PIPELINE,
+                        help="Run capture and analysis on worker threads (see src/pipeline.py)")
+    parser.add_argument('--multiprocess', action='store_true',
+                        help="Run capture, each analysis subsystem and rendering in separate processes "
+                             "(see src/multiprocess_runtime.py)")
+    parser.add_argument('--profile', action='store_true', default=ENABLE_PROFILER,
+                        help="Time each pipeline stage (latency HUD toggle in the settings window)")
+    parser.add_argument('--profile-dump', default=PROFILER_DUMP_FILE,
+                        help="Periodically write stage latencies to this .json or .csv file")
+    parser.add_argument('--record', metavar='PATH',
+                        help="Record analyzed frames with elixir/tower data to this file (see src/recorder.py)")
+    parser.add_argument('--elixir-only', action='store_true',
+                        help="Capture only the elixir bar region and print elixir changes (no overlay window)")
+    args = parser.parse_args(argv)
+    args.sources = args.source or [FRAME_SOURCE]
+    args.source = args.sources[0]
+    return args
+
+
+def run_elixir_only(args):
+    """Headless elixir reader: grabs only ELIXIR_BAR_ROI (ROI capture) and prints changes"""
+    if args.threaded or args.profile or args.record or args.multiprocess:
+        print("[WARNING] --threaded, --profile, --record and --multiprocess are ignored with --elixir-only")
+    
+    cap = create_frame_source(args.source, realtime=args.realtime, loop=args.loop)
+    while not cap.is_ready():
+        time.sleep(1)
+    
+    elixir = ElixirDisplay()
+    regions = {'elixir': ELIXIR_BAR_ROI}
+    last = None
+    print("Reading elixir (Ctrl+C to stop)...")
+    try:
+        while True:
+            captured = cap.get_regions(regions)
+            if captured is None:
+                if cap.exhausted:
+                    print("Frame source finished")
+                    break
+                continue
+            elixir.read_region(captured['elixir'])
+            if elixir.last_elixir != last:
+                last = elixir.last_elixir
+                print(f"E = {last} ({elixir.last_estimate:.1f})")
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        cap.close()
+        print("Done!")
+
+
+def run_instances(args):
+    """Track several games at once: one overlay window per instance, one settings window"""
+    from src.instances import InstanceManager
+    
+    if args.threaded or args.profile or args.record or args.multiprocess:
+        print("[WARNING] --threaded, --profile, --record and --multiprocess are ignored with several instances")
+    
+    settings = SettingsWindow()
+    if args.instances:
+        manager = InstanceManager.discover(limit=args.instances)
+    else:
+        manager = InstanceManager.from_specs(args.sources, realtime=args.realtime, loop=args.loop)
+    if not manager.instances:
+        print("Error: No game instances found")
+        settings.close()
+        return
+    print(f"Tracking {len(manager.instances)} instances: {', '.join(i.name for i in manager.instances)}")
+    
+    last_state = read_settings(settings)
+    try:
+        while True:
+            settings.update_window()
+            current_state = read_settings(settings)
+            if current_state != last_state:
+                manager.configure(**current_state)
+                last_state = current_state
+            
+            frames = manager.step(current_state)
+            for name, display_frame in frames.items():
+                if display_frame is not None:
+                    cv2.imshow(f"Clash Royale Overlay - {name}", display_frame)
+            key = cv2.waitKey(1) & 0xFF
+            
+            if manager.finished:
+                print("Frame sources finished")
+                break
+            if key == ord('q'):
+                print("Quitting...")
+                break
+    
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        for name, state in manager.get_states().items():
+            print(f"{name}: {state}")
+        manager.close()
+        try:
+            settings.close()
+        except:
+            pass
+        cv2.destroyAllWindows()
+        print("Done!")
+
+
+def main(argv=None):
     """Main application loop with settings window"""
+    args = parse_args(argv)
+    
+    if args.instances or len(args.sources) > 1:
+        return run_instances(args)
+    
+    if args.elixir_only:
+        return run_elixir_only(args)
+    
+    if args.multiprocess:
+        # Imported lazily: the runtime pulls in tower detection for its worker processes
+        from src.multiprocess_runtime import MultiProcessRuntime
+        if args.threaded or args.profile or args.record:
+            print("[WARNING] --threaded, --profile and --record are ignored with --multiprocess")
+        return MultiProcessRuntime(args.source, realtime=args.realtime, loop=args.loop).run()
+    
+    # Per-stage latency profiler (no-op unless --profile)
+    profiler = Profiler(enabled=args.profile, dump_path=args.profile_dump)
+    stage_profiler = profiler if profiler.enabled else None
     
     # Initialize settings window (non-blocking)
-    settings = SettingsWindow()
+    settings = SettingsWindow(show_profiler=profiler.enabled)
     
-    # Find and connect to game window
-    cap = WindowCapture()
-    while not cap.hwnd:
-        cap.find_window()
-        if not cap.hwnd:
-            time.sleep(1)
+    # Open the frame source (waits for the game window when capturing live)
+    cap = create_frame_source(args.source, realtime=args.realtime, loop=args.loop)
+    while not cap.is_ready():
+        time.sleep(1)
     
     # Get initial frame
     screenshot = cap.get_screenshot()
@@ -83,64 +251,87 @@ def main():
     
     frame_h, frame_w = screenshot.shape[:2]
     
-    # Initialize all systems
-    systems = initialize_systems(frame_w, frame_h, settings)
+    # Time advances with capture timestamps (wall time live, media time on replays),
+    # so recordings can be processed at any speed with the same results
+    clock = FrameClock()
+    clock.set(frame_timestamp(cap))
+    
+    # Initialize all systems (reconfigured in place when settings change)
+    systems = initialize_systems(frame_w, frame_h, settings, stage_profiler, clock)
+    
+    # Match recorder: encoding and file I/O run on its own thread
+    # File sources wait for the writer instead of dropping frames; live capture never waits
+    recorder = MatchRecorder(args.record, block=not cap.live) if args.record else None
+    
+    def analyze_and_record(frame, timestamp):
+        analyze_frame(systems, frame, profiler, timestamp)
+        if recorder:
+            recorder.write(frame, timestamp, recording_data(systems))
+    
+    pipeline = None
+    if args.threaded:
+        pipeline = OverlayPipeline(
+            cap,
+            lambda packet: analyze_and_record(packet.frame, packet.timestamp),
+            queue_size=PIPELINE_QUEUE_SIZE,
+            profiler=stage_profiler
+        )
+        pipeline.start()
     
     frame_count = 0
-    last_state = {
-        'grid_opacity': settings.get_grid_opacity(),
-        'elixir': settings.is_elixir_enabled(),
-        'towers': settings.is_towers_enabled()
-    }
+    last_state = read_settings(settings)
     
     try:
         while True:
+            frame_start = time.perf_counter()
+            
             # Update settings window
             settings.update_window()
             
             # Check if feature states have changed
-            current_state = {
-                'grid_opacity': settings.get_grid_opacity(),
-                'elixir': settings.is_elixir_enabled(),
-                'towers': settings.is_towers_enabled()
-            }
+            current_state = read_settings(settings)
             
             if current_state != last_state:
-                systems = initialize_systems(frame_w, frame_h, settings)
-                last_state = current_state.copy()
+                # Opacity is a float on the grid layer; toggles keep subsystem state
+                systems.configure(**current_state)
+                last_state = current_state
             
-            screenshot = cap.get_screenshot()
-            if screenshot is None:
-                continue
+            if pipeline:
+                # Newest captured frame; analysis runs independently on its own thread
+                packet = pipeline.get_frame(timeout=0.05)
+                if packet is None:
+                    if pipeline.finished:
+                        print("Frame source finished")
+                        break
+                    continue
+                screenshot = packet.frame
+                clock.set(packet.timestamp)
+            else:
+                with profiler.stage('capture'):
+                    screenshot = cap.get_screenshot()
+                if screenshot is None:
+                    if cap.exhausted:
+                        print("Frame source finished")
+                        break
+                    continue
+                timestamp = clock.set(frame_timestamp(cap))
+                analyze_and_record(screenshot, timestamp)
             
-            display_frame = screenshot.copy()
+            display_frame = render_frame(systems, screenshot, profiler)
             
-            # Apply grid overlay with opacity
-            if systems['grid']:
-                apply_event_to_overlay(systems['grid'], systems['events'])
-                grid_frame = systems['grid'].draw_overlay(display_frame.copy())
-                opacity = settings.get_grid_opacity()
-                # Blend grid frame with original based on opacity (100% = fully opaque grid)
-                display_frame = cv2.addWeighted(grid_frame, opacity, display_frame, 1 - opacity, 0)
-            
-            # Apply tower detection
-            if systems['towers']:
-                systems['towers'].update()
-                display_frame, _ = systems['towers'].process_frame(display_frame)
-            
-            # Apply elixir tracking
-            if systems['elixir']:
-                systems['elixir'].update()
-                display_frame, elixir = systems['elixir'].render(display_frame, screenshot)
-            
-            # Display frame
-            cv2.imshow("Clash Royale Overlay", display_frame)
+            # Display frame and handle keyboard input (quit only, event triggers currently unassigned)
+            with profiler.stage('display'):
+                cv2.imshow("Clash Royale Overlay", display_frame)
+                key = cv2.waitKey(1) & 0xFF
             
             # Frame counter and logging
             frame_count += 1
+            if profiler.enabled:
+                profiler.record('frame', time.perf_counter() - frame_start)
+                if frame_count % 30 == 0:
+                    settings.set_profiler_lines(profiler.format_lines())
+                profiler.maybe_dump()
             
-            # Handle keyboard input (quit only, event triggers currently unassigned)
-            key = cv2.waitKey(1) & 0xFF
             if key == ord('q'):
                 print("Quitting...")
                 break
@@ -152,10 +343,19 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        if pipeline:
+            pipeline.stop()
+        if profiler.enabled and profiler.dump_path:
+            profiler.dump(profiler.dump_path)
+        if recorder:
+            recorder.close()
+            print(f"Recording saved to {args.record}: {recorder.get_stats()}")
+        close_systems(systems)
         try:
             settings.close()
         except:
             pass
+        cap.close()
         cv2.destroyAllWindows()
         print("Done!")
 
@@ -3,7 +3,10 @@ import numpy as np
 import mss
 import win32gui
 import ctypes
-from .config import WINDOW_NAME_PATTERNS, RESIZE_WIDTH, RESIZE_HEIGHT
+import threading
+import time
+from .config import WINDOW_NAME_PATTERNS, RESIZE_WIDTH, RESIZE_HEIGHT, GEOMETRY_CHECK_INTERVAL
+from .frame_sources import FrameSource
 
 # 1. High DPI Fix
 try:
@@ -17,62 +20,130 @@ except Exception:
     except Exception:
         pass
 
-class WindowCapture:
-    def __init__(self):
+def find_windows(patterns=WINDOW_NAME_PATTERNS):
+    """
+    List every visible window whose title matches one of the patterns.
+
+    Returns:
+        List of (hwnd, title) sorted by title then handle, so the order does not
+        change when another window is focused (EnumWindows follows z-order)
+    """
+    found = []
+
+    def callback(hwnd, extra):
+        if not win32gui.IsWindowVisible(hwnd):
+            return
+        title = win32gui.GetWindowText(hwnd)
+        if any(pattern.lower() in title.lower() for pattern in patterns):
+            found.append((hwnd, title))
+
+    win32gui.EnumWindows(callback, None)
+    return sorted(found, key=lambda item: (item[1], item[0]))
+
+
+class WindowCapture(FrameSource):
+    live = True
+
+    def __init__(self, hwnd=None, index=0):
+        """
+        Args:
+            hwnd: Capture this window handle only (e.g. from find_windows())
+            index: Otherwise capture the index-th matching window (see find_windows)
+        """
+        super().__init__()
+        self.target_hwnd = hwnd
+        self.index = index
+        self.title = None
         self.hwnd = None
+        # Client area in screen coordinates: (x, y, width, height)
+        self.geometry = None
+        self._geometry_checked = 0.0
+        # mss handles are not shareable across threads, keep one per thread
+        self._local = threading.local()
         self.find_window()
 
+    def is_ready(self):
+        """Check if the emulator window has been found (searches again if not)."""
+        return self.hwnd is not None or self.find_window()
+
     def find_window(self):
         """Finds the emulator window by checking known titles."""
         self.hwnd = None
-        
-        def callback(hwnd, extra):
-            if self.hwnd: return # Already found
-            title = win32gui.GetWindowText(hwnd)
-            for pattern in WINDOW_NAME_PATTERNS:
-                if pattern.lower() in title.lower():
-                    self.hwnd = hwnd
-                    return
-
-        win32gui.EnumWindows(callback, None)
+        self.geometry = None
+
+        if self.target_hwnd is not None:
+            # Bound to one window: never switch to another instance
+            if win32gui.IsWindow(self.target_hwnd):
+                self.hwnd = self.target_hwnd
+                self.title = win32gui.GetWindowText(self.hwnd)
+            return self.hwnd is not None
+
+        windows = find_windows()
+        if len(windows) > self.index:
+            self.hwnd, self.title = windows[self.index]
         return self.hwnd is not None
 
-    def get_screenshot(self):
-        """Captures the window, resizes it, and returns a numpy array."""
-        if not self.hwnd:
-            if not self.find_window():
-                return None
+    def _grabber(self):
+        """Return the long-lived mss instance for the calling thread."""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
 
-        try:
-            # Get client area dimensions (content only, no borders)
-            left, top, right, bottom = win32gui.GetClientRect(self.hwnd)
-            w = right - left
-            h = bottom - top
-            
-            # Convert client top-left (0,0) to screen coordinates
-            # ClientToScreen expects a point (x, y)
-            top_left = win32gui.ClientToScreen(self.hwnd, (0, 0))
-            x, y = top_left
-            
-            # Debug: Print dimensions to verify
-            # print(f"Client Area: {w}x{h} at ({x},{y})")
-            
+    def _refresh_geometry(self, force=False):
+        """Re-read the client area if the cache is stale. Returns True if usable."""
+        now = time.monotonic()
+        if not force and self.geometry and now - self._geometry_checked < GEOMETRY_CHECK_INTERVAL:
+            return True
+
+        # Get client area dimensions (content only, no borders)
+        left, top, right, bottom = win32gui.GetClientRect(self.hwnd)
+        w = right - left
+        h = bottom - top
+        
+        # Convert client top-left (0,0) to screen coordinates
+        # ClientToScreen expects a point (x, y)
+        x, y = win32gui.ClientToScreen(self.hwnd, (0, 0))
+        self._geometry_checked = now
+
+        geometry = (x, y, w, h)
+        if geometry != self.geometry:
             if w > h:
                 print(f"Warning: Window is Landscape ({w}x{h}). Clash Royale requires Portrait!")
                 print("Please rotate the emulator or change resolution to 900x1600.")
-            
-            if w == 0 or h == 0:
-                return None
+            self.geometry = geometry
+
+        return w > 0 and h > 0
 
-            # mss requires a dict
-            monitor = {"top": y, "left": x, "width": w, "height": h}
+    def _grab(self, x, y, w, h):
+        """Grab a screen rectangle and drop the alpha channel (BGRA -> BGR)."""
+        # mss requires a dict
+        monitor = {"top": y, "left": x, "width": w, "height": h}
+        img = np.asarray(self._grabber().grab(monitor))
+        return img[:, :, :3]
 
-            # Capture using context manager to avoid threading/state issues
-            with mss.mss() as sct:
-                img = np.array(sct.grab(monitor))
+    def _prepare(self):
+        """Make sure a window and its geometry are available."""
+        if not self.hwnd:
+            if not self.find_window():
+                return False
+        return self._refresh_geometry()
 
-            # Drop Alpha channel (BGRA -> BGR)
-            img = img[:, :, :3]
+    def _on_error(self, e):
+        # Only print error if it's not a known "window closed" issue
+        print(f"Capture error: {e}")
+        self.hwnd = None # Force re-find
+        self.geometry = None
+
+    def get_screenshot(self):
+        """Captures the window, resizes it, and returns a numpy array."""
+        try:
+            if not self._prepare():
+                return None
+
+            x, y, w, h = self.geometry
+            img = self._grab(x, y, w, h)
 
             # Resize to standard width
             # Calculate height to maintain aspect ratio
@@ -80,10 +151,56 @@ class WindowCapture:
             target_height = int(RESIZE_WIDTH * aspect_ratio)
             
             resized = cv2.resize(img, (RESIZE_WIDTH, target_height))
+            self.frame_index += 1
+            self.last_timestamp = time.time()
             return resized
 
         except Exception as e:
-            # Only print error if it's not a known "window closed" issue
-            print(f"Capture error: {e}")
-            self.hwnd = None # Force re-find
+            self._on_error(e)
+            return None
+
+    def get_regions(self, regions):
+        """
+        Grab only the requested regions instead of the full client area.
+
+        Each region is captured directly from the screen at physical resolution
+        and scaled to its size in the resized (RESIZE_WIDTH wide) frame, so no
+        full-frame capture or resize happens.
+
+        Args:
+            regions: Dict of name -> (x, y, width, height) in resized-frame coordinates
+
+        Returns:
+            Dict of name -> BGR numpy array of shape (height, width, 3), or None
+        """
+        try:
+            if not self._prepare():
+                return None
+
+            gx, gy, gw, gh = self.geometry
+            scale = gw / RESIZE_WIDTH
+            out = {}
+            for name, (rx, ry, rw, rh) in regions.items():
+                px1 = min(gw, max(0, int(round(rx * scale))))
+                py1 = min(gh, max(0, int(round(ry * scale))))
+                px2 = min(gw, max(px1 + 1, int(round((rx + rw) * scale))))
+                py2 = min(gh, max(py1 + 1, int(round((ry + rh) * scale))))
+                img = self._grab(gx + px1, gy + py1, px2 - px1, py2 - py1)
+                if img.shape[1] != rw or img.shape[0] != rh:
+                    img = cv2.resize(img, (rw, rh))
+                out[name] = img
+
+            self.frame_index += 1
+            self.last_timestamp = time.time()
+            return out
+
+        except Exception as e:
+            self._on_error(e)
             return None
+
+    def close(self):
+        """Release the grabber of the calling thread."""
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
@@ -0,0 +1,79 @@
+"""
+Clocks
+Time sources for everything that depends on elapsed time (elixir regeneration,
+tower timeouts).
+
+SystemClock reads the wall clock. FrameClock is driven by capture timestamps:
+the main loop sets it to each frame's timestamp, so a recording replayed at any
+speed (or as fast as the CPU allows) sees exactly the time that passed in the
+match, and a live session (whose frames are stamped with time.time()) behaves
+the same way.
+"""
+
+import threading
+import time
+
+
+class Clock:
+    """Base class: now() returns the current time in seconds."""
+
+    def now(self):
+        raise NotImplementedError
+
+
+class SystemClock(Clock):
+    """Wall-clock time (time.time())."""
+
+    def now(self):
+        return time.time()
+
+
+class FrameClock(Clock):
+    """Time set from frame timestamps; never goes backwards."""
+
+    def __init__(self, start=0.0, restart_gap=1.0):
+        """
+        Args:
+            start: Time reported before the first frame
+            restart_gap: A timestamp this many seconds older than the previous one
+                         is a replay restarting; smaller steps back (frames handed
+                         to different threads out of order) are ignored
+        """
+        self.restart_gap = restart_gap
+        self._now = start
+        self._last_timestamp = None
+        self._offset = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, timestamp):
+        """
+        Advance the clock to a frame timestamp.
+
+        When timestamps jump far backwards (a looping replay restarting), the
+        clock holds its value and continues from there.
+
+        Returns:
+            The clock's new time
+        """
+        with self._lock:
+            last = self._last_timestamp
+            if last is not None and timestamp < last - self.restart_gap:
+                # Replay restarted: continue from the current time
+                self._offset = self._now - timestamp
+                self._last_timestamp = timestamp
+            elif last is None or timestamp > last:
+                self._last_timestamp = timestamp
+            self._now = max(self._now, timestamp + self._offset)
+            return self._now
+
+    def advance(self, seconds):
+        """Move the clock forward by a number of seconds."""
+        with self._lock:
+            self._now += seconds
+            return self._now
+
+    def now(self):
+        return self._now
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,156 @@
+"""
+Frame Compositor
+Builds each displayed frame with a single full-frame copy.
+
+The compositor owns one preallocated output buffer per frame size. Every frame
+the screenshot is copied into it once, then each enabled layer (grid, towers,
+elixir HUD, ...) draws straight into that buffer, in z order. Layers report the
+rectangle they will touch (dirty_rect) and must stay inside it; a layer with no
+dirty rectangle is skipped for that frame.
+"""
+
+import numpy as np
+
+
+class Layer:
+    """Base class for something drawn onto the composited frame."""
+
+    def __init__(self, name, z=0):
+        self.name = name
+        self.z = z
+        self.enabled = True
+
+    def dirty_rect(self, frame_shape):
+        """Return (x1, y1, x2, y2) this layer will draw into, or None to skip the frame."""
+        return (0, 0, frame_shape[1], frame_shape[0])
+
+    def draw(self, frame):
+        """Draw in place onto frame (only inside dirty_rect)."""
+        raise NotImplementedError
+
+
+class GridLayer(Layer):
+    """Cached grid overlay blended at the settings window's opacity."""
+
+    def __init__(self, grid, opacity=1.0, z=0):
+        super().__init__('grid', z)
+        self.grid = grid
+        self.opacity = opacity
+
+    def dirty_rect(self, frame_shape):
+        if self.opacity <= 0:
+            return None
+        return self.grid.layer_bbox(frame_shape)
+
+    def draw(self, frame):
+        self.grid.blend_into(frame, self.opacity)
+
+
+class TowerLayer(Layer):
+    """Boxes and labels of the most recent tower detections."""
+
+    def __init__(self, towers, z=10):
+        super().__init__('towers', z)
+        self.towers = towers
+
+    def dirty_rect(self, frame_shape):
+        return self.towers.detections_rect(frame_shape)
+
+    def draw(self, frame):
+        self.towers.draw(frame)
+
+
+class ElixirLayer(Layer):
+    """Elixir bar outline and 'E = n' HUD."""
+
+    def __init__(self, elixir, z=20):
+        super().__init__('elixir', z)
+        self.elixir = elixir
+
+    def dirty_rect(self, frame_shape):
+        return self.elixir.hud_rect(frame_shape)
+
+    def draw(self, frame):
+        self.elixir.draw(frame)
+
+
+class ProfilerLayer(Layer):
+    """Per-stage latency HUD (see src/profiler.py)."""
+
+    def __init__(self, profiler, z=100):
+        super().__init__('profiler', z)
+        self.profiler = profiler
+
+    def dirty_rect(self, frame_shape):
+        return self.profiler.hud_rect(frame_shape)
+
+    def draw(self, frame):
+        self.profiler.draw_hud(frame)
+
+
+class FrameCompositor:
+    """Composites layers onto a reused output buffer."""
+
+    def __init__(self, profiler=None):
+        """
+        Args:
+            profiler: Optional Profiler; each layer is timed as 'draw_<name>'
+        """
+        self.layers = []
+        self._buffers = {}
+        self.dirty_rects = {}  # Layer name -> rect drawn in the last frame
+        self.profiler = profiler
+
+    def add_layer(self, layer):
+        """Register a layer (replaces any layer with the same name)."""
+        self.remove_layer(layer.name)
+        self.layers.append(layer)
+        self.layers.sort(key=lambda l: l.z)
+        return layer
+
+    def remove_layer(self, name):
+        """Unregister a layer by name."""
+        self.layers = [l for l in self.layers if l.name != name]
+
+    def get_layer(self, name):
+        """Return the layer with this name, or None."""
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        return None
+
+    def _buffer_for(self, frame):
+        key = (frame.shape, frame.dtype.str)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = np.empty_like(frame)
+            self._buffers[key] = buffer
+        return buffer
+
+    def compose(self, frame):
+        """
+        Copy frame into the output buffer and draw every enabled layer on it.
+
+        The returned buffer is reused by the next compose() call with the same
+        frame size; copy it if it must outlive that.
+
+        Returns:
+            np.ndarray: Composited frame
+        """
+        buffer = self._buffer_for(frame)
+        np.copyto(buffer, frame)
+
+        self.dirty_rects = {}
+        for layer in self.layers:
+            if not layer.enabled:
+                continue
+            rect = layer.dirty_rect(buffer.shape)
+            if rect is None:
+                continue
+            if self.profiler is not None:
+                with self.profiler.stage('draw_' + layer.name):
+                    layer.draw(buffer)
+            else:
+                layer.draw(buffer)
+            self.dirty_rects[layer.name] = rect
+        return buffer
@@ -12,10 +12,65 @@ WINDOW_NAME_PATTERNS = ["Android Device"]
 RESIZE_WIDTH = 450
 RESIZE_HEIGHT = 827  # Actual frame height from emulator
 
+# Seconds between window geometry checks (geometry is cached between checks)
+GEOMETRY_CHECK_INTERVAL = 0.5
+
+# Frame source: 'window', 'video:<path>', 'images:<dir>' or 'synthetic[:<count>]'
+# (see src/frame_sources.py). Can be overridden with --source on the command line.
+FRAME_SOURCE = os.getenv("FRAME_SOURCE", "window")
+
 # Model IDs for detection
 TROOP_MODEL_ID = os.getenv("TROOP_MODEL_ID", "clash-royale-xy2jw/2")
 CARD_MODEL_ID = os.getenv("HAND_CARDS_MODEL_ID", "clash-cards-vt0gf/1")
 
+# Inference backend per model: {model_id: {"backend": "roboflow"|"opencv"|"onnxruntime", ...}}
+# Local backends take "model_path", "classes" (list or .txt file), "input_size",
+# "confidence_threshold" and "nms_threshold". Models not listed use the Roboflow API.
+MODEL_BACKENDS_FILE = "model_backends.json"
+
+
+def _load_model_backends():
+    """Load per-model inference backend settings from model_backends.json."""
+    if os.path.exists(MODEL_BACKENDS_FILE):
+        try:
+            with open(MODEL_BACKENDS_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Could not read {MODEL_BACKENDS_FILE}: {e}")
+    return {}
+
+
+MODEL_BACKENDS = _load_model_backends()
+DEFAULT_MODEL_BACKEND = "roboflow"
+
+# Detector HTTP settings
+# Base URL of the hosted API; point it at tools/roboflow_standin.py for load tests
+ROBOFLOW_API_URL = os.getenv("ROBOFLOW_API_URL", "https://detect.roboflow.com")
+DETECTOR_TIMEOUT = 2.0  # Seconds per request
+DETECTOR_POOL_SIZE = 4  # Worker threads and pooled keep-alive connections
+DETECTOR_MAX_IN_FLIGHT = 1  # Concurrent requests allowed per model
+
+# Tower detection input: 'full' sends the whole frame, 'mosaic' sends only the four
+# tower regions packed into one small image (see src/tower_mosaic.py). The tower model
+# was trained on full frames, so check mosaic results against 'full' before opting in.
+TOWER_DETECTION_MODE = os.getenv("TOWER_DETECTION_MODE", "full")
+
+# Where tower up/down state comes from:
+# "model" = tower model (Roboflow), "pixels" = TowerPixelDetector (no model call),
+# "both" = pixels drive the state, the model still runs and is compared against it
+TOWER_STATE_SOURCE = os.getenv("TOWER_STATE_SOURCE", "model")
+TOWER_REFERENCE_DIR = "assets/towers"  # LE.png/RE.png/LF.png/RF.png crops of standing towers
+TOWER_PIXEL_THRESHOLD = 0.5  # Min hue/saturation histogram correlation for a standing tower
+TOWER_PIXEL_BINS = (16, 8)  # Hue, saturation bins
+TOWER_CALIBRATION_FRAMES = 5  # Frames averaged into a reference when no crop exists
+TOWER_ARENA_MARGIN = 0.05  # Min lead of left/right over enemy/friendly tower correlation in calibration frames
+
+# Detection result cache (keyed by model + perceptual hash of the input frame)
+DETECTION_CACHE_SIZE = 256  # In-memory LRU entries (0 disables caching)
+DETECTION_CACHE_DIR = os.getenv("DETECTION_CACHE_DIR")  # Optional on-disk tier
+DETECTION_CACHE_HASH_SIZE = 16  # dHash grid side (16 -> 256-bit hash)
+DETECTION_CACHE_MAX_DISTANCE = 0  # Hamming bits tolerated for a near-duplicate hit
+
 # Load display configuration from unified config file
 def _load_display_config():
     """Load display positions and grid settings from display_config.json."""
@@ -52,6 +107,74 @@ ELIXIR_BAR_ROI = (_elixir_cfg["x"], _elixir_cfg["y"], _elixir_cfg["width"], _eli
 # Arena: Where cards are played (The main battlefield)
 ARENA_ROI = (20, 100, 410, 500)
 
+# Princess tower footprints in grid tiles: (tile_x, tile_y, tiles_wide, tiles_high)
+# Friendly towers match the LF/RF tiles in shaded_tiles.json; enemy towers mirror them.
+TOWER_TILE_FOOTPRINTS = {
+    'LE': (2, 5, 3, 3),
+    'RE': (13, 5, 3, 3),
+    'LF': (2, 24, 3, 3),
+    'RF': (13, 24, 3, 3),
+}
+TOWER_ROI_PADDING_TILES = 1  # Extra tiles around each footprint (towers are drawn taller)
+
+
+def _tiles_to_roi(tile_x, tile_y, tiles_w, tiles_h, pad=TOWER_ROI_PADDING_TILES):
+    """Convert a grid tile rectangle to a frame ROI using the grid settings."""
+    grid = _display_config["grid"]
+    tile_w = RESIZE_WIDTH / 18 * grid.get("scale_x", 0.85)
+    tile_h = RESIZE_HEIGHT / 32 * grid.get("scale_y", 0.67)
+    # GridOverlay always centers the grid horizontally
+    offset_x = (RESIZE_WIDTH - tile_w * 18) / 2.0
+    offset_y = grid.get("offset_y", 88.0)
+
+    x1 = max(0, int(offset_x + (tile_x - pad) * tile_w))
+    y1 = max(0, int(offset_y + (tile_y - 2 * pad) * tile_h))
+    x2 = min(RESIZE_WIDTH, int(offset_x + (tile_x + tiles_w + pad) * tile_w))
+    y2 = min(RESIZE_HEIGHT, int(offset_y + (tile_y + tiles_h + pad) * tile_h))
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+# Princess tower regions: (x, y, width, height) keyed by LE/RE/LF/RF
+TOWER_ROIS = {key: _tiles_to_roi(*tiles) for key, tiles in TOWER_TILE_FOOTPRINTS.items()}
+
+# Bounding box of all four tower regions
+_tower_x1 = min(x for x, y, w, h in TOWER_ROIS.values())
+_tower_y1 = min(y for x, y, w, h in TOWER_ROIS.values())
+TOWERS_ROI = (
+    _tower_x1, _tower_y1,
+    max(x + w for x, y, w, h in TOWER_ROIS.values()) - _tower_x1,
+    max(y + h for x, y, w, h in TOWER_ROIS.values()) - _tower_y1,
+)
+
+# Hand: the four card slots above the elixir bar
+HAND_ROI = (85, 685, 360, 110)
+
+# Detection planner: region and maximum upload width per model
+# (crops are downscaled to max_width before encoding; None keeps full resolution)
+DETECTION_PLANS = {
+    'troops': {'roi': ARENA_ROI, 'max_width': 416},
+    'cards': {'roi': HAND_ROI, 'max_width': 320},
+    'towers': {'roi': TOWERS_ROI, 'max_width': 320},
+}
+
+# Tower state tracker (src/state_manager.py): a tower changes state only after
+# TOWER_STATE_RESULTS detection results in a row agree (counted in results, not
+# frames, so it scales with the detection rate); going down also needs
+# TOWER_DOWN_TIMEOUT seconds without a detection
+TOWER_STATE_RESULTS = 2
+TOWER_DOWN_TIMEOUT = 1.0
+
+# Detection scheduler: per-model rate budget and change trigger
+# (diff_threshold is the mean absolute grayscale change, 0-255, of the model's region;
+# max_staleness forces a refresh after that many seconds without change).
+# Towers must refresh inside TOWER_DOWN_TIMEOUT, or one missed detection takes a tower down.
+DETECTION_SCHEDULES = {
+    'towers': {'max_rate_hz': 2.0, 'roi': list(TOWER_ROIS.values()), 'diff_threshold': 4.0,
+               'max_staleness': 0.75 * TOWER_DOWN_TIMEOUT},
+    'troops': {'max_rate_hz': 8.0, 'roi': ARENA_ROI, 'diff_threshold': 2.0, 'max_staleness': 1.0},
+    'cards': {'max_rate_hz': 2.0, 'roi': HAND_ROI, 'diff_threshold': 6.0, 'max_staleness': 5.0},
+}
+
 # Card Detection Settings
 MATCH_CONFIDENCE = 0.8
 DEBOUNCE_TIME = 3.0  # Seconds to ignore the same card
@@ -60,6 +183,32 @@ DEBOUNCE_TIME = 3.0  # Seconds to ignore the same card
 ENABLE_TOWER_DETECTION = False  # Set to True to enable tower detection visualization
 ENABLE_GRID_OVERLAY = True  # Set to True to show grid overlay
 ENABLE_ELIXIR_TRACKING = True  # Set to True to show elixir tracking
+ENABLE_THREADED_PIPELINE = False  # Run capture/analysis on worker threads (or pass --threaded)
+
+# Threaded pipeline: frames buffered per stage queue (oldest dropped when full)
+PIPELINE_QUEUE_SIZE = 2
+
+# Multi-process mode: frames kept in the shared-memory ring (src/shared_frames.py);
+# a reader more than this many frames behind starts dropping frames
+SHARED_RING_SLOTS = 8
+MP_MAX_RESTARTS = 5  # Crashes tolerated per process before the supervisor gives up on it
+MP_RESTART_BACKOFF = 0.5  # Seconds before the first restart (doubled after each crash)
+
+# Multiple game instances (--instances N or several --source): threads stepping
+# them concurrently (0 = one per instance); see src/instances.py
+INSTANCE_WORKERS = int(os.getenv("INSTANCE_WORKERS", "0"))
+
+# Per-stage latency profiler (or pass --profile); see src/profiler.py
+ENABLE_PROFILER = os.getenv("ENABLE_PROFILER", "0") == "1"
+PROFILER_WINDOW = 300  # Samples kept per stage (ring buffer)
+PROFILER_DUMP_FILE = os.getenv("PROFILER_DUMP_FILE")  # .json or .csv; None = no dump
+PROFILER_DUMP_INTERVAL = 5.0  # Seconds between dumps
+
+# Match recorder (pass --record <file>); see src/recorder.py
+RECORDING_CHUNK_FRAMES = 60  # Frames per chunk (unit of random access)
+RECORDING_FORMAT = os.getenv("RECORDING_FORMAT", "jpg")  # 'jpg' or 'png' (lossless)
+RECORDING_JPEG_QUALITY = 90
+RECORDER_QUEUE_SIZE = 120  # Frames buffered for the writer thread (newer frames dropped when full)
 
 # Elixir Logic
 ELIXIR_RECOVERY_RATE_SINGLE = 0.35  # Elixir per second
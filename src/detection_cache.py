@@ -0,0 +1,168 @@
+"""
+Detection Result Cache
+Skips inference for frames that look (almost) the same as one already processed.
+
+Frames are keyed by model id plus a difference hash (dHash) of the downsampled
+grayscale input. Lookups go through two tiers:
+1. In-memory LRU (bounded number of entries)
+2. Optional on-disk JSON store, so replays of the same recording never hit the
+   detector twice across runs
+
+Near-duplicate matching: with max_distance > 0 a memory lookup also accepts any
+cached hash within that many differing bits (Hamming distance). Use the hit/miss
+counters from get_stats() to tune hash_size and max_distance.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def frame_hash(frame, hash_size=16):
+    """
+    Compute a perceptual difference hash of a frame.
+
+    Args:
+        frame: BGR or grayscale image
+        hash_size: Hash is hash_size * hash_size bits
+
+    Returns:
+        Hash as a Python int
+    """
+    # Strided subsample first so the hash stays cheap on full frames
+    step = max(1, min(frame.shape[:2]) // (hash_size * 4))
+    sampled = frame[::step, ::step]
+    gray = sampled if sampled.ndim == 2 else cv2.cvtColor(sampled, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class DetectionCache:
+    """Two-tier (memory LRU + optional disk) cache of detection results."""
+
+    def __init__(self, max_entries=256, cache_dir=None, hash_size=16, max_distance=0):
+        """
+        Args:
+            max_entries: Maximum entries kept in memory (least recently used evicted)
+            cache_dir: Directory for the on-disk tier (None = memory only)
+            hash_size: Side length of the dHash grid (hash has hash_size^2 bits)
+            max_distance: Maximum Hamming distance for a near-duplicate memory hit
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, model_id, frame):
+        """Build the cache key (model, input size, frame hash) for a frame."""
+        h, w = frame.shape[:2]
+        return (f"{model_id}@{w}x{h}", frame_hash(frame, self.hash_size))
+
+    def _disk_path(self, key):
+        model_part, hash_value = key
+        safe_model = ''.join(c if c.isalnum() or c in '-_@.' else '_' for c in model_part)
+        return os.path.join(self.cache_dir, safe_model, f"{hash_value:x}.json")
+
+    def _find_near(self, key):
+        """Return the closest memory key within max_distance bits, or None."""
+        model_part, hash_value = key
+        best_key, best_distance = None, self.max_distance + 1
+        for other in self._memory:
+            if other[0] != model_part:
+                continue
+            distance = (other[1] ^ hash_value).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = other, distance
+        return best_key
+
+    def get(self, key):
+        """
+        Look up cached detections for a key.
+
+        Returns:
+            List of detection dicts, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            if self.max_distance > 0:
+                near = self._find_near(key)
+                if near is not None:
+                    self._memory.move_to_end(near)
+                    self.memory_hits += 1
+                    return self._memory[near]
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r') as f:
+                        detections = json.load(f)
+                    with self._lock:
+                        self.disk_hits += 1
+                        self._store_memory(key, detections)
+                    return detections
+                except Exception as e:
+                    print(f"[WARNING] Unreadable detection cache entry {path}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store_memory(self, key, detections):
+        self._memory[key] = detections
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key, detections):
+        """Store detections for a key in memory (and on disk if enabled)."""
+        with self._lock:
+            self._store_memory(key, detections)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(detections, f)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"[WARNING] Could not write detection cache entry {path}: {e}")
+
+    def clear(self):
+        """Drop the in-memory tier and reset counters (disk entries are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def get_stats(self):
+        """Return hit/miss counters."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._memory),
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
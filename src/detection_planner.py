@@ -0,0 +1,115 @@
+"""
+Detection Request Planner
+Runs several detection models on one frame without each model encoding and
+uploading the whole frame.
+
+For every requested model the planner:
+1. Crops the model's region (e.g. the hand strip for the card model)
+2. Downscales the crop to the model's max upload width
+3. Sends all crops concurrently (each crop is encoded exactly once)
+4. Maps the returned boxes back to full-frame coordinates
+
+Regions and widths come from DETECTION_PLANS in config.py, keyed by model role
+('troops', 'cards', 'towers').
+"""
+
+from collections import namedtuple
+
+import cv2
+
+from src.config import DETECTION_PLANS
+
+# Region of the frame sent to one model
+ModelPlan = namedtuple('ModelPlan', ['role', 'roi', 'max_width'])
+
+# A prepared crop: image to send plus the transform back to frame coordinates
+PreparedCrop = namedtuple('PreparedCrop', ['image', 'offset_x', 'offset_y', 'scale'])
+
+
+def prepare_crop(frame, roi=None, max_width=None):
+    """
+    Crop a frame to roi and downscale it to at most max_width pixels wide.
+
+    Args:
+        frame: Full BGR frame
+        roi: (x, y, width, height) or None for the whole frame
+        max_width: Maximum width of the returned image (None = no downscale)
+
+    Returns:
+        PreparedCrop
+    """
+    fh, fw = frame.shape[:2]
+    if roi is None:
+        x, y, w, h = 0, 0, fw, fh
+    else:
+        x, y, w, h = roi
+        x, y = max(0, x), max(0, y)
+        w, h = min(w, fw - x), min(h, fh - y)
+
+    crop = frame[y:y + h, x:x + w]
+    scale = 1.0
+    if max_width and w > max_width:
+        scale = max_width / w
+        crop = cv2.resize(crop, (max_width, max(1, int(round(h * scale)))), interpolation=cv2.INTER_AREA)
+    return PreparedCrop(crop, x, y, scale)
+
+
+def map_detections(detections, offset_x, offset_y, scale):
+    """Convert detections from crop coordinates back to full-frame coordinates."""
+    mapped = []
+    for det in detections:
+        cx, cy, w, h = det['box']
+        mapped.append({
+            **det,
+            'box': [offset_x + cx / scale, offset_y + cy / scale, w / scale, h / scale]
+        })
+    return mapped
+
+
+class DetectionPlanner:
+    """Plans and runs multi-model detection on a single frame."""
+
+    def __init__(self, detector, plans=None):
+        """
+        Args:
+            detector: RoboflowDetector used to run the models
+            plans: Dict of role -> {'roi': (x, y, w, h) or None, 'max_width': int or None}
+                   (defaults to DETECTION_PLANS)
+        """
+        self.detector = detector
+        self.plans = {
+            role: ModelPlan(role, cfg.get('roi'), cfg.get('max_width'))
+            for role, cfg in (plans or DETECTION_PLANS).items()
+        }
+
+    def run(self, frame, roles=None):
+        """
+        Run the given models on one frame.
+
+        Args:
+            frame: Full BGR frame
+            roles: Iterable of model roles to run (defaults to every plan)
+
+        Returns:
+            Dict of role -> detections in full-frame coordinates
+        """
+        if frame is None:
+            return {}
+
+        roles = list(roles) if roles is not None else list(self.plans)
+        jobs, crops, active = [], [], []
+        for role in roles:
+            model_id = self.detector.model_for(role)
+            if not model_id:
+                continue
+            plan = self.plans.get(role, ModelPlan(role, None, None))
+            crop = prepare_crop(frame, plan.roi, plan.max_width)
+            jobs.append((crop.image, model_id))
+            crops.append(crop)
+            active.append(role)
+
+        results = self.detector.detect_concurrently(jobs)
+        return {
+            role: map_detections(detections, crop.offset_x, crop.offset_y, crop.scale)
+            for role, crop, detections in zip(active, crops, results)
+        }
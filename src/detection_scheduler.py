@@ -0,0 +1,165 @@
+"""
+Change-Triggered Detection Scheduler
+Decides, per model, whether a frame is worth sending to the detector.
+
+A model is dispatched only when
+- its rate budget allows it (at most max_rate_hz dispatches per second), and
+- its region changed (mean absolute difference of a small grayscale
+  signature >= diff_threshold), or the last dispatch is older than
+  max_staleness seconds.
+
+Counters (dispatched / skipped / stale / busy) prove how many API calls were
+avoided. Settings come from DETECTION_SCHEDULES in config.py, keyed by model
+role ('towers', 'troops', 'cards').
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from src.config import DETECTION_SCHEDULES
+
+SIGNATURE_SIZE = (32, 32)
+
+
+class ModelSchedule:
+    """Rate budget, change detection settings and counters for one model."""
+
+    def __init__(self, role, max_rate_hz=2.0, roi=None, diff_threshold=4.0, max_staleness=2.0):
+        """
+        Args:
+            role: Model role ('towers', 'troops', 'cards')
+            max_rate_hz: Maximum dispatches per second
+            roi: (x, y, w, h), a list of those, or None for the whole frame
+            diff_threshold: Mean absolute grayscale difference (0-255) counted as a change
+            max_staleness: Seconds after which a dispatch happens even without change
+        """
+        self.role = role
+        self.max_rate_hz = max_rate_hz
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz else 0.0
+        self.rois = [roi] if isinstance(roi, tuple) else (list(roi) if roi else [None])
+        self.diff_threshold = diff_threshold
+        self.max_staleness = max_staleness
+
+        self.last_dispatch = None
+        self.last_signature = None
+        self._pending_signature = None
+
+        self.dispatched = 0
+        self.skipped = 0
+        self.stale = 0
+        self.busy = 0
+
+    def signature(self, frame):
+        """Small grayscale thumbnail of the model's region(s)."""
+        parts = []
+        fh, fw = frame.shape[:2]
+        for roi in self.rois:
+            if roi is None:
+                region = frame
+            else:
+                x, y, w, h = roi
+                region = frame[max(0, y):min(fh, y + h), max(0, x):min(fw, x + w)]
+            if region.size == 0:
+                continue
+            # Strided subsample keeps the resize cheap on large regions
+            step = max(1, min(region.shape[:2]) // (SIGNATURE_SIZE[0] * 2))
+            region = region[::step, ::step]
+            if region.ndim == 3:
+                region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+            parts.append(cv2.resize(region, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA))
+        return np.concatenate(parts) if parts else None
+
+    def get_stats(self):
+        return {
+            'dispatched': self.dispatched,
+            'skipped': self.skipped,
+            'stale': self.stale,
+            'busy': self.busy,
+        }
+
+
+class DetectionScheduler:
+    """Gatekeeper between the frame stream and the detector."""
+
+    def __init__(self, schedules=None):
+        """
+        Args:
+            schedules: Dict of role -> ModelSchedule keyword arguments
+                       (defaults to DETECTION_SCHEDULES)
+        """
+        self.schedules = {
+            role: ModelSchedule(role, **cfg)
+            for role, cfg in (schedules or DETECTION_SCHEDULES).items()
+        }
+        self._lock = threading.Lock()
+
+    def _schedule(self, role):
+        if role not in self.schedules:
+            self.schedules[role] = ModelSchedule(role)
+        return self.schedules[role]
+
+    def should_dispatch(self, role, frame, now=None):
+        """
+        Check whether a frame should be sent to the model.
+
+        Call mark_dispatched() once the request was actually queued (or
+        mark_busy() if the detector refused it).
+
+        Args:
+            role: Model role
+            frame: Full BGR frame
+            now: Current time in seconds (defaults to time.time())
+
+        Returns:
+            True if the model should run on this frame
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            sched = self._schedule(role)
+
+            # Rate budget
+            if sched.last_dispatch is not None and now - sched.last_dispatch < sched.min_interval:
+                sched.skipped += 1
+                return False
+
+            signature = sched.signature(frame)
+            sched._pending_signature = signature
+
+            if sched.last_dispatch is None or sched.last_signature is None or signature is None:
+                return True
+
+            diff = float(cv2.absdiff(signature, sched.last_signature).mean())
+            if diff >= sched.diff_threshold:
+                return True
+
+            # Unchanged: only refresh once the last result is too old
+            if now - sched.last_dispatch >= sched.max_staleness:
+                sched.stale += 1
+                return True
+
+            sched.skipped += 1
+            return False
+
+    def mark_dispatched(self, role, now=None):
+        """Record that a request for role was queued."""
+        now = time.time() if now is None else now
+        with self._lock:
+            sched = self._schedule(role)
+            sched.last_dispatch = now
+            sched.last_signature = sched._pending_signature
+            sched.dispatched += 1
+
+    def mark_busy(self, role):
+        """Record that a dispatch was wanted but the detector was still busy."""
+        with self._lock:
+            self._schedule(role).busy += 1
+
+    def get_stats(self, role=None):
+        """Return counters for one role, or a dict of all roles."""
+        with self._lock:
+            if role is not None:
+                return self._schedule(role).get_stats()
+            return {r: s.get_stats() for r, s in self.schedules.items()}
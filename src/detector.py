@@ -1,70 +1,159 @@
 import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import base64
-import cv2
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
-from src.config import TROOP_MODEL_ID, CARD_MODEL_ID
+from src.config import (
+    TROOP_MODEL_ID, CARD_MODEL_ID, MODEL_BACKENDS, MODEL_BACKENDS_FILE, DEFAULT_MODEL_BACKEND,
+    ROBOFLOW_API_URL, DETECTOR_POOL_SIZE, DETECTOR_MAX_IN_FLIGHT, DETECTOR_TIMEOUT,
+    DETECTION_CACHE_SIZE, DETECTION_CACHE_DIR, DETECTION_CACHE_HASH_SIZE, DETECTION_CACHE_MAX_DISTANCE,
+    TOWER_DETECTION_MODE
+)
+from src.inference_backends import create_backend
+from src.detection_cache import DetectionCache
+from src.tower_mosaic import TowerMosaic
+
+# A finished asynchronous detection, tagged with the frame it was run on
+DetectionResult = namedtuple(
+    'DetectionResult',
+    ['model_id', 'frame_id', 'timestamp', 'detections', 'latency']
+)
+
 
 class RoboflowDetector:
     """
     Wrapper for Roboflow HTTP API.
     Handles multiple models: troops (arena), cards (hand), and towers.
     Compatible with Python 3.14+
+    
+    Each model runs on the backend configured for it in model_backends.json
+    (see src/inference_backends.py), so any model can be swapped for a local
+    ONNX export without changing callers.
+    
+    Results are cached by model + perceptual frame hash (see
+    src/detection_cache.py), so static or replayed frames are not re-sent.
+    
+    Requests share one keep-alive session. Besides the blocking detect_* calls
+    there is a non-blocking API: submit() queues a detection on a worker pool
+    (at most max_in_flight per model) and poll() returns the newest finished
+    DetectionResult.
+    
+    Several callers (e.g. one TowerDisplay per game instance) can share one
+    detector, its worker pool and cache through channel(): each channel keeps
+    its own in-flight limit and latest result.
     """
     
-    def __init__(self, tower_model_id=None):
-        """Initialize the Roboflow API with credentials from .env"""
+    def __init__(self, tower_model_id=None, api_url=None, max_in_flight=DETECTOR_MAX_IN_FLIGHT,
+                 pool_size=DETECTOR_POOL_SIZE, timeout=DETECTOR_TIMEOUT):
+        """Initialize the Roboflow API with credentials from .env
+        
+        Args:
+            tower_model_id: Tower model (defaults to ROBOFLOW_MODEL_ID)
+            api_url: API base URL (defaults to ROBOFLOW_API_URL, e.g. a local stand-in server)
+            max_in_flight: Maximum concurrent requests per model
+            pool_size: Worker threads / pooled connections
+            timeout: HTTP timeout in seconds
+        """
         load_dotenv()
         
         self.api_key = os.getenv("ROBOFLOW_API_KEY")
+        self.tower_model_id = tower_model_id or os.getenv("ROBOFLOW_MODEL_ID")
         
-        if not self.api_key:
+        # The API key is only required when some model still uses the hosted API
+        hosted = [
+            model_id for model_id in (self.tower_model_id, TROOP_MODEL_ID, CARD_MODEL_ID)
+            if model_id and MODEL_BACKENDS.get(model_id, {}).get('backend', DEFAULT_MODEL_BACKEND) == 'roboflow'
+        ]
+        if not self.api_key and hosted:
             raise ValueError(
-                "Missing required environment variable ROBOFLOW_API_KEY. "
-                "Please create a .env file."
+                "Missing required environment variable ROBOFLOW_API_KEY "
+                f"(used by {', '.join(hosted)}). Please create a .env file "
+                f"or configure local backends in {MODEL_BACKENDS_FILE}."
             )
         
-        self.api_url_base = "https://detect.roboflow.com"
-        self.tower_model_id = tower_model_id or os.getenv("ROBOFLOW_MODEL_ID")
+        self.api_url_base = (api_url or ROBOFLOW_API_URL).rstrip('/')
+        self.timeout = timeout
+        
+        # Shared keep-alive session with a connection pool sized to the workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/x-www-form-urlencoded'})
+        
+        # Non-blocking API state
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="detector")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._latest = {}
+        self._backends = {}
+        
+        # Tower requests only send the four tower regions in mosaic mode
+        self.tower_mosaic = TowerMosaic() if TOWER_DETECTION_MODE == 'mosaic' else None
+        
+        # Results cache keyed by model + perceptual frame hash
+        self.cache = None
+        if DETECTION_CACHE_SIZE:
+            self.cache = DetectionCache(
+                max_entries=DETECTION_CACHE_SIZE,
+                cache_dir=DETECTION_CACHE_DIR,
+                hash_size=DETECTION_CACHE_HASH_SIZE,
+                max_distance=DETECTION_CACHE_MAX_DISTANCE
+            )
+
+    def _get_backend(self, model_id):
+        """Return (and cache) the inference backend configured for a model."""
+        with self._lock:
+            if model_id in self._backends:
+                return self._backends[model_id]
+        
+        settings = dict(MODEL_BACKENDS.get(model_id, {}))
+        name = settings.pop('backend', DEFAULT_MODEL_BACKEND)
+        try:
+            if name == 'roboflow':
+                backend = create_backend(name, model_id=model_id, session=self.session,
+                                         api_key=self.api_key, api_url=self.api_url_base,
+                                         timeout=self.timeout, **settings)
+            else:
+                backend = create_backend(name, model_id=model_id, **settings)
+        except Exception as e:
+            print(f"[ERROR] Could not create '{name}' backend for {model_id}: {e}")
+            backend = None
+        
+        with self._lock:
+            self._backends[model_id] = backend
+        return backend
 
     def _detect_with_model(self, frame, model_id):
         """
-        Generic detection method using HTTP API.
+        Generic detection method; runs the backend configured for model_id
+        (Roboflow HTTP API unless model_backends.json says otherwise).
         """
         if frame is None or not model_id:
             return []
             
+        backend = self._get_backend(model_id)
+        if backend is None:
+            return []
+        
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(model_id, frame)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
-            _, buffer = cv2.imencode('.jpg', frame)
-            img_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            url = f"{self.api_url_base}/{model_id}"
-            response = requests.post(
-                url,
-                params={'api_key': self.api_key},
-                headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                data=img_base64,
-                timeout=2
-            )
-            
-            if response.status_code != 200:
+            detections = backend.predict(frame)
+            if detections is None:
+                # Failed request: don't cache it
                 return []
-            
-            result = response.json()
-            predictions = result.get('predictions', [])
-            
-            detections = []
-            for pred in predictions:
-                detections.append({
-                    'class': pred.get('class', 'Unknown'),
-                    'confidence': float(pred.get('confidence', 0)),
-                    'box': [
-                        float(pred.get('x', 0)),
-                        float(pred.get('y', 0)),
-                        float(pred.get('width', 0)),
-                        float(pred.get('height', 0))
-                    ]
-                })
+            if key is not None:
+                self.cache.put(key, detections)
             return detections
             
         except requests.RequestException as e:
@@ -89,11 +178,170 @@ class RoboflowDetector:
     def detect_towers(self, frame):
         """
         Detect princess towers using the tower model.
+        
+        In 'mosaic' mode (TOWER_DETECTION_MODE) only the four tower regions are
+        sent, packed into one small image, and boxes are mapped back to the frame.
+        """
+        if self.tower_mosaic is None or frame is None:
+            return self._detect_with_model(frame, self.tower_model_id)
+        
+        mosaic = self.tower_mosaic.build(frame)
+        detections = self._detect_with_model(mosaic, self.tower_model_id)
+        return self.tower_mosaic.map_detections(detections)
+
+    def model_for(self, role):
+        """Resolve a model role ('troops', 'cards', 'towers') to its model id."""
+        return {
+            'troops': TROOP_MODEL_ID,
+            'cards': CARD_MODEL_ID,
+            'towers': self.tower_model_id,
+        }.get(role, role)
+
+    def detect_concurrently(self, jobs):
+        """
+        Run several (frame, model_id) detections at once on the worker pool.
+        
+        Must not be called from inside a submit() job (it waits on the same pool).
+        
+        Args:
+            jobs: List of (frame, model_id) tuples
+        
+        Returns:
+            List of detection lists, in the same order as jobs
         """
-        return self._detect_with_model(frame, self.tower_model_id)
+        futures = [self._executor.submit(self._detect_with_model, frame, model_id)
+                   for frame, model_id in jobs]
+        return [future.result() for future in futures]
 
     def detect(self, frame):
         """
         Generic detect method that detects troops (main detection for overlays).
         """
-        return self.detect_troops(frame)
\ No newline at end of file
+        return self.detect_troops(frame)
+    
+    def submit(self, frame, model_id=None, frame_id=None, timestamp=None, detect_fn=None, channel=None):
+        """
+        Queue a detection without blocking the caller.
+        
+        Args:
+            frame: Frame to run detection on (must not be modified afterwards)
+            model_id: Model to use (defaults to the tower model)
+            frame_id: Id of the frame, copied into the DetectionResult
+            timestamp: Capture time of the frame, copied into the DetectionResult
+            detect_fn: Optional callable(frame) -> detections to run instead of
+                the plain model request (e.g. detect_towers)
+            channel: Optional caller key; results and in-flight limits are kept
+                per (model, channel)
+        
+        Returns:
+            True if queued, False if the model already has max_in_flight requests
+        """
+        model_id = model_id or self.tower_model_id
+        if frame is None or not model_id:
+            return False
+        key = self._key(model_id, channel)
+        
+        with self._lock:
+            if self._in_flight.get(key, 0) >= self.max_in_flight:
+                return False
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        
+        if detect_fn is None:
+            detect_fn = lambda f: self._detect_with_model(f, model_id)
+        if timestamp is None:
+            timestamp = time.time()
+        
+        try:
+            self._executor.submit(self._run_async, model_id, frame, frame_id, timestamp, detect_fn, key)
+        except RuntimeError:
+            # Executor already shut down
+            with self._lock:
+                self._in_flight[key] -= 1
+            return False
+        return True
+    
+    @staticmethod
+    def _key(model_id, channel):
+        return model_id if channel is None else (model_id, channel)
+    
+    def _run_async(self, model_id, frame, frame_id, timestamp, detect_fn, key):
+        """Worker body for submit(): run detection and publish the result."""
+        start = time.perf_counter()
+        try:
+            detections = detect_fn(frame)
+        except Exception as e:
+            print(f"Detection error: {e}")
+            detections = []
+        result = DetectionResult(model_id, frame_id, timestamp, detections,
+                                 time.perf_counter() - start)
+        
+        with self._lock:
+            self._in_flight[key] -= 1
+            latest = self._latest.get(key)
+            # Never replace a result with one from an older frame
+            if latest is None or frame_id is None or latest.frame_id is None or frame_id >= latest.frame_id:
+                self._latest[key] = result
+    
+    def poll(self, model_id=None, channel=None):
+        """
+        Return the most recent finished DetectionResult for a model (or None).
+        """
+        model_id = model_id or self.tower_model_id
+        with self._lock:
+            return self._latest.get(self._key(model_id, channel))
+    
+    def in_flight(self, model_id=None, channel=None):
+        """Number of requests currently running for a model."""
+        model_id = model_id or self.tower_model_id
+        with self._lock:
+            return self._in_flight.get(self._key(model_id, channel), 0)
+    
+    def channel(self, name):
+        """Return a DetectorChannel sharing this detector's pool under its own results."""
+        return DetectorChannel(self, name)
+    
+    def get_cache_stats(self):
+        """Return detection cache hit/miss counters (empty if caching is off)."""
+        return self.cache.get_stats() if self.cache is not None else {}
+    
+    def close(self):
+        """Stop the worker pool, release backends and close pooled connections."""
+        self._executor.shutdown(wait=False)
+        for backend in self._backends.values():
+            if backend is not None:
+                backend.close()
+        self.session.close()
+
+
+class DetectorChannel:
+    """
+    One caller's view of a shared RoboflowDetector.
+    
+    Exposes the same submit/poll interface, with results and in-flight limits
+    kept separate from other channels. Closing a channel leaves the shared
+    detector running (its owner closes it).
+    """
+    
+    def __init__(self, detector, name):
+        self.detector = detector
+        self.name = name
+        self.tower_model_id = detector.tower_model_id
+        self.tower_mosaic = detector.tower_mosaic
+    
+    def detect_towers(self, frame):
+        return self.detector.detect_towers(frame)
+    
+    def submit(self, frame, model_id=None, frame_id=None, timestamp=None, detect_fn=None):
+        return self.detector.submit(frame, model_id, frame_id, timestamp, detect_fn, channel=self.name)
+    
+    def poll(self, model_id=None):
+        return self.detector.poll(model_id, channel=self.name)
+    
+    def in_flight(self, model_id=None):
+        return self.detector.in_flight(model_id, channel=self.name)
+    
+    def get_cache_stats(self):
+        return self.detector.get_cache_stats()
+    
+    def close(self):
+        pass
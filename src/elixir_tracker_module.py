@@ -1,19 +1,53 @@
 """Elixir tracking and display module"""
 import cv2
 from src.config import ELIXIR_BAR_ROI
-from src.vision import get_user_elixir, ElixirTracker
+from src.vision import ElixirReader, ElixirTracker
 
 
 class ElixirDisplay:
     """Handles elixir tracking and rendering"""
     
-    def __init__(self):
-        self.tracker = ElixirTracker()
+    def __init__(self, clock=None):
+        """
+        Args:
+            clock: Clock driving elixir regeneration (defaults to the wall clock)
+        """
+        self.tracker = ElixirTracker(clock)
+        self.reader = ElixirReader()
+        self.last_elixir = 0
+        self.last_estimate = 0.0  # Fractional elixir from the bar's fill edge
     
     def update(self):
         """Update tracker state"""
         self.tracker.update()
     
+    def read(self, screenshot):
+        """Read the elixir bar from a screenshot and remember the value
+        
+        Args:
+            screenshot: Original screenshot for elixir detection
+        
+        Returns:
+            Elixir estimate
+        """
+        return self._remember(self.reader.read(screenshot))
+    
+    def read_region(self, region):
+        """Read an already cropped elixir bar (ELIXIR_BAR_ROI) and remember the value
+        
+        Args:
+            region: Elixir bar region, e.g. from FrameSource.get_regions() in ROI capture mode
+        
+        Returns:
+            Elixir estimate
+        """
+        return self._remember(self.reader.read_roi(region))
+    
+    def _remember(self, reading):
+        self.last_elixir = reading.count
+        self.last_estimate = reading.estimate
+        return self.last_elixir
+    
     def render(self, display_frame, screenshot):
         """Render elixir display on frame
         
@@ -24,32 +58,65 @@ class ElixirDisplay:
         Returns:
             Frame with elixir display rendered
         """
-        # Get elixir estimate
-        elixir = get_user_elixir(screenshot)
+        return self.draw(display_frame, self.read(screenshot))
+    
+    def _text_box(self, frame_height, text):
+        """Get the text origin and background rectangle of the elixir label"""
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 0.7
+        thickness = 2
+        text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
+        
+        # Bottom fifth of the frame
+        x_pos = 10
+        y_pos = int(frame_height * 4 / 5)
+        background = ((x_pos - 5, y_pos - text_size[1] - 5), (x_pos + text_size[0] + 5, y_pos + 5))
+        return (x_pos, y_pos), background
+    
+    def hud_rect(self, frame_shape, elixir=None):
+        """Get the rectangle draw() touches on a frame of this shape
+        
+        Returns:
+            (x1, y1, x2, y2) clipped to the frame
+        """
+        if elixir is None:
+            elixir = self.last_elixir
+        
+        # ROI outline (3px line) and the text background
+        x, y, w, h = ELIXIR_BAR_ROI
+        _, ((tx1, ty1), (tx2, ty2)) = self._text_box(frame_shape[0], f"E = {int(elixir)}")
+        x1 = min(x + 4 - 2, tx1)
+        y1 = min(y - 2, ty1)
+        x2 = max(x + w + 4 + 3, tx2 + 1)
+        y2 = max(y + h + 3, ty2 + 1)
+        return (max(0, x1), max(0, y1), min(frame_shape[1], x2), min(frame_shape[0], y2))
+    
+    def draw(self, display_frame, elixir=None):
+        """Draw the elixir HUD on frame in place
+        
+        Args:
+            display_frame: Frame to render on
+            elixir: Elixir value to show (defaults to the last value read)
+        
+        Returns:
+            Tuple of (frame with elixir display rendered, elixir)
+        """
+        if elixir is None:
+            elixir = self.last_elixir
         
         # Draw elixir bar ROI bounding box (white)
         x, y, w, h = ELIXIR_BAR_ROI
         cv2.rectangle(display_frame, (x + 4, y), (x + w + 4, y + h), (255, 255, 255), 3)
         
         # Add elixir info overlay at bottom fifth with black background
-        frame_height = display_frame.shape[0]
-        bottom_fifth_y = int(frame_height * 4 / 5)
-        
-        # Draw black background box for text
         text = f"E = {int(elixir)}"
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.7
-        thickness = 2
-        text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
+        origin, (top_left, bottom_right) = self._text_box(display_frame.shape[0], text)
         
         # Draw black rectangle behind text
-        x_pos = 10
-        y_pos = bottom_fifth_y
-        cv2.rectangle(display_frame, (x_pos - 5, y_pos - text_size[1] - 5), 
-                     (x_pos + text_size[0] + 5, y_pos + 5), (0, 0, 0), -1)
+        cv2.rectangle(display_frame, top_left, bottom_right, (0, 0, 0), -1)
         
         # Draw white text
-        cv2.putText(display_frame, text, (x_pos, y_pos),
-                   font, font_scale, (255, 255, 255), thickness)
+        cv2.putText(display_frame, text, origin,
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
         return display_frame, elixir
@@ -3,9 +3,7 @@ Game Events Handler
 Manages game events (left/right friendly/enemy down) and tile state updates.
 """
 
-import json
-import os
-import copy
+from src.tile_map import TileMap, tower_variant_index
 
 
 class GameEvents:
@@ -14,30 +12,36 @@ class GameEvents:
     def __init__(self):
         """Initialize game events handler."""
         self.shaded_tiles_file = "shaded_tiles.json"
-        self.original_tile_states = self._load_original_tiles()
-        self.current_tile_states = copy.deepcopy(self.original_tile_states)
+        self.tile_map = TileMap.load(self.shaded_tiles_file)
+        # Index into tile_map.variants (bit set per tower that is down)
+        self.variant_index = 0
+        self.current_tile_states = self.tile_map.variant(self.variant_index)
+        # Bumped whenever current_tile_states changes (lets the grid cache its layer)
+        self.version = 0
     
-    def _load_original_tiles(self):
-        """Load tile states from disk (fresh copy)."""
-        if os.path.exists(self.shaded_tiles_file):
-            try:
-                with open(self.shaded_tiles_file, 'r') as f:
-                    data = json.load(f)
-                    # Convert string keys to tuples
-                    states = {}
-                    for key, value in data.items():
-                        tile_tuple = tuple(map(int, key.split(',')))
-                        states[tile_tuple] = value
-                    return states
-            except Exception as e:
-                print(f"Error loading tile states: {e}")
-                return {}
-        return {}
+    @property
+    def original_tile_states(self):
+        """Tile states with every tower up (as loaded from shaded_tiles.json)."""
+        return self.tile_map.tiles
+    
+    def set_tower_states(self, tower_states):
+        """Switch tile states to match which princess towers are down.
+        
+        Args:
+            tower_states: Dict of LE/RE/LF/RF -> True if down
+                          (as returned by StateManager.get_tower_states)
+        """
+        index = tower_variant_index(tower_states)
+        if index != self.variant_index:
+            self.variant_index = index
+            self.current_tile_states = self.tile_map.variant(index)
+            self.version += 1
     
     def reset_to_original(self):
-        """Reset all tile states back to original (from shaded_tiles.json)."""
-        self.original_tile_states = self._load_original_tiles()
-        self.current_tile_states = copy.deepcopy(self.original_tile_states)
+        """Reset all tile states back to original (every tower up; no reload from disk)."""
+        self.variant_index = 0
+        self.current_tile_states = self.tile_map.variant(0)
+        self.version += 1
     
     def get_current_tile_states(self):
         """Get the current tile states (for overlay display)."""
@@ -54,5 +58,5 @@ def apply_event_to_overlay(grid_overlay, event_handler):
         grid_overlay: GridOverlay instance
         event_handler: GameEvents instance
     """
-    grid_overlay.tile_states = event_handler.get_current_tile_states()
+    grid_overlay.set_tile_states(event_handler.get_current_tile_states(), event_handler.version)
 
@@ -0,0 +1,403 @@
+"""
+Frame Sources
+Pluggable producers of BGR frames for the overlay pipeline.
+
+Every source exposes the same small interface as WindowCapture:
+- is_ready():       True once frames can be produced (window found, file opened)
+- get_screenshot(): next frame resized to RESIZE_WIDTH, or None
+- get_regions():    only the requested ROIs of the next frame (see ROI mode below)
+- exhausted:        True once a finite source has no more frames
+- last_timestamp:   capture time (seconds) of the last returned frame
+- live:             True for real-time capture (frames not taken in time are gone)
+- close():          release any handles
+
+Sources are created from a short spec string (see create_frame_source):
+    window[:<n>]             live emulator window, n-th match (Windows only)
+    video:<path>             recorded video file
+    images:<dir>             directory of PNG/JPG frames (sorted by name)
+    recording:<path>         match recording written with --record (src/recorder.py)
+    synthetic[:<count>]      generated arena-like frames (in memory)
+
+ROI mode: subsystems that only need a few regions (e.g. ELIXIR_BAR_ROI or the
+TOWER_ROIS) can call get_regions() instead of get_screenshot(); the window
+grabber then captures and scales just those rectangles. main.py --elixir-only
+reads the elixir bar this way.
+"""
+
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from .config import RESIZE_WIDTH, RESIZE_HEIGHT, ELIXIR_BAR_ROI
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def normalize_frame(img):
+    """Drop alpha and resize a raw frame to RESIZE_WIDTH, keeping aspect ratio."""
+    if img is None:
+        return None
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    elif img.shape[2] == 4:
+        img = img[:, :, :3]
+
+    h, w = img.shape[:2]
+    if w == 0 or h == 0:
+        return None
+    if w == RESIZE_WIDTH:
+        return img
+
+    target_height = int(RESIZE_WIDTH * (h / w))
+    return cv2.resize(img, (RESIZE_WIDTH, target_height))
+
+
+def frame_timestamp(source):
+    """Capture time of the source's last frame (wall time if the source has none)."""
+    timestamp = getattr(source, 'last_timestamp', None)
+    return timestamp if timestamp is not None else time.time()
+
+
+class FrameSource:
+    """Base class for all frame sources."""
+
+    live = False
+
+    def __init__(self):
+        self.exhausted = False
+        self.last_timestamp = None
+        self.frame_index = -1
+
+    def is_ready(self):
+        """Check if the source can produce frames"""
+        return True
+
+    def get_screenshot(self):
+        """Return the next frame (BGR numpy array) or None"""
+        raise NotImplementedError
+
+    def get_regions(self, regions):
+        """
+        Return only the requested regions of the next frame.
+
+        File-backed sources decode the full frame anyway, so this crops it;
+        WindowCapture overrides it to grab just the regions from the screen.
+
+        Args:
+            regions: Dict of name -> (x, y, width, height) in frame coordinates
+
+        Returns:
+            Dict of name -> BGR numpy array, or None if no frame is available
+        """
+        frame = self.get_screenshot()
+        if frame is None:
+            return None
+        return {name: frame[y:y + h, x:x + w] for name, (x, y, w, h) in regions.items()}
+
+    def close(self):
+        """Release any resources held by the source"""
+        pass
+
+    def __iter__(self):
+        while not self.exhausted:
+            frame = self.get_screenshot()
+            if frame is not None:
+                yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class _PacedSource(FrameSource):
+    """Finite source that can optionally be paced to a fixed frame rate."""
+
+    def __init__(self, fps=None, realtime=False):
+        super().__init__()
+        self.fps = fps
+        self.realtime = realtime
+        self._next_deadline = None
+
+    def _pace(self):
+        """Sleep until the next frame is due when replaying in real time."""
+        if not self.realtime or not self.fps:
+            return
+        now = time.perf_counter()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        delay = self._next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_deadline = max(self._next_deadline, now) + 1.0 / self.fps
+
+    def _stamp(self, timestamp=None):
+        """Record the timestamp of the frame about to be returned."""
+        self.frame_index += 1
+        if timestamp is None:
+            fps = self.fps or 30.0
+            timestamp = self.frame_index / fps
+        self.last_timestamp = timestamp
+
+
+class VideoFileSource(_PacedSource):
+    """Replays a recorded video file through cv2.VideoCapture."""
+
+    def __init__(self, path, loop=False, realtime=False):
+        """
+        Args:
+            path: Video file path
+            loop: Restart from the beginning when the file ends
+            realtime: Pace playback to the file's FPS instead of full speed
+        """
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        super().__init__(fps=fps or 30.0, realtime=realtime)
+        self._loop_offset = 0.0
+
+    def is_ready(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def get_screenshot(self):
+        if self.exhausted or not self.is_ready():
+            return None
+
+        ok, img = self.cap.read()
+        if not ok and self.loop and self.frame_index >= 0:
+            self._loop_offset = (self.last_timestamp or 0.0) + 1.0 / self.fps
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, img = self.cap.read()
+        if not ok:
+            self.exhausted = True
+            return None
+
+        self._pace()
+        pos_msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        timestamp = self._loop_offset + pos_msec / 1000.0 if pos_msec > 0 else None
+        self._stamp(timestamp)
+        return normalize_frame(img)
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirectorySource(_PacedSource):
+    """Replays a directory of still frames in file-name order."""
+
+    def __init__(self, directory, fps=30.0, loop=False, realtime=False):
+        """
+        Args:
+            directory: Folder containing PNG/JPG frames
+            fps: Nominal frame rate used for timestamps and pacing
+            loop: Restart from the first image after the last one
+            realtime: Pace playback to fps instead of full speed
+        """
+        super().__init__(fps=fps, realtime=realtime)
+        self.directory = directory
+        self.loop = loop
+        self.paths = sorted(
+            p for p in glob.glob(os.path.join(directory, '*'))
+            if p.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._position = 0
+
+    def is_ready(self):
+        return len(self.paths) > 0
+
+    def get_screenshot(self):
+        if self.exhausted or not self.paths:
+            return None
+
+        if self._position >= len(self.paths):
+            if not self.loop:
+                self.exhausted = True
+                return None
+            self._position = 0
+
+        img = cv2.imread(self.paths[self._position])
+        self._position += 1
+        if img is None:
+            print(f"[WARNING] Could not read frame {self.paths[self._position - 1]}")
+            return None
+
+        self._pace()
+        self._stamp()
+        return normalize_frame(img)
+
+
+class RecordingSource(_PacedSource):
+    """Replays a match recording (src/recorder.py) with its original timestamps."""
+
+    def __init__(self, path, loop=False, realtime=False, start=0, stop=None):
+        """
+        Args:
+            path: Recording file written by MatchRecorder
+            loop: Restart from the first frame after the last one
+            realtime: Pace playback to the recorded timestamps instead of full speed
+            start: First frame number to play
+            stop: Frame number to stop before (None = end of the recording)
+        """
+        super().__init__(fps=None, realtime=realtime)
+        from .recorder import RecordingReader
+        self.path = path
+        self.loop = loop
+        self.reader = RecordingReader(path) if os.path.exists(path) else None
+        count = self.reader.frame_count if self.reader else 0
+        self.start = max(0, start)
+        self.stop = count if stop is None else min(stop, count)
+        self._position = self.start
+        self._loop_offset = 0.0
+        self._first_timestamp = None
+        self._wall_start = None
+        self.last_data = None  # Side-channel data recorded with the last frame
+
+    def is_ready(self):
+        return self.reader is not None and self.stop > self.start
+
+    def _pace_to(self, timestamp):
+        """Sleep until a recorded timestamp is due (relative to the first frame)."""
+        if not self.realtime:
+            return
+        now = time.perf_counter()
+        if self._wall_start is None:
+            self._wall_start, self._first_timestamp = now, timestamp
+        delay = (timestamp - self._first_timestamp) - (now - self._wall_start)
+        if delay > 0:
+            time.sleep(delay)
+
+    def get_screenshot(self):
+        if self.exhausted or not self.is_ready():
+            return None
+
+        if self._position >= self.stop:
+            if not self.loop:
+                self.exhausted = True
+                return None
+            first, _, _ = self.reader.read(self.start, decode=False)
+            self._loop_offset = (self.last_timestamp or 0.0) - first + 1.0 / 30.0
+            self._position = self.start
+
+        timestamp, img, data = self.reader.read(self._position)
+        self._position += 1
+        timestamp += self._loop_offset
+        self._pace_to(timestamp)
+        self._stamp(timestamp)
+        self.last_data = data
+        return normalize_frame(img)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+class GeneratorSource(_PacedSource):
+    """Wraps any iterable of frames (or (timestamp, frame) pairs)."""
+
+    def __init__(self, frames, fps=30.0, realtime=False):
+        """
+        Args:
+            frames: Iterable yielding BGR frames or (timestamp, frame) tuples
+            fps: Nominal frame rate used for timestamps and pacing
+            realtime: Pace playback to fps instead of full speed
+        """
+        super().__init__(fps=fps, realtime=realtime)
+        self._iterator = iter(frames)
+
+    def get_screenshot(self):
+        if self.exhausted:
+            return None
+
+        try:
+            item = next(self._iterator)
+        except StopIteration:
+            self.exhausted = True
+            return None
+
+        timestamp = None
+        if isinstance(item, tuple):
+            timestamp, item = item
+
+        self._pace()
+        self._stamp(timestamp)
+        return normalize_frame(item)
+
+
+def synthetic_frames(count=None, width=RESIZE_WIDTH, height=RESIZE_HEIGHT, seed=0):
+    """
+    Generate arena-like frames with a moving elixir bar and a few blobs.
+
+    Args:
+        count: Number of frames to produce (None = endless)
+        width: Frame width
+        height: Frame height
+        seed: Random seed so runs are reproducible
+
+    Yields:
+        BGR frames of shape (height, width, 3)
+    """
+    rng = np.random.default_rng(seed)
+    base = np.zeros((height, width, 3), dtype=np.uint8)
+    base[:, :] = (60, 140, 70)  # Grass
+    cv2.rectangle(base, (0, height // 2 - 12), (width, height // 2 + 12), (160, 110, 40), -1)  # River
+    for cx, cy, color in ((0.22, 0.2, (40, 40, 200)), (0.78, 0.2, (40, 40, 200)),
+                          (0.22, 0.68, (200, 100, 40)), (0.78, 0.68, (200, 100, 40))):
+        center = (int(cx * width), int(cy * height))
+        cv2.rectangle(base, (center[0] - 25, center[1] - 30), (center[0] + 25, center[1] + 30), color, -1)
+
+    ex, ey, ew, eh = ELIXIR_BAR_ROI
+    i = 0
+    while count is None or i < count:
+        frame = base.copy()
+        if ey + eh <= height and ex + ew <= width:
+            cv2.rectangle(frame, (ex, ey), (ex + ew, ey + eh), (30, 30, 30), -1)
+            fill = int(ew * ((i % 110) / 110.0))
+            if fill > 0:
+                cv2.rectangle(frame, (ex, ey), (ex + fill, ey + eh), (200, 40, 170), -1)
+        for _ in range(3):
+            x = int(rng.integers(20, width - 20))
+            y = int(rng.integers(80, height // 2 + 200))
+            cv2.circle(frame, (x, y), 8, (int(rng.integers(0, 255)), 200, 255), -1)
+        yield frame
+        i += 1
+
+
+def create_frame_source(spec="window", realtime=False, loop=False):
+    """
+    Build a frame source from a spec string.
+
+    Args:
+        spec: 'window[:<n>]', 'video:<path>', 'images:<dir>', 'recording:<path>' or 'synthetic[:<count>]'
+        realtime: Pace file-backed sources to their frame rate
+        loop: Loop file-backed sources when they end
+
+    Returns:
+        FrameSource instance
+    """
+    kind, _, arg = (spec or "window").partition(':')
+    kind = kind.lower()
+
+    if kind == 'window':
+        # Imported lazily so non-Windows machines can use file sources
+        from .capture import WindowCapture
+        return WindowCapture(index=int(arg) if arg else 0)
+    if kind == 'video':
+        return VideoFileSource(arg, loop=loop, realtime=realtime)
+    if kind in ('images', 'dir'):
+        return ImageDirectorySource(arg, loop=loop, realtime=realtime)
+    if kind == 'recording':
+        return RecordingSource(arg, loop=loop, realtime=realtime)
+    if kind == 'synthetic':
+        count = int(arg) if arg else None
+        return GeneratorSource(synthetic_frames(count), realtime=realtime)
+
+    raise ValueError(f"Unknown frame source '{spec}'")
@@ -0,0 +1,232 @@
+"""
+Inference Backends
+Pluggable ways of running a detection model behind RoboflowDetector.
+
+Every backend turns a BGR frame into the same detection dicts the Roboflow
+HTTP API produces:
+    {'class': str, 'confidence': float, 'box': [center_x, center_y, width, height]}
+
+Backends are registered by name and picked per model in model_backends.json
+(see MODEL_BACKENDS in config.py):
+    roboflow      Roboflow hosted HTTP API (default)
+    opencv        exported ONNX model run locally with OpenCV DNN (CPU)
+    onnxruntime   exported ONNX model run locally with onnxruntime (CPU)
+"""
+
+import base64
+import threading
+
+import cv2
+import numpy as np
+
+BACKENDS = {}
+
+
+def register_backend(name):
+    """Class decorator adding a backend to the registry under name."""
+    def decorator(cls):
+        BACKENDS[name] = cls
+        cls.name = name
+        return cls
+    return decorator
+
+
+def create_backend(name, **kwargs):
+    """Instantiate a registered backend by name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name](**kwargs)
+
+
+def encode_frame(frame, quality=None):
+    """JPEG-encode a frame and return it base64 encoded (Roboflow request body)."""
+    params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)] if quality else []
+    _, buffer = cv2.imencode('.jpg', frame, params)
+    return base64.b64encode(buffer).decode('utf-8')
+
+
+class InferenceBackend:
+    """Base class: run one model on a frame."""
+
+    name = None
+
+    def predict(self, frame):
+        """Return a list of detection dicts for frame (None if no valid result)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+@register_backend('roboflow')
+class RoboflowHttpBackend(InferenceBackend):
+    """Roboflow hosted inference over HTTP (base64 JPEG body)."""
+
+    def __init__(self, model_id, session, api_key, api_url, timeout=2.0, jpeg_quality=None):
+        if not api_key:
+            raise ValueError(
+                "Missing required environment variable ROBOFLOW_API_KEY. "
+                "Please create a .env file."
+            )
+        self.model_id = model_id
+        self.session = session
+        self.api_key = api_key
+        self.url = f"{api_url}/{model_id}"
+        self.timeout = timeout
+        self.jpeg_quality = jpeg_quality
+
+    def predict(self, frame):
+        img_base64 = encode_frame(frame, self.jpeg_quality)
+
+        response = self.session.post(
+            self.url,
+            params={'api_key': self.api_key},
+            data=img_base64,
+            timeout=self.timeout
+        )
+
+        if response.status_code != 200:
+            return None
+
+        result = response.json()
+        predictions = result.get('predictions', [])
+
+        detections = []
+        for pred in predictions:
+            detections.append({
+                'class': pred.get('class', 'Unknown'),
+                'confidence': float(pred.get('confidence', 0)),
+                'box': [
+                    float(pred.get('x', 0)),
+                    float(pred.get('y', 0)),
+                    float(pred.get('width', 0)),
+                    float(pred.get('height', 0))
+                ]
+            })
+        return detections
+
+
+def _load_class_names(classes):
+    """Accept a list of class names or a path to a text file with one name per line."""
+    if classes is None:
+        return []
+    if isinstance(classes, str):
+        with open(classes, 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+    return list(classes)
+
+
+class _LocalOnnxBackend(InferenceBackend):
+    """Shared pre/post-processing for exported YOLO-style ONNX detectors."""
+
+    def __init__(self, model_path, classes=None, input_size=640,
+                 confidence_threshold=0.4, nms_threshold=0.45, model_id=None):
+        self.model_id = model_id
+        self.model_path = model_path
+        self.classes = _load_class_names(classes)
+        self.input_size = int(input_size)
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+
+    def _letterbox(self, frame):
+        """Resize keeping aspect ratio and pad to a square input. Returns (blob, scale, pad_x, pad_y)."""
+        h, w = frame.shape[:2]
+        size = self.input_size
+        scale = min(size / w, size / h)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h))
+        blob = cv2.dnn.blobFromImage(canvas, 1 / 255.0, (size, size), swapRB=True, crop=False)
+        return blob, scale, pad_x, pad_y
+
+    def _postprocess(self, output, scale, pad_x, pad_y):
+        """Decode raw YOLO output into detection dicts in frame coordinates."""
+        preds = np.squeeze(output)
+        if preds.ndim != 2:
+            return []
+
+        num_classes = len(self.classes)
+        # YOLOv8 exports (4 + nc, N); YOLOv5 exports (N, 5 + nc)
+        if preds.shape[0] < preds.shape[1]:
+            preds = preds.T
+
+        if num_classes and preds.shape[1] == 5 + num_classes:
+            scores = preds[:, 5:] * preds[:, 4:5]
+        else:
+            scores = preds[:, 4:]
+
+        class_ids = np.argmax(scores, axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences >= self.confidence_threshold
+        if not np.any(keep):
+            return []
+
+        boxes = preds[keep, :4].astype(np.float32)
+        confidences = confidences[keep].astype(np.float32)
+        class_ids = class_ids[keep]
+
+        # Undo letterbox: boxes are (cx, cy, w, h) in model input pixels
+        boxes[:, 0] = (boxes[:, 0] - pad_x) / scale
+        boxes[:, 1] = (boxes[:, 1] - pad_y) / scale
+        boxes[:, 2] /= scale
+        boxes[:, 3] /= scale
+
+        corner_boxes = [[float(cx - w / 2), float(cy - h / 2), float(w), float(h)] for cx, cy, w, h in boxes]
+        indices = cv2.dnn.NMSBoxes(corner_boxes, confidences.tolist(),
+                                   self.confidence_threshold, self.nms_threshold)
+
+        detections = []
+        for i in np.array(indices).flatten():
+            class_id = int(class_ids[i])
+            detections.append({
+                'class': self.classes[class_id] if class_id < num_classes else str(class_id),
+                'confidence': float(confidences[i]),
+                'box': [float(v) for v in boxes[i]]
+            })
+        return detections
+
+
+@register_backend('opencv')
+class OpenCVDnnBackend(_LocalOnnxBackend):
+    """Runs an exported ONNX model on the CPU with OpenCV DNN."""
+
+    def __init__(self, model_path, **kwargs):
+        super().__init__(model_path, **kwargs)
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        # cv2.dnn.Net is not safe to call from several detector workers at once
+        self._lock = threading.Lock()
+
+    def predict(self, frame):
+        blob, scale, pad_x, pad_y = self._letterbox(frame)
+        with self._lock:
+            self.net.setInput(blob)
+            output = self.net.forward()
+        return self._postprocess(output, scale, pad_x, pad_y)
+
+
+@register_backend('onnxruntime')
+class OnnxRuntimeBackend(_LocalOnnxBackend):
+    """Runs an exported ONNX model on the CPU with onnxruntime (optional dependency)."""
+
+    def __init__(self, model_path, threads=None, **kwargs):
+        super().__init__(model_path, **kwargs)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("onnxruntime is not installed (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, frame):
+        blob, scale, pad_x, pad_y = self._letterbox(frame)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return self._postprocess(output, scale, pad_x, pad_y)
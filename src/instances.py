@@ -0,0 +1,217 @@
+"""
+Multiple Game Instances
+Tracks several games (emulator windows or file-backed sources) from one process.
+
+Each GameInstance has its own frame source, FrameClock and OverlaySystems, so
+elixir tracking, tower state and grid tiles never leak between games. What is
+shared lives in the InstanceManager:
+
+- one RoboflowDetector (worker pool, keep-alive session, results cache); each
+  instance talks to it through its own DetectorChannel, so results and
+  in-flight limits stay per instance
+- one thread pool that steps the instances concurrently (capture, HSV
+  conversion, blending and JPEG encoding release the GIL)
+
+Output is per instance: step() returns each instance's composed frame and
+get_states() its elixir and tower state.
+
+    python main.py --instances 3                       # first 3 emulator windows
+    python main.py --source video:a.mp4 --source video:b.mp4
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.clock import FrameClock
+from src.config import INSTANCE_WORKERS, TOWER_STATE_SOURCE
+from src.elixir_tracker_module import ElixirDisplay
+from src.frame_sources import create_frame_source, frame_timestamp
+from src.systems import OverlaySystems, analyze_frame, render_frame
+
+
+def _unique_names(names):
+    """Append ' #<position>' to every repeat of an earlier name (e.g. the same --source twice)."""
+    seen = set()
+    unique = []
+    for i, name in enumerate(names):
+        if name in seen:
+            name = f"{name} #{i + 1}"
+        seen.add(name)
+        unique.append(name)
+    return unique
+
+
+class GameInstance:
+    """One game: frame source, clock, subsystems and latest output."""
+
+    def __init__(self, name, source, detector_for=None):
+        """
+        Args:
+            name: Instance name (window title, source spec)
+            source: FrameSource of this game
+            detector_for: Callable(name) -> shared detector channel (or None)
+        """
+        self.name = name
+        self.source = source
+        self.detector_for = detector_for
+        self.clock = FrameClock()
+        self.systems = None
+        self.display_frame = None
+        self.frames = 0
+        self.finished = False
+        self._first_frame = None
+
+    def _create_towers(self, frame_width, frame_height):
+        try:
+            from src.tower_display import TowerDisplay
+            detector = self.detector_for(self.name) if self.detector_for else None
+            return TowerDisplay(frame_width, frame_height, self.clock, detector=detector)
+        except Exception as e:
+            print(f"[ERROR] Tower detection failed for {self.name}: {e}")
+            return None
+
+    def start(self, settings_state):
+        """
+        Create the subsystems once the source delivers its first frame.
+
+        Returns:
+            True if the instance is running
+        """
+        if self.systems is not None:
+            return True
+        if self.finished or not self.source.is_ready():
+            return False
+        frame = self.source.get_screenshot()
+        if frame is None:
+            self.finished = self.source.exhausted
+            return False
+
+        frame_height, frame_width = frame.shape[:2]
+        self.clock.set(frame_timestamp(self.source))
+        self.systems = OverlaySystems(frame_width, frame_height, {
+            'elixir': lambda: ElixirDisplay(self.clock),
+            'towers': lambda: self._create_towers(frame_width, frame_height),
+        })
+        self.systems.configure(**settings_state)
+        self._first_frame = frame
+        return True
+
+    def step(self):
+        """
+        Capture, analyze and render one frame.
+
+        Returns:
+            The composed frame (the instance's reused buffer), or None if no
+            new frame was available
+        """
+        if self.systems is None or self.finished:
+            return None
+        frame, self._first_frame = self._first_frame, None
+        if frame is None:
+            frame = self.source.get_screenshot()
+        if frame is None:
+            self.finished = self.source.exhausted
+            return None
+
+        timestamp = self.clock.set(frame_timestamp(self.source))
+        analyze_frame(self.systems, frame, timestamp=timestamp)
+        self.display_frame = render_frame(self.systems, frame)
+        self.frames += 1
+        return self.display_frame
+
+    def get_state(self):
+        """Elixir and tower state of this game."""
+        state = {'frames': self.frames, 'time': self.clock.now()}
+        if self.systems is None:
+            return state
+        elixir = self.systems.get('elixir')
+        if elixir:
+            state['elixir'] = elixir.last_elixir
+            state['elixir_estimate'] = elixir.last_estimate
+        towers = self.systems.get('towers')
+        if towers:
+            state['towers'] = towers.get_tower_states()
+        return state
+
+    def close(self):
+        if self.systems is not None:
+            self.systems.close()
+        self.source.close()
+
+
+class InstanceManager:
+    """Runs N GameInstances with a shared detector and worker threads."""
+
+    def __init__(self, instances, workers=INSTANCE_WORKERS):
+        """
+        Args:
+            instances: List of (name, FrameSource); repeated names get an index
+                       suffix, since outputs and detector channels are keyed by name
+            workers: Threads stepping instances concurrently (0 = one per instance)
+        """
+        names = _unique_names([name for name, _ in instances])
+        self.instances = [
+            GameInstance(name, source, self.detector_for) for name, (_, source) in zip(names, instances)
+        ]
+        self._detector = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or max(1, len(self.instances)), thread_name_prefix="instance"
+        )
+
+    @classmethod
+    def from_specs(cls, specs, realtime=False, loop=False, **kwargs):
+        """Create one instance per frame source spec (e.g. several video: files)."""
+        return cls([(spec, create_frame_source(spec, realtime=realtime, loop=loop)) for spec in specs], **kwargs)
+
+    @classmethod
+    def discover(cls, limit=None, **kwargs):
+        """Create one instance per emulator window found (Windows only)."""
+        from src.capture import WindowCapture, find_windows
+
+        windows = find_windows()[:limit] if limit else find_windows()
+        return cls([(f"{title} [{hwnd}]", WindowCapture(hwnd=hwnd)) for hwnd, title in windows], **kwargs)
+
+    def detector_for(self, name):
+        """Shared detector channel for an instance (None when towers need no model)."""
+        if TOWER_STATE_SOURCE not in ('model', 'both'):
+            return None
+        if self._detector is None:
+            from src.detector import RoboflowDetector
+            self._detector = RoboflowDetector()
+        return self._detector.channel(name)
+
+    def configure(self, **settings_state):
+        """Apply settings (OverlaySystems.configure arguments) to every running instance."""
+        for instance in self.instances:
+            if instance.systems is not None:
+                instance.systems.configure(**settings_state)
+
+    def step(self, settings_state):
+        """
+        Step every instance once, concurrently.
+
+        Args:
+            settings_state: Settings applied to instances that start this step
+
+        Returns:
+            Dict of instance name -> composed frame (None if it had no new frame)
+        """
+        for instance in self.instances:
+            instance.start(settings_state)
+        futures = {instance.name: self._executor.submit(instance.step) for instance in self.instances}
+        return {name: future.result() for name, future in futures.items()}
+
+    @property
+    def finished(self):
+        """True when every instance's (finite) source has ended."""
+        return all(instance.finished for instance in self.instances)
+
+    def get_states(self):
+        """Dict of instance name -> elixir/tower state."""
+        return {instance.name: instance.get_state() for instance in self.instances}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for instance in self.instances:
+            instance.close()
+        if self._detector is not None:
+            self._detector.close()
@@ -0,0 +1,228 @@
+"""
+Offline Match Analysis
+Runs the overlay's own elixir reader, tower state tracking and detectors over a
+recorded match and summarizes it (used by tools/batch_analyze.py).
+
+A match is any frame source spec (recording:, video:, images:) or a path that
+match_source_spec() can map to one. Time is frame time (FrameClock), so the
+result only depends on the recording, never on how fast it was processed.
+
+Tower detections come from one of:
+    pixels     TowerPixelDetector on every frame (no network, the default)
+    recorded   detections stored next to each frame by --record
+    model      RoboflowDetector.detect_towers on every analyze_every-th frame
+"""
+
+import os
+from collections import defaultdict
+
+from src.clock import FrameClock
+from src.frame_sources import IMAGE_EXTENSIONS, create_frame_source
+from src.recorder import FILE_MAGIC
+from src.state_manager import StateManager
+from src.vision import ElixirReader
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+TOWER_SOURCES = ('pixels', 'recorded', 'model')
+
+
+def match_source_spec(path):
+    """
+    Frame source spec for a match path (None if it is not a match).
+
+    Recordings are recognized by their magic bytes, videos by extension and
+    directories when they contain at least one image.
+    """
+    if ':' in path and path.split(':', 1)[0] in ('recording', 'video', 'images', 'dir'):
+        return path
+    if os.path.isdir(path):
+        if any(name.lower().endswith(IMAGE_EXTENSIONS) for name in os.listdir(path)):
+            return f"images:{path}"
+        return None
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        return f"video:{path}"
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(FILE_MAGIC)) == FILE_MAGIC:
+                return f"recording:{path}"
+    except OSError:
+        pass
+    return None
+
+
+class MatchAnalyzer:
+    """Accumulates the per-frame results of one match into a summary."""
+
+    def __init__(self, frame_width, frame_height, tower_source='pixels', detector=None, analyze_every=1):
+        """
+        Args:
+            frame_width: Width of the match frames
+            frame_height: Height of the match frames
+            tower_source: 'pixels', 'recorded' or 'model' (see module docstring)
+            detector: RoboflowDetector for 'model' (created on demand)
+            analyze_every: Run tower detection on every Nth frame only
+        """
+        if tower_source not in TOWER_SOURCES:
+            raise ValueError(f"Unknown tower source '{tower_source}' (expected one of {TOWER_SOURCES})")
+        self.tower_source = tower_source
+        self.analyze_every = max(1, analyze_every)
+        self.clock = FrameClock()
+        self.reader = ElixirReader()
+        self.state_manager = StateManager(frame_width, frame_height, self.clock)
+
+        self.pixel_detector = None
+        self.detector = None
+        if tower_source == 'pixels':
+            from src.tower_pixel_detector import TowerPixelDetector
+            self.pixel_detector = TowerPixelDetector()
+        elif tower_source == 'model':
+            if detector is None:
+                from src.detector import RoboflowDetector
+                detector = RoboflowDetector()
+            self.detector = detector
+
+        self.frames = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.elixir_timeline = []  # [time, count, estimate] whenever the count changes
+        self.tower_events = []
+        self._last_count = None
+        self._tower_states = {}
+        self._recorded_frame = None
+        self._detection_frames = 0
+        self._class_counts = defaultdict(int)
+        self._class_confidence = defaultdict(float)
+
+    def _tower_detections(self, frame, data):
+        if self.frames % self.analyze_every:
+            return None
+        if self.pixel_detector is not None:
+            return self.pixel_detector.detect(frame)
+        if self.detector is not None:
+            return self.detector.detect_towers(frame)
+        if data is None:
+            return None
+        # Recorded detections repeat until the next model result; use each result once
+        result_frame = data.get('detections_frame')
+        if result_frame is not None and result_frame == self._recorded_frame:
+            return None
+        self._recorded_frame = result_frame
+        return data.get('detections')
+
+    def add_frame(self, frame, timestamp, data=None):
+        """
+        Analyze one frame.
+
+        Args:
+            frame: BGR frame (may be None for 'recorded' towers without images)
+            timestamp: Capture time in seconds
+            data: Side data recorded with the frame (RecordingSource.last_data)
+        """
+        now = self.clock.set(timestamp)
+        if self.first_timestamp is None:
+            self.first_timestamp = now
+        self.last_timestamp = now
+
+        reading = self.reader.read(frame)
+        if reading.count != self._last_count:
+            self.elixir_timeline.append([round(now, 3), reading.count, round(reading.estimate, 2)])
+            self._last_count = reading.count
+
+        detections = self._tower_detections(frame, data)
+        if detections is not None:
+            self.state_manager.update(detections, now)
+            if detections:
+                self._detection_frames += 1
+            for det in detections:
+                cls = det.get('class', 'unknown')
+                self._class_counts[cls] += 1
+                self._class_confidence[cls] += det.get('confidence', 0.0)
+
+        states = self.state_manager.get_tower_states()
+        for key, down in states.items():
+            if down != self._tower_states.get(key, False):
+                self.tower_events.append({
+                    'time': round(now, 3), 'frame': self.frames, 'tower': key,
+                    'state': 'down' if down else 'up',
+                })
+        self._tower_states = states
+        self.frames += 1
+
+    def summary(self):
+        """JSON-serializable summary of everything seen so far."""
+        duration = (self.last_timestamp - self.first_timestamp) if self.frames else 0.0
+        counts = [count for _, count, _ in self.elixir_timeline]
+        return {
+            'frames': self.frames,
+            'duration': round(duration, 3),
+            'elixir': {
+                'timeline': self.elixir_timeline,
+                'changes': len(self.elixir_timeline),
+                'max': max(counts) if counts else 0,
+            },
+            'towers': {
+                'source': self.tower_source,
+                'events': self.tower_events,
+                'final_states': dict(self._tower_states),
+            },
+            'detections': {
+                'frames_with_detections': self._detection_frames,
+                'classes': {
+                    cls: {
+                        'count': count,
+                        'mean_confidence': round(self._class_confidence[cls] / count, 4),
+                    }
+                    for cls, count in sorted(self._class_counts.items())
+                },
+            },
+        }
+
+    def close(self):
+        if self.detector is not None:
+            self.detector.close()
+
+
+def analyze_match(path, tower_source='pixels', analyze_every=1, max_frames=None):
+    """
+    Analyze one recorded match.
+
+    Args:
+        path: Match path or frame source spec
+        tower_source: 'pixels', 'recorded' or 'model'
+        analyze_every: Run tower detection on every Nth frame
+        max_frames: Stop after this many frames (None = whole match)
+
+    Returns:
+        Summary dict (see MatchAnalyzer.summary) with the match 'source' added
+    """
+    spec = match_source_spec(path)
+    if spec is None:
+        raise ValueError(f"{path} is not a recording, video or image directory")
+    if tower_source == 'recorded' and not spec.startswith('recording:'):
+        raise ValueError(f"{path}: recorded tower detections need a recording: source")
+
+    source = create_frame_source(spec)
+    analyzer = None
+    try:
+        if not source.is_ready():
+            raise ValueError(f"Could not open {spec}")
+        while not source.exhausted:
+            if max_frames is not None and analyzer is not None and analyzer.frames >= max_frames:
+                break
+            frame = source.get_screenshot()
+            if frame is None:
+                continue
+            if analyzer is None:
+                height, width = frame.shape[:2]
+                analyzer = MatchAnalyzer(width, height, tower_source, analyze_every=analyze_every)
+            analyzer.add_frame(frame, source.last_timestamp, getattr(source, 'last_data', None))
+        if analyzer is None:
+            raise ValueError(f"{spec} produced no frames")
+        result = analyzer.summary()
+    finally:
+        if analyzer is not None:
+            analyzer.close()
+        source.close()
+
+    result['source'] = spec
+    return result
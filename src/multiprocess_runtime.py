@@ -0,0 +1,506 @@
+"""
+Multi-Process Runtime
+Runs capture, each analysis subsystem and the renderer in separate processes
+(python main.py --multiprocess), so grid blending, HSV conversion and JPEG
+encoding no longer share one interpreter's GIL with capture.
+
+    capture process --> SharedFrameRing (shared memory, zero-copy)
+                           |          |             |
+                     elixir process  towers process  renderer process
+                           |          |             ^    (grid, HUD, imshow,
+                           +----------+-- messages -+     settings window)
+                                      |             |
+                                   supervisor (this process)
+
+Frames never travel through a pipe: the capture process writes them into the
+shared ring and every other process reads them in place. Only small messages
+go through the message queue, as (kind, sender, payload) tuples:
+
+    ('state', 'elixir'|'towers', (seq, timestamp, result))   analysis result (sent on change)
+    ('settings', 'renderer', {'elixir': bool, 'towers': bool})
+    ('finished', 'capture', frames)                          finite source ended
+    ('quit', 'renderer', None)                               'q' pressed or window closed
+    ('stats', sender, {...})                                 ring reader counters at exit
+    ('unavailable', sender, reason)                          subsystem cannot run here (then exit 0)
+    ('error', sender, text)                                  unhandled exception (then exit 1)
+
+The supervisor forwards state to the renderer, which keeps the latest result
+per subsystem, starts/stops analysis processes to follow the settings window,
+and restarts any process that crashes (up to MP_MAX_RESTARTS times, waiting
+MP_RESTART_BACKOFF seconds between attempts, doubled each time).
+"""
+
+import multiprocessing as mp
+import queue
+import time
+import traceback
+
+import cv2
+
+from src.config import (
+    ENABLE_ELIXIR_TRACKING, ENABLE_TOWER_DETECTION, MP_MAX_RESTARTS, MP_RESTART_BACKOFF
+)
+from src.shared_frames import SharedFrameRing, RingReader
+from src.tower_display import TowerDisplay
+
+ANALYSIS_PROCESSES = ('elixir', 'towers')
+
+
+class SubsystemUnavailable(Exception):
+    """A subsystem cannot run with this configuration (restarting would not help)."""
+
+
+# Worker processes (module-level functions so they can be spawned on Windows)
+
+def _run_worker(name, messages, body):
+    """Run a worker body, reporting unhandled exceptions to the supervisor."""
+    try:
+        body()
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        messages.put(('error', name, traceback.format_exc()))
+        raise SystemExit(1)
+
+
+def capture_main(spec, realtime, loop, ring, messages, stop):
+    """Capture process: write frames from a frame source into the ring."""
+    def body():
+        from src.frame_sources import create_frame_source
+
+        source = create_frame_source(spec, realtime=realtime, loop=loop)
+        while not source.is_ready() and not stop.is_set():
+            time.sleep(1)
+        height, width = ring.shape[:2]
+        frames = 0
+        try:
+            while not stop.is_set():
+                frame = source.get_screenshot()
+                if frame is None:
+                    if source.exhausted:
+                        break
+                    continue
+                if frame.shape[:2] != (height, width):
+                    frame = cv2.resize(frame, (width, height))
+                timestamp = source.last_timestamp
+                seq, view = ring.reserve()
+                view[...] = frame
+                ring.commit(seq, timestamp if timestamp is not None else time.time())
+                frames += 1
+        finally:
+            source.close()
+        if not stop.is_set():
+            ring.close_stream()
+            messages.put(('finished', 'capture', frames))
+        ring.close()
+    _run_worker('capture', messages, body)
+
+
+class ElixirAnalysis:
+    """Elixir bar reading; reports only when the reading changes."""
+
+    def __init__(self, frame_width, frame_height):
+        from src.vision import ElixirReader
+        self.reader = ElixirReader()
+        self.last = None
+
+    def process(self, packet):
+        reading = self.reader.read(packet.frame)
+        if reading == self.last:
+            return None
+        self.last = reading
+        return {'count': reading.count, 'estimate': reading.estimate}
+
+
+class TowerAnalysis:
+    """Tower detection and state tracking; reports when states or detections change."""
+
+    def __init__(self, frame_width, frame_height):
+        from src.clock import FrameClock
+        self.clock = FrameClock()
+        self.towers = TowerDisplay(frame_width, frame_height, self.clock)
+        if not self.towers.enabled:
+            # e.g. no ROBOFLOW_API_KEY in model mode (TowerDisplay printed why)
+            raise SubsystemUnavailable("tower detection failed to initialize")
+        self.last = None
+
+    def process(self, packet):
+        self.clock.set(packet.timestamp)
+        frame = packet.frame
+        if self.towers.detector is not None:
+            # The detector encodes on its own threads after we return; the ring
+            # slot may be reused by then
+            frame = frame.copy()
+        self.towers.analyze(frame, timestamp=packet.timestamp)
+        states = self.towers.get_tower_states()
+        key = (tuple(sorted(states.items())), self.towers.detections_frame_id)
+        if key == self.last:
+            return None
+        self.last = key
+        return {
+            'states': states,
+            'detections': list(self.towers.detections_cache),
+            'frame': self.towers.detections_frame_id,
+        }
+
+    def close(self):
+        self.towers.close()
+
+
+ANALYZERS = {'elixir': ElixirAnalysis, 'towers': TowerAnalysis}
+
+
+def analysis_main(name, ring, messages, frame_width, frame_height, stop):
+    """Analysis process: run one subsystem on the newest frame in the ring."""
+    def body():
+        try:
+            analysis = ANALYZERS[name](frame_width, frame_height)
+        except SubsystemUnavailable as e:
+            messages.put(('unavailable', name, str(e)))
+            ring.close()
+            return
+        reader = RingReader(ring, latest=True)
+        try:
+            while not stop.is_set():
+                packet = reader.next(timeout=0.1)
+                if packet is None:
+                    if ring.closed:
+                        break
+                    continue
+                result = analysis.process(packet)
+                # Discard results computed from a frame overwritten mid-read
+                if reader.valid(packet) and result is not None:
+                    messages.put(('state', name, (packet.frame_id, packet.timestamp, result)))
+                packet = None
+        finally:
+            if hasattr(analysis, 'close'):
+                analysis.close()
+            messages.put(('stats', name, reader.get_stats()))
+            reader = None
+            ring.close()
+    _run_worker(name, messages, body)
+
+
+class RemoteTowers(TowerDisplay):
+    """Tower results received from the towers process, drawn with TowerDisplay's code."""
+
+    def __init__(self, frame_width, frame_height):
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.confidence_threshold = 0.4
+        self.detector = None
+        self.state_manager = None
+        self.detections_cache = []
+        self.detections_frame_id = None
+        self.tower_states = {}
+        self.enabled = True
+
+    def apply(self, result):
+        self.tower_states = result['states']
+        self.detections_cache = result['detections']
+        self.detections_frame_id = result['frame']
+
+    def get_tower_states(self):
+        return dict(self.tower_states)
+
+
+def render_main(ring, updates, messages, frame_width, frame_height, stop):
+    """Renderer process: settings window, compositor and cv2.imshow."""
+    def body():
+        from src.clock import FrameClock
+        from src.elixir_tracker_module import ElixirDisplay
+        from src.events import apply_event_to_overlay
+        from src.settings_window import SettingsWindow
+        from src.systems import OverlaySystems
+
+        settings = SettingsWindow()
+        clock = FrameClock()
+        systems = OverlaySystems(frame_width, frame_height, {
+            'elixir': lambda: ElixirDisplay(clock),
+            'towers': lambda: RemoteTowers(frame_width, frame_height),
+        })
+        latest = {}
+        last_state = None
+        reader = RingReader(ring, latest=True)
+        try:
+            while not stop.is_set():
+                settings.update_window()
+                if not settings.running:
+                    messages.put(('quit', 'renderer', None))
+                    break
+                state = {
+                    'grid_opacity': settings.get_grid_opacity(),
+                    'elixir': settings.is_elixir_enabled(),
+                    'towers': settings.is_towers_enabled(),
+                }
+                if state != last_state:
+                    systems.configure(**state)
+                    messages.put(('settings', 'renderer', {name: state[name] for name in ANALYSIS_PROCESSES}))
+                    last_state = state
+
+                # Keep only the newest result per subsystem
+                while True:
+                    try:
+                        kind, name, payload = updates.get_nowait()
+                    except queue.Empty:
+                        break
+                    latest[name] = payload
+                elixir = systems.get('elixir')
+                if elixir and 'elixir' in latest:
+                    elixir.last_elixir = latest['elixir'][2]['count']
+                    elixir.last_estimate = latest['elixir'][2]['estimate']
+                towers = systems.get('towers')
+                if towers and 'towers' in latest:
+                    towers.apply(latest['towers'][2])
+
+                packet = reader.next(timeout=0.05)
+                if packet is None:
+                    if ring.closed:
+                        break
+                    continue
+                clock.set(packet.timestamp)
+                if towers:
+                    systems.events.set_tower_states(towers.get_tower_states())
+                apply_event_to_overlay(systems.grid, systems.events)
+                if elixir:
+                    elixir.update()
+                display_frame = systems.compositor.compose(packet.frame)
+                if not reader.valid(packet):
+                    continue  # Overwritten while being copied; show the next one
+                packet = None
+
+                cv2.imshow("Clash Royale Overlay", display_frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    messages.put(('quit', 'renderer', None))
+                    break
+        finally:
+            messages.put(('stats', 'renderer', reader.get_stats()))
+            reader = None
+            systems.close()
+            settings.close()
+            cv2.destroyAllWindows()
+            ring.close()
+    _run_worker('renderer', messages, body)
+
+
+class ManagedProcess:
+    """A supervised child process: how to start it and how often it was restarted."""
+
+    def __init__(self, name, target, args):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.process = None
+        self.stop = None
+        self.restarts = 0
+        self.restart_at = None  # Pending restart time after a crash
+        self.wanted = False     # Should be running
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class ProcessSupervisor:
+    """Starts, stops and restarts child processes."""
+
+    def __init__(self, context=None, max_restarts=MP_MAX_RESTARTS, backoff=MP_RESTART_BACKOFF):
+        """
+        Args:
+            context: multiprocessing context (spawn by default, as on Windows)
+            max_restarts: Crashes tolerated per process before giving up on it
+            backoff: Seconds before the first restart (doubled after each crash)
+        """
+        self.context = context or mp.get_context('spawn')
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.processes = {}
+
+    def add(self, name, target, args=()):
+        """Register a process; target is called as target(*args, stop_event)."""
+        self.processes[name] = ManagedProcess(name, target, args)
+
+    def start(self, name):
+        managed = self.processes[name]
+        managed.wanted = True
+        managed.restart_at = None
+        if managed.alive:
+            return
+        managed.stop = self.context.Event()
+        managed.process = self.context.Process(
+            target=managed.target, args=managed.args + (managed.stop,), name=name, daemon=True
+        )
+        managed.process.start()
+
+    def stop(self, name, timeout=2.0):
+        """Ask a process to exit; terminate it if it does not within timeout."""
+        managed = self.processes[name]
+        managed.wanted = False
+        managed.restart_at = None
+        if managed.process is None:
+            return
+        managed.stop.set()
+        managed.process.join(timeout)
+        if managed.process.is_alive():
+            print(f"[WARNING] {name} process did not stop; terminating")
+            managed.process.terminate()
+            managed.process.join(timeout)
+        managed.process = None
+
+    def poll(self):
+        """
+        Restart crashed processes.
+
+        Returns:
+            List of (name, exitcode) for processes that ended since the last poll
+            (exitcode 0 = finished normally, not restarted)
+        """
+        ended = []
+        now = time.monotonic()
+        for managed in self.processes.values():
+            if managed.process is not None and not managed.process.is_alive():
+                code = managed.process.exitcode
+                managed.process.join()
+                managed.process = None
+                ended.append((managed.name, code))
+                if code != 0 and managed.wanted:
+                    if managed.restarts >= self.max_restarts:
+                        print(f"[ERROR] {managed.name} process crashed {managed.restarts + 1} times; giving up")
+                        managed.wanted = False
+                    else:
+                        delay = self.backoff * (2 ** managed.restarts)
+                        print(f"[WARNING] {managed.name} process exited with {code}; restarting in {delay:.1f}s")
+                        managed.restart_at = now + delay
+                elif code == 0:
+                    managed.wanted = False
+            if managed.restart_at is not None and now >= managed.restart_at:
+                managed.restarts += 1
+                self.start(managed.name)
+        return ended
+
+    def gave_up(self, name):
+        """True if a process crashed more than max_restarts times."""
+        managed = self.processes[name]
+        return not managed.wanted and managed.restarts >= self.max_restarts and managed.process is None
+
+    def shutdown(self, timeout=2.0):
+        for name in list(self.processes):
+            self.stop(name, timeout)
+
+
+class MultiProcessRuntime:
+    """Supervisor for the capture / analysis / renderer processes."""
+
+    def __init__(self, source_spec="window", realtime=False, loop=False, supervisor=None):
+        self.source_spec = source_spec
+        self.realtime = realtime
+        self.loop = loop
+        self.supervisor = supervisor or ProcessSupervisor()
+        self.stats = {}
+        self.unavailable = set()  # Analysis processes that exited as unavailable
+
+    def _probe_frame_shape(self):
+        """Open the source once to learn the frame size the ring is allocated for."""
+        from src.frame_sources import create_frame_source
+
+        source = create_frame_source(self.source_spec, realtime=False, loop=False)
+        try:
+            while not source.is_ready():
+                time.sleep(1)
+            frame = None
+            while frame is None and not source.exhausted:
+                frame = source.get_screenshot()
+            return None if frame is None else frame.shape
+        finally:
+            source.close()
+
+    def run(self, enabled=None):
+        """
+        Run until the renderer quits or a finite source has been fully shown.
+
+        Args:
+            enabled: Initial analysis processes, e.g. {'elixir': True, 'towers': False}
+                     (the settings window takes over once the renderer starts)
+
+        Returns:
+            0 on a normal exit, 1 if a required process kept crashing
+        """
+        shape = self._probe_frame_shape()
+        if shape is None:
+            print("Error: Could not capture initial frame")
+            return 1
+        frame_height, frame_width = shape[:2]
+
+        context = self.supervisor.context
+        ring = SharedFrameRing.create(shape)
+        messages = context.Queue()
+        updates = context.Queue()
+        sup = self.supervisor
+        sup.add('capture', capture_main, (self.source_spec, self.realtime, self.loop, ring, messages))
+        sup.add('renderer', render_main, (ring, updates, messages, frame_width, frame_height))
+        for name in ANALYSIS_PROCESSES:
+            sup.add(name, analysis_main, (name, ring, messages, frame_width, frame_height))
+
+        enabled = enabled or {'elixir': ENABLE_ELIXIR_TRACKING, 'towers': ENABLE_TOWER_DETECTION}
+        status = 0
+        try:
+            sup.start('capture')
+            sup.start('renderer')
+            for name, on in enabled.items():
+                if on:
+                    sup.start(name)
+
+            while True:
+                try:
+                    kind, sender, payload = messages.get(timeout=0.1)
+                except queue.Empty:
+                    kind = None
+                if kind == 'state':
+                    updates.put((kind, sender, payload))
+                elif kind == 'settings':
+                    for name, on in payload.items():
+                        if name in self.unavailable:
+                            continue
+                        if on and not sup.processes[name].wanted:
+                            sup.start(name)
+                        elif not on and sup.processes[name].wanted:
+                            sup.stop(name)
+                elif kind == 'finished':
+                    print(f"Frame source finished ({payload} frames)")
+                elif kind == 'quit':
+                    print("Quitting...")
+                    break
+                elif kind == 'stats':
+                    self.stats[sender] = payload
+                elif kind == 'unavailable':
+                    print(f"[WARNING] {sender} disabled: {payload}")
+                    self.unavailable.add(sender)
+                elif kind == 'error':
+                    print(f"[ERROR] {sender} process failed:\n{payload}")
+
+                for name, code in sup.poll():
+                    if name == 'renderer' and code == 0:
+                        return status
+                if sup.gave_up('capture') or sup.gave_up('renderer'):
+                    status = 1
+                    break
+        except KeyboardInterrupt:
+            print("\n\nInterrupted by user")
+        finally:
+            sup.shutdown()
+            self._drain(messages)
+            ring.close()
+            ring.unlink()
+            for name, stats in self.stats.items():
+                print(f"{name}: {stats}")
+        return status
+
+    def _drain(self, messages):
+        """Collect the stats messages processes sent while shutting down."""
+        while True:
+            try:
+                kind, sender, payload = messages.get(timeout=0.2)
+            except queue.Empty:
+                return
+            if kind == 'stats':
+                self.stats[sender] = payload
@@ -0,0 +1,185 @@
+"""
+Threaded Capture -> Analyse -> Render Pipeline
+Runs frame capture and analysis (tower detection, elixir reading) on their own
+worker threads so a slow detector request never stalls the overlay.
+
+Stages are connected by small bounded queues that drop the OLDEST item when
+full, so every consumer always works on the newest frame:
+
+    capture thread --+--> analysis queue --> analysis thread (updates subsystems)
+                     |
+                     +--> render queue ----> main thread (draws + cv2.imshow)
+
+Rendering stays on the main thread because cv2.imshow and Tkinter are not
+thread safe.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+# One captured frame travelling through the pipeline
+FramePacket = namedtuple('FramePacket', ['frame_id', 'timestamp', 'frame'])
+
+
+class DropOldestQueue:
+    """Bounded FIFO that discards the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=2):
+        self.maxsize = max(1, maxsize)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full.
+
+        Returns:
+            True if an older item was dropped
+        """
+        with self._cond:
+            dropped = False
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+                dropped = True
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+            return dropped
+
+    def get(self, timeout=None):
+        """Pop the oldest item, waiting up to timeout seconds. Returns None on timeout/close."""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_latest(self, timeout=None):
+        """Pop the newest item and discard anything older."""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def close(self):
+        """Wake up any waiting consumer; further gets return None once empty."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class OverlayPipeline:
+    """Runs capture and analysis on background threads, rendering stays with the caller."""
+
+    def __init__(self, source, analyze_fn, queue_size=2, profiler=None):
+        """
+        Args:
+            source: FrameSource (or WindowCapture) to read frames from
+            analyze_fn: Callable(FramePacket) run on the analysis thread
+            queue_size: Capacity of each stage queue (oldest frame dropped when full)
+            profiler: Optional Profiler; capture is timed as the 'capture' stage
+        """
+        self.source = source
+        self.profiler = profiler
+        self.analyze_fn = analyze_fn
+        self.analysis_queue = DropOldestQueue(queue_size)
+        self.render_queue = DropOldestQueue(queue_size)
+
+        self.running = False
+        self.finished = False  # Source exhausted
+        self.frames_captured = 0
+        self.frames_analyzed = 0
+        self.analysis_errors = 0
+        self._threads = []
+
+    def start(self):
+        """Start the capture and analysis worker threads."""
+        if self.running:
+            return
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._analysis_loop, name="analysis", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the worker threads and wait for them to exit."""
+        self.running = False
+        self.analysis_queue.close()
+        self.render_queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def get_frame(self, timeout=0.1):
+        """Return the newest captured FramePacket for rendering, or None."""
+        return self.render_queue.get_latest(timeout)
+
+    def _capture_loop(self):
+        frame_id = 0
+        try:
+            while self.running:
+                if self.profiler is not None:
+                    with self.profiler.stage('capture'):
+                        frame = self.source.get_screenshot()
+                else:
+                    frame = self.source.get_screenshot()
+                if frame is None:
+                    if getattr(self.source, 'exhausted', False):
+                        self.finished = True
+                        break
+                    time.sleep(0.01)
+                    continue
+
+                timestamp = getattr(self.source, 'last_timestamp', None)
+                packet = FramePacket(frame_id, timestamp if timestamp is not None else time.time(), frame)
+                frame_id += 1
+                self.frames_captured += 1
+
+                self.analysis_queue.put(packet)
+                self.render_queue.put(packet)
+        finally:
+            # Release the grabber owned by this thread
+            self.source.close()
+            self.analysis_queue.close()
+            self.render_queue.close()
+
+    def _analysis_loop(self):
+        while self.running:
+            packet = self.analysis_queue.get_latest(timeout=0.1)
+            if packet is None:
+                if self.analysis_queue.closed:
+                    break
+                continue
+            try:
+                self.analyze_fn(packet)
+                self.frames_analyzed += 1
+            except Exception as e:
+                self.analysis_errors += 1
+                print(f"[WARNING] Analysis error: {e}")
+
+    def get_stats(self):
+        """Return frame counters for each stage."""
+        return {
+            'captured': self.frames_captured,
+            'analyzed': self.frames_analyzed,
+            'analysis_dropped': self.analysis_queue.dropped,
+            'render_dropped': self.render_queue.dropped,
+            'analysis_errors': self.analysis_errors,
+        }
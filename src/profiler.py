@@ -0,0 +1,209 @@
+"""
+Per-Stage Latency Profiler
+Times pipeline stages (capture, towers, elixir, composite, display, ...) and
+keeps rolling p50/p95/p99 per stage.
+
+Each stage keeps its last PROFILER_WINDOW samples in a fixed-size ring buffer,
+so memory is constant and percentiles always describe recent frames. When the
+profiler is disabled, stage() returns a shared no-op context manager and
+record() returns immediately.
+
+Usage:
+    profiler = Profiler(enabled=True)
+    with profiler.stage('capture'):
+        frame = cap.get_screenshot()
+    profiler.snapshot()  # {'capture': {'p50': ..., 'p95': ..., ...}}
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from src.config import ENABLE_PROFILER, PROFILER_WINDOW, PROFILER_DUMP_FILE, PROFILER_DUMP_INTERVAL
+
+PERCENTILES = (50, 95, 99)
+HUD_HEADER = "stage         p50   p95   p99 ms"
+HUD_REFRESH = 0.25  # Seconds between HUD percentile recomputes
+
+
+class StageStats:
+    """Ring buffer of the most recent latencies (milliseconds) of one stage."""
+
+    def __init__(self, window=PROFILER_WINDOW):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.index = 0
+        self.total = 0  # Samples ever recorded
+
+    def record(self, ms):
+        self.samples[self.index] = ms
+        self.index = (self.index + 1) % len(self.samples)
+        self.total += 1
+
+    def summary(self):
+        """Return count, mean, max and p50/p95/p99 over the window."""
+        filled = self.samples[:min(self.total, len(self.samples))]
+        if filled.size == 0:
+            return None
+        p50, p95, p99 = np.percentile(filled, PERCENTILES)
+        return {
+            'count': self.total,
+            'mean': float(filled.mean()),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(filled.max()),
+        }
+
+
+class _NullTimer:
+    """No-op context manager handed out while the profiler is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """Collects per-stage latencies and dumps them periodically."""
+
+    def __init__(self, enabled=ENABLE_PROFILER, window=PROFILER_WINDOW,
+                 dump_path=PROFILER_DUMP_FILE, dump_interval=PROFILER_DUMP_INTERVAL):
+        """
+        Args:
+            enabled: Record timings (False = near-zero overhead)
+            window: Samples kept per stage
+            dump_path: .json or .csv file written every dump_interval seconds (None = never)
+            dump_interval: Seconds between dumps
+        """
+        self.enabled = enabled
+        self.window = window
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.stages = {}  # Stage name -> StageStats, in first-seen order
+        self._lock = threading.Lock()
+        self._last_dump = time.time()
+        self._hud_lines = []
+        self._hud_time = float('-inf')
+
+    def stage(self, name):
+        """Context manager timing one stage."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record(self, name, seconds):
+        """Record one latency sample in seconds (thread-safe)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(self.window)
+            stats.record(seconds * 1000.0)
+
+    def snapshot(self):
+        """Return {stage: {'count', 'mean', 'p50', 'p95', 'p99', 'max'}} in milliseconds."""
+        with self._lock:
+            summaries = {name: stats.summary() for name, stats in self.stages.items()}
+        return {name: summary for name, summary in summaries.items() if summary}
+
+    def format_lines(self):
+        """One 'stage p50/p95/p99 ms' line per stage, for the HUD and settings window."""
+        return [
+            f"{name[:12]:<12}{s['p50']:6.1f}{s['p95']:6.1f}{s['p99']:6.1f}"
+            for name, s in self.snapshot().items()
+        ]
+
+    def draw_hud(self, frame):
+        """Draw the per-stage percentiles onto frame in place (top-left corner)."""
+        now = time.perf_counter()
+        if now - self._hud_time >= HUD_REFRESH:
+            self._hud_lines = self.format_lines()
+            self._hud_time = now
+        lines = self._hud_lines
+        if not lines:
+            return frame
+        rect = self.hud_rect(frame.shape, len(lines))
+        x1, y1, x2, y2 = rect
+        cv2.rectangle(frame, (x1, y1), (x2 - 1, y2 - 1), (0, 0, 0), -1)
+        cv2.putText(frame, HUD_HEADER, (x1 + 4, y1 + 12),
+                    cv2.FONT_HERSHEY_PLAIN, 0.8, (255, 255, 255), 1)
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x1 + 4, y1 + 26 + i * 14),
+                        cv2.FONT_HERSHEY_PLAIN, 0.8, (255, 255, 255), 1)
+        return frame
+
+    def hud_rect(self, frame_shape, line_count=None):
+        """Rectangle covered by draw_hud(), or None if there is nothing to show."""
+        if line_count is None:
+            with self._lock:
+                line_count = sum(1 for s in self.stages.values() if s.total)
+        if not line_count:
+            return None
+        h, w = frame_shape[:2]
+        return (0, 0, min(w, 230), min(h, 18 + 14 * line_count))
+
+    def maybe_dump(self, now=None):
+        """Write the snapshot to dump_path if dump_interval has passed."""
+        if not self.enabled or not self.dump_path:
+            return False
+        now = time.time() if now is None else now
+        if now - self._last_dump < self.dump_interval:
+            return False
+        self._last_dump = now
+        self.dump(self.dump_path, now)
+        return True
+
+    def dump(self, path, timestamp=None):
+        """
+        Write the current snapshot to a .json file (overwritten) or a .csv
+        file (one row per stage appended per dump).
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        snapshot = self.snapshot()
+        try:
+            if path.lower().endswith('.csv'):
+                fields = ['timestamp', 'stage', 'count', 'mean', 'p50', 'p95', 'p99', 'max']
+                new_file = not os.path.exists(path)
+                with open(path, 'a', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=fields)
+                    if new_file:
+                        writer.writeheader()
+                    for name, summary in snapshot.items():
+                        writer.writerow({
+                            'timestamp': round(timestamp, 3), 'stage': name,
+                            **{k: round(v, 4) for k, v in summary.items()}
+                        })
+            else:
+                with open(path, 'w') as f:
+                    json.dump({'timestamp': timestamp, 'stages': snapshot}, f, indent=2)
+        except OSError as e:
+            print(f"[WARNING] Could not write profiler dump {path}: {e}")
+
+
+# Shared disabled profiler: stage() costs one attribute check
+NULL_PROFILER = Profiler(enabled=False)
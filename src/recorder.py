@@ -0,0 +1,345 @@
+"""
+Match Recorder
+Writes the capture stream to a chunked, compressed recording file on a
+background thread, and reads any frame range back without decoding the rest.
+
+File layout (all integers little-endian):
+
+    b"CRREC1\\n"                                      file magic
+    chunk*                                           one per RECORDING_CHUNK_FRAMES frames
+    b"CRIDX" u32 len  zlib(JSON index)               index of all chunks
+    u64 index_offset  b"CRIDX1\\n"                   footer
+
+    chunk = b"CHNK" u32 header_len u64 body_len  zlib(JSON header)  body
+
+The chunk header lists, for each frame, its number, timestamp, byte range in
+the body and side-channel data (elixir reading, tower states, raw
+detections). The body holds the encoded frames back to back (JPEG or PNG).
+The index maps frame numbers and timestamps to chunk offsets; a file whose
+index was never written (crash, power loss) is recovered by scanning chunks.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import cv2
+import numpy as np
+
+from src.config import (
+    RECORDING_CHUNK_FRAMES, RECORDING_FORMAT, RECORDING_JPEG_QUALITY, RECORDER_QUEUE_SIZE
+)
+
+FILE_MAGIC = b"CRREC1\n"
+CHUNK_MAGIC = b"CHNK"
+INDEX_MAGIC = b"CRIDX"
+FOOTER_MAGIC = b"CRIDX1\n"
+_CHUNK_HEAD = struct.Struct('<4sIQ')
+_INDEX_HEAD = struct.Struct('<5sI')
+_FOOTER = struct.Struct('<Q7s')
+
+
+def _json_default(value):
+    """Serialize numpy scalars/arrays found in detections and readings."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _pack_json(obj):
+    return zlib.compress(json.dumps(obj, default=_json_default, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack_json(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class MatchRecorder:
+    """Records frames plus per-frame side data; encoding and I/O run on a worker thread."""
+
+    def __init__(self, path, chunk_frames=RECORDING_CHUNK_FRAMES, image_format=RECORDING_FORMAT,
+                 jpeg_quality=RECORDING_JPEG_QUALITY, queue_size=RECORDER_QUEUE_SIZE, block=False):
+        """
+        Args:
+            path: Output file (overwritten)
+            chunk_frames: Frames per chunk (unit of random access)
+            image_format: 'jpg' (small) or 'png' (lossless)
+            jpeg_quality: JPEG quality 0-100
+            queue_size: Frames buffered for the writer
+            block: When the queue is full, wait for the writer (file sources, where
+                   every frame should be kept) instead of dropping the frame (live capture)
+        """
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.extension = '.' + image_format.lower().lstrip('.')
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)] if self.extension in ('.jpg', '.jpeg') else []
+        self.block = block
+
+        self.frames_written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._file = open(path, 'wb')
+        self._file.write(FILE_MAGIC)
+        self._index = []
+        self._next_frame = 0  # Assigned by the writer thread to encoded frames only
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer_loop, name="recorder", daemon=True)
+        self._thread.start()
+
+    def write(self, frame, timestamp, data=None):
+        """
+        Queue a frame for recording.
+
+        Only waits for the writer when created with block=True.
+
+        Args:
+            frame: BGR frame (must not be modified afterwards)
+            timestamp: Capture time in seconds
+            data: Optional JSON-serializable side data (elixir, towers, detections)
+
+        Returns:
+            True if queued, False if the frame was dropped
+        """
+        if self._closed or frame is None:
+            return False
+        item = (float(timestamp), frame, data)
+        if self.block:
+            self._queue.put(item)
+            return True
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _writer_loop(self):
+        pending = []
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, frame, data = item
+            ok, encoded = cv2.imencode(self.extension, frame, self.params)
+            if not ok:
+                self.errors += 1
+                continue
+            # Numbered here so frames that failed to encode leave no gap
+            pending.append((self._next_frame, timestamp, frame.shape, encoded.tobytes(), data))
+            self._next_frame += 1
+            if len(pending) >= self.chunk_frames:
+                self._write_chunk(pending)
+                pending = []
+        if pending:
+            self._write_chunk(pending)
+
+    def _write_chunk(self, frames):
+        entries = []
+        body = []
+        offset = 0
+        for number, timestamp, shape, encoded, data in frames:
+            entries.append({
+                'n': number, 't': timestamp, 'off': offset, 'len': len(encoded),
+                'shape': list(shape), 'data': data,
+            })
+            body.append(encoded)
+            offset += len(encoded)
+
+        header = _pack_json({'format': self.extension, 'frames': entries})
+        chunk_offset = self._file.tell()
+        try:
+            self._file.write(_CHUNK_HEAD.pack(CHUNK_MAGIC, len(header), offset))
+            self._file.write(header)
+            for encoded in body:
+                self._file.write(encoded)
+        except OSError as e:
+            self.errors += len(entries)
+            print(f"[WARNING] Recorder write failed: {e}")
+            # Drop the partial chunk and reuse its frame numbers so numbering stays contiguous
+            try:
+                self._file.seek(chunk_offset)
+                self._file.truncate()
+            except OSError:
+                pass
+            self._next_frame = entries[0]['n']
+            return
+        self._index.append({
+            'offset': chunk_offset,
+            'first': entries[0]['n'],
+            'last': entries[-1]['n'],
+            't_first': entries[0]['t'],
+            't_last': entries[-1]['t'],
+        })
+        self.frames_written += len(entries)
+
+    def close(self):
+        """Flush queued frames, write the index and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+        index = _pack_json({'chunks': self._index, 'frames': self.frames_written})
+        index_offset = self._file.tell()
+        self._file.write(_INDEX_HEAD.pack(INDEX_MAGIC, len(index)))
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(index_offset, FOOTER_MAGIC))
+        self._file.close()
+        if self.dropped or self.errors:
+            print(f"[WARNING] Recording {self.path} is missing frames: {self.dropped} dropped "
+                  f"(writer fell behind), {self.errors} failed to encode or write")
+
+    def get_stats(self):
+        return {
+            'written': self.frames_written,
+            'queued': self._queue.qsize(),
+            'dropped': self.dropped,
+            'errors': self.errors,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class RecordingReader:
+    """Random access to a recording written by MatchRecorder."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a match recording")
+        self._lock = threading.Lock()
+        self.chunks = self._read_index()
+        if self.chunks is None:
+            print(f"[WARNING] Recording {path} has no index (not closed cleanly); scanning chunks")
+            self.chunks = self._scan_chunks()
+        self.frame_count = sum(c['last'] - c['first'] + 1 for c in self.chunks)
+        self._firsts = np.array([c['first'] for c in self.chunks], dtype=np.int64)
+        self._t_firsts = np.array([c['t_first'] for c in self.chunks], dtype=np.float64)
+        self._header_cache = {}
+
+    def _read_index(self):
+        size = os.path.getsize(self.path)
+        if size < len(FILE_MAGIC) + _FOOTER.size:
+            return None
+        self._file.seek(size - _FOOTER.size)
+        index_offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != FOOTER_MAGIC:
+            return None
+        self._file.seek(index_offset)
+        head, length = _INDEX_HEAD.unpack(self._file.read(_INDEX_HEAD.size))
+        if head != INDEX_MAGIC:
+            return None
+        return _unpack_json(self._file.read(length))['chunks']
+
+    def _scan_chunks(self):
+        """Rebuild the index by walking the chunks (stops at the first damaged one)."""
+        chunks = []
+        offset = len(FILE_MAGIC)
+        size = os.path.getsize(self.path)
+        while offset + _CHUNK_HEAD.size <= size:
+            self._file.seek(offset)
+            magic, header_len, body_len = _CHUNK_HEAD.unpack(self._file.read(_CHUNK_HEAD.size))
+            end = offset + _CHUNK_HEAD.size + header_len + body_len
+            if magic != CHUNK_MAGIC or end > size:
+                break
+            try:
+                frames = _unpack_json(self._file.read(header_len))['frames']
+            except (zlib.error, ValueError):
+                break
+            chunks.append({
+                'offset': offset, 'first': frames[0]['n'], 'last': frames[-1]['n'],
+                't_first': frames[0]['t'], 't_last': frames[-1]['t'],
+            })
+            offset = end
+        return chunks
+
+    def _chunk_header(self, chunk_index):
+        """Return (header dict, body file offset) of a chunk (cached)."""
+        cached = self._header_cache.get(chunk_index)
+        if cached is not None:
+            return cached
+        offset = self.chunks[chunk_index]['offset']
+        with self._lock:
+            self._file.seek(offset)
+            magic, header_len, body_len = _CHUNK_HEAD.unpack(self._file.read(_CHUNK_HEAD.size))
+            header = _unpack_json(self._file.read(header_len))
+        result = (header, offset + _CHUNK_HEAD.size + header_len)
+        if len(self._header_cache) > 64:
+            self._header_cache.clear()
+        self._header_cache[chunk_index] = result
+        return result
+
+    def _locate(self, number):
+        """Return (chunk index, entry) of a frame number."""
+        if not 0 <= number < self.frame_count:
+            raise IndexError(f"Frame {number} out of range (0-{self.frame_count - 1})")
+        chunk_index = int(np.searchsorted(self._firsts, number, side='right')) - 1
+        header, body_offset = self._chunk_header(chunk_index)
+        entry = header['frames'][number - self.chunks[chunk_index]['first']]
+        return chunk_index, entry, body_offset
+
+    def __len__(self):
+        return self.frame_count
+
+    def read(self, number, decode=True):
+        """
+        Read one frame.
+
+        Args:
+            number: Frame number (0-based)
+            decode: Decode the image (False returns None for it, reading only side data)
+
+        Returns:
+            (timestamp, frame, data)
+        """
+        _, entry, body_offset = self._locate(number)
+        frame = None
+        if decode:
+            with self._lock:
+                self._file.seek(body_offset + entry['off'])
+                encoded = self._file.read(entry['len'])
+            frame = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return entry['t'], frame, entry['data']
+
+    def read_range(self, start=0, stop=None, decode=True):
+        """Yield (frame number, timestamp, frame, data) for frames start..stop-1."""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        for number in range(max(0, start), stop):
+            timestamp, frame, data = self.read(number, decode)
+            yield number, timestamp, frame, data
+
+    def frame_at(self, timestamp):
+        """Number of the last frame captured at or before timestamp."""
+        chunk_index = max(0, int(np.searchsorted(self._t_firsts, timestamp, side='right')) - 1)
+        header, _ = self._chunk_header(chunk_index)
+        number = header['frames'][0]['n']
+        for entry in header['frames']:
+            if entry['t'] > timestamp:
+                break
+            number = entry['n']
+        return number
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
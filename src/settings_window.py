@@ -6,15 +6,22 @@ Provides GUI controls to toggle features on/off in real-time
 import tkinter as tk
 from tkinter import ttk
 
+from src.profiler import HUD_HEADER
+
 
 class SettingsWindow:
     """Separate window with toggles for all overlay features"""
     
-    def __init__(self):
-        """Initialize settings window with feature toggles"""
+    def __init__(self, show_profiler=False):
+        """Initialize settings window with feature toggles
+        
+        Args:
+            show_profiler: Add the latency HUD toggle and per-stage latency readout
+        """
+        self.show_profiler = show_profiler
         self.root = tk.Tk()
         self.root.title("Clash Royale Overlay - Settings")
-        self.root.geometry("280x200")
+        self.root.geometry("280x420" if show_profiler else "280x200")
         self.root.resizable(False, False)
         
         # Make window stay on top
@@ -24,6 +31,7 @@ class SettingsWindow:
         self.grid_opacity = tk.DoubleVar(value=20.0)
         self.elixir_enabled = tk.BooleanVar(value=True)
         self.towers_enabled = tk.BooleanVar(value=False)
+        self.profiler_hud_enabled = tk.BooleanVar(value=False)
         
         # Build UI
         self._build_ui()
@@ -91,6 +99,27 @@ class SettingsWindow:
             state='normal'
         )
         towers_check.pack(fill='x', padx=20, pady=4, anchor='w')
+        
+        if not self.show_profiler:
+            return
+        
+        # Latency HUD Toggle
+        hud_check = ttk.Checkbutton(
+            self.root,
+            text="Latency HUD",
+            variable=self.profiler_hud_enabled,
+            state='normal'
+        )
+        hud_check.pack(fill='x', padx=20, pady=4, anchor='w')
+        
+        # Per-stage latency readout
+        self.profiler_label = ttk.Label(
+            self.root,
+            text="",
+            font=("Courier", 8),
+            justify='left'
+        )
+        self.profiler_label.pack(fill='x', padx=10, pady=4, anchor='w')
     
     def _on_close_window(self):
         """Handle window close button"""
@@ -123,6 +152,22 @@ class SettingsWindow:
         except:
             return False
     
+    def is_profiler_hud_enabled(self):
+        """Check if the latency HUD is enabled"""
+        try:
+            return self.profiler_hud_enabled.get()
+        except:
+            return False
+    
+    def set_profiler_lines(self, lines):
+        """Show per-stage latency lines (from Profiler.format_lines)"""
+        if not self.show_profiler:
+            return
+        try:
+            self.profiler_label.config(text="\n".join([HUD_HEADER] + list(lines)))
+        except tk.TclError:
+            pass
+    
     def update_window(self):
         """Process window events (non-blocking)"""
         try:
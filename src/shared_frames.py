@@ -0,0 +1,289 @@
+"""
+Shared-Memory Frame Ring
+Hands frames from the capture process to analysis processes (elixir, towers,
+troops, recorder) without pickling or copying them.
+
+One multiprocessing.shared_memory block holds a small header and
+SHARED_RING_SLOTS frame slots. Frame n goes to slot n % slots. The capture side
+writes into the slot in place (reserve()/commit(), or write() for an existing
+array); readers get NumPy views straight into shared memory.
+
+Every slot carries the sequence number of the frame it holds, used as a
+seqlock: the writer sets it to -1 before touching the pixels and to n after.
+A reader that got frame n checks valid(n) after using the view; if the writer
+lapped it in the meantime the check fails and the result must be discarded
+(RingReader counts these as 'torn'). A reader that falls more than `slots`
+frames behind jumps to the oldest frame still in the ring and counts the
+frames it missed as 'dropped'.
+
+There is a single writer. Readers only read, so any number of processes can
+attach to the same ring by name:
+
+    ring = SharedFrameRing.create(slots=8, shape=frame.shape)   # capture process
+    reader = RingReader(SharedFrameRing.attach(ring.name))      # analysis process
+"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.config import SHARED_RING_SLOTS
+from src.pipeline import FramePacket
+
+_MAGIC = 0x43524652494E4731  # "CRFRING1"
+_HEADER_FIELDS = 8  # magic, slots, height, width, channels, dtype, head, closed
+_HEAD, _CLOSED = 6, 7
+_ALIGN = 64
+
+
+class FrameOverwritten(Exception):
+    """The requested frame is no longer in the ring (the writer lapped the reader)."""
+
+
+def _open_shared_memory(name):
+    """Attach to an existing block without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Older versions register the block with the resource tracker; processes
+        # started by the owner share its tracker, so the owner's unlink() still
+        # accounts for it
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing:
+    """Fixed-size ring of frames in one shared memory block."""
+
+    def __init__(self, shm, owner):
+        """Use create() or attach()."""
+        self.shm = shm
+        self.owner = owner
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if header[0] != _MAGIC:
+            raise ValueError(f"Shared memory block {shm.name} is not a frame ring")
+
+        self.slots = int(header[1])
+        self.shape = (int(header[2]), int(header[3]), int(header[4]))
+        self.dtype = np.dtype(chr(int(header[5])))
+        self._header = header
+
+        offset = _HEADER_FIELDS * 8
+        self._slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self.slots * 8
+        self._timestamps = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset = self._data_offset(self.slots)
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=shm.buf, offset=offset)
+
+    @staticmethod
+    def _data_offset(slots):
+        offset = (_HEADER_FIELDS + 2 * slots) * 8
+        return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+    @classmethod
+    def create(cls, shape, slots=SHARED_RING_SLOTS, dtype=np.uint8, name=None):
+        """
+        Allocate a new ring (the caller owns it and must unlink() it).
+
+        Args:
+            shape: Frame shape (height, width, channels)
+            slots: Frames kept; a reader may lag this many frames before dropping
+            dtype: Frame dtype
+            name: Shared memory name (random if None)
+        """
+        shape = tuple(int(s) for s in shape)
+        if len(shape) == 2:
+            shape += (1,)
+        dtype = np.dtype(dtype)
+        size = cls._data_offset(slots) + slots * int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (_MAGIC, slots, shape[0], shape[1], shape[2], ord(dtype.char), -1, 0)
+        np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=_HEADER_FIELDS * 8)[:] = -1
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Open an existing ring by name (read side, or a writer in another process)."""
+        return cls(_open_shared_memory(name), owner=False)
+
+    def __reduce__(self):
+        # Passing a ring to a child process attaches to the same block there
+        return SharedFrameRing.attach, (self.name,)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def head(self):
+        """Sequence number of the newest committed frame (-1 if none)."""
+        return int(self._header[_HEAD])
+
+    @property
+    def closed(self):
+        """True once the writer has ended the stream."""
+        return bool(self._header[_CLOSED])
+
+    # Writer side
+
+    def reserve(self):
+        """
+        Claim the next slot for in-place writing.
+
+        Returns:
+            (seq, view): Sequence number and a writable view of the slot; call
+            commit(seq, timestamp) when the frame is complete
+        """
+        seq = self.head + 1
+        slot = seq % self.slots
+        self._slot_seq[slot] = -1  # Readers of the old frame now fail valid()
+        return seq, self._frames[slot]
+
+    def commit(self, seq, timestamp):
+        """Publish a reserved frame."""
+        slot = seq % self.slots
+        self._timestamps[slot] = timestamp
+        self._slot_seq[slot] = seq
+        self._header[_HEAD] = seq
+
+    def write(self, frame, timestamp):
+        """
+        Copy a frame into the ring.
+
+        Returns:
+            Sequence number of the frame
+        """
+        seq, view = self.reserve()
+        view[...] = frame.reshape(self.shape)
+        self.commit(seq, timestamp)
+        return seq
+
+    def close_stream(self):
+        """Tell readers no more frames will come."""
+        self._header[_CLOSED] = 1
+
+    # Reader side
+
+    def valid(self, seq):
+        """True while frame seq is still in its slot (check after using a view)."""
+        return seq >= 0 and int(self._slot_seq[seq % self.slots]) == seq
+
+    def get(self, seq):
+        """
+        Zero-copy access to frame seq.
+
+        Returns:
+            FramePacket(seq, timestamp, view)
+
+        Raises:
+            FrameOverwritten: The frame was already replaced (or not written yet)
+        """
+        slot = seq % self.slots
+        if int(self._slot_seq[slot]) != seq:
+            raise FrameOverwritten(f"Frame {seq} is no longer in the ring (head {self.head})")
+        packet = FramePacket(seq, float(self._timestamps[slot]), self._frames[slot])
+        if int(self._slot_seq[slot]) != seq:
+            raise FrameOverwritten(f"Frame {seq} was overwritten while opening it")
+        return packet
+
+    def close(self):
+        """Unmap the block (NumPy views into it must be gone)."""
+        self._header = self._slot_seq = self._timestamps = self._frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            print(f"[WARNING] Frame ring {self.name} still has views in use; leaving it mapped")
+
+    def unlink(self):
+        """Free the block (owner only, after every process has closed it)."""
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        if self.owner:
+            self.unlink()
+        return False
+
+
+class RingReader:
+    """One consumer's cursor into a SharedFrameRing, with lag accounting."""
+
+    def __init__(self, ring, latest=False, poll_interval=0.001):
+        """
+        Args:
+            ring: SharedFrameRing (usually attached by name)
+            latest: Always jump to the newest frame (analysis) instead of
+                    reading every frame in order (recorder)
+            poll_interval: Seconds between checks while waiting for a frame
+        """
+        self.ring = ring
+        self.latest = latest
+        self.poll_interval = poll_interval
+        self.next_seq = max(0, ring.head) if latest else 0
+        self.last_seq = -1
+        self.frames_read = 0
+        self.dropped = 0  # Frames overwritten before this reader got to them
+        self.skipped = 0  # Frames passed over on purpose in latest mode
+        self.torn = 0     # Frames overwritten while the reader was using them
+
+    @property
+    def lag(self):
+        """Frames committed after the one this reader last returned."""
+        return max(0, self.ring.head - self.last_seq) if self.last_seq >= 0 else max(0, self.ring.head + 1)
+
+    def next(self, timeout=None):
+        """
+        Wait for the next frame and return a zero-copy view of it.
+
+        Returns:
+            FramePacket(seq, timestamp, view), or None on timeout or when the
+            writer closed the stream and every frame has been read
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            head = self.ring.head
+            if head >= self.next_seq:
+                if self.latest and head > self.next_seq:
+                    self.skipped += head - self.next_seq
+                    self.next_seq = head
+                oldest = head - self.ring.slots + 1
+                if self.next_seq < oldest:
+                    self.dropped += oldest - self.next_seq
+                    self.next_seq = oldest
+                try:
+                    packet = self.ring.get(self.next_seq)
+                except FrameOverwritten:
+                    # Lapped between reading head and the slot; move on to what is there now
+                    continue
+                self.next_seq += 1
+                self.last_seq = packet.frame_id
+                self.frames_read += 1
+                return packet
+            if self.ring.closed:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def valid(self, packet):
+        """Confirm a packet was not overwritten while in use (counts torn reads)."""
+        if self.ring.valid(packet.frame_id):
+            return True
+        self.torn += 1
+        return False
+
+    def get_stats(self):
+        return {
+            'read': self.frames_read,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'torn': self.torn,
+            'lag': self.lag,
+        }
@@ -5,6 +5,11 @@ Tracks tower health, position, and state changes
 
 import time
 
+import numpy as np
+
+from src.clock import SYSTEM_CLOCK
+from src.config import RESIZE_WIDTH, RESIZE_HEIGHT, TOWER_DOWN_TIMEOUT, TOWER_ROIS, TOWER_STATE_RESULTS
+
 # Tower sides - determined by X position
 TOWER_SIDE_LEFT = 'left'
 TOWER_SIDE_RIGHT = 'right'
@@ -44,8 +49,18 @@ def determine_tower_owner(y_position, frame_height=800):
     return TOWER_OWNER_ENEMY if y_position < frame_height / 2 else TOWER_OWNER_FRIENDLY
 
 
+# Tracker slot order (matches the tile map's tower keys)
+TOWER_SLOTS = ('LE', 'RE', 'LF', 'RF')
+SLOT_POSITIONS = {
+    'LE': (TOWER_SIDE_LEFT, TOWER_OWNER_ENEMY),
+    'RE': (TOWER_SIDE_RIGHT, TOWER_OWNER_ENEMY),
+    'LF': (TOWER_SIDE_LEFT, TOWER_OWNER_FRIENDLY),
+    'RF': (TOWER_SIDE_RIGHT, TOWER_OWNER_FRIENDLY),
+}
+
+
 class PrincessTower:
-    """Represents a single princess tower"""
+    """Represents a single princess tower (one fixed tracker slot)"""
     
     def __init__(self, tower_id, x, y, confidence, frame_width=450, frame_height=800):
         self.id = tower_id
@@ -54,164 +69,174 @@ class PrincessTower:
         self.confidence = confidence
         self.side = determine_tower_side(x, frame_width)
         self.owner = determine_tower_owner(y, frame_height)
-        self.status = 'active'
-        self.last_seen = time.time()
+        self.status = 'unseen'  # 'unseen' until first detected, then 'active' / 'destroyed'
+        self.last_seen = None
+        self.hits = 0  # Consecutive updates with a detection
+        self.misses = 0  # Consecutive updates without one
     
-    def update(self, x, y, confidence):
-        """Update tower with new detection"""
-        self.x = x
-        self.y = y
-        self.confidence = confidence
-        self.last_seen = time.time()
+    def update(self, x, y, confidence, smoothing=0.0, now=None):
+        """Update tower with new detection
+        
+        Args:
+            x, y, confidence: Detected center and confidence
+            smoothing: Weight of the previous value (0 = take the detection as is)
+            now: Detection time (defaults to the wall clock)
+        """
+        if self.last_seen is None:
+            smoothing = 0.0
+        self.x = smoothing * self.x + (1 - smoothing) * x
+        self.y = smoothing * self.y + (1 - smoothing) * y
+        self.confidence = smoothing * self.confidence + (1 - smoothing) * confidence
+        self.last_seen = time.time() if now is None else now
 
 
 class PrincessTowerTracker:
     """
     Tracks princess towers only, categorized by left/right and friendly/enemy.
+    
+    There are exactly four slots (LE/RE/LF/RF), so per-frame cost and memory
+    are constant. Each frame every detection is assigned to the slot of its
+    quadrant, and each slot takes the detection closest to its expected
+    position (TOWER_ROIS center) within debounce_threshold pixels. Positions
+    and confidence are smoothed. The destroyed state has hysteresis counted in
+    detection results, so it holds at any detection rate: a tower goes down
+    after down_misses consecutive results without it (and at least
+    down_timeout seconds since it was last seen) and only comes back up after
+    up_hits consecutive results with it.
+    
+    Timeouts use the given clock (see src/clock.py) or explicit timestamps,
+    so replays at any speed give the same states as live runs.
     """
     
-    def __init__(self, frame_width=450, frame_height=800):
-        self.towers = {}
-        self.tower_id_counter = 0
+    def __init__(self, frame_width=450, frame_height=800, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
         self.frame_width = frame_width
         self.frame_height = frame_height
-        self.debounce_threshold = 100
-        self.last_update = time.time()
+        self.debounce_threshold = 100  # Max distance (px) from a slot's expected position
+        self.smoothing = 0.5  # Weight of the previous position/confidence
+        self.down_timeout = TOWER_DOWN_TIMEOUT  # Min seconds without detection before a tower is down
+        self.down_misses = TOWER_STATE_RESULTS  # Consecutive results without it before a tower is down
+        self.up_hits = TOWER_STATE_RESULTS  # Consecutive results with it before a down tower is up again
+        self.last_update = self.clock.now()
         
-        self.previous_states = {
-            'RE': False,
-            'LE': False,
-            'LF': False,
-            'RF': False,
-        }
+        # Expected tower centers, scaled from capture resolution to this frame
+        scale_x = frame_width / RESIZE_WIDTH
+        scale_y = frame_height / RESIZE_HEIGHT
+        self.anchors = np.array([
+            ((x + w / 2) * scale_x, (y + h / 2) * scale_y)
+            for x, y, w, h in (TOWER_ROIS[key] for key in TOWER_SLOTS)
+        ], dtype=np.float64)
         
-        self.state_changes = {
-            'RE': None,
-            'LE': None,
-            'LF': None,
-            'RF': None,
+        self.slots = {
+            key: PrincessTower(i + 1, ax, ay, 0.0, frame_width, frame_height)
+            for i, (key, (ax, ay)) in enumerate(zip(TOWER_SLOTS, self.anchors))
         }
+        # Slot index per (side is right, owner is friendly) quadrant
+        self._quadrant_slot = np.array([[0, 2], [1, 3]])
     
-    def update(self, detections):
-        """Process new detections and update princess tower tracking"""
-        now = time.time()
-        self.last_update = now
-        self._cleanup_old_towers(now)
-        
-        seen_positions = {}
-        deduped_detections = []
+    @property
+    def towers(self):
+        """Seen towers by slot key"""
+        return {key: t for key, t in self.slots.items() if t.status != 'unseen'}
+    
+    def _assign(self, detections):
+        """
+        Pick the best detection for each slot.
         
+        Returns:
+            List of (slot_index, x, y, confidence)
+        """
+        rows = []
         for det in detections:
             tower_class = det['class'].lower()
             if not ('princess' in tower_class and 'tower' in tower_class):
                 continue
-            
             box = det['box']
-            x, y = box[0], box[1]
-            pos_key = (round(x / 10) * 10, round(y / 10) * 10)
-            
-            if pos_key not in seen_positions:
-                seen_positions[pos_key] = det
-                deduped_detections.append(det)
+            rows.append((box[0], box[1], det['confidence']))
+        if not rows:
+            return []
         
-        for det in deduped_detections:
-            confidence = det['confidence']
-            box = det['box']
-            x, y = box[0], box[1]
-            
-            matched_tower_id = self._find_matching_tower(x, y, now)
-            
-            if matched_tower_id is not None:
-                self.towers[matched_tower_id].update(x, y, confidence)
-            else:
-                self.tower_id_counter += 1
-                self.towers[self.tower_id_counter] = PrincessTower(
-                    self.tower_id_counter, x, y, confidence,
-                    self.frame_width, self.frame_height
-                )
+        data = np.asarray(rows, dtype=np.float64)
+        xs, ys = data[:, 0], data[:, 1]
         
-        self._cleanup_old_towers(now)
-    
-    def _find_matching_tower(self, x, y, now):
-        """Find if detection matches an existing tower"""
-        best_match = None
-        best_distance = self.debounce_threshold
+        # Quadrant decides the slot; distance to that slot's anchor gates and ranks
+        right = (xs >= self.frame_width / 2).astype(np.intp)
+        friendly = (ys >= self.frame_height / 2).astype(np.intp)
+        slot_idx = self._quadrant_slot[right, friendly]
+        dist = np.hypot(xs - self.anchors[slot_idx, 0], ys - self.anchors[slot_idx, 1])
+        dist[dist >= self.debounce_threshold] = np.inf
         
-        for tower_id, tower in self.towers.items():
-            # Must be same side and owner
-            if tower.side != determine_tower_side(x, self.frame_width):
-                continue
-            if tower.owner != determine_tower_owner(y, self.frame_height):
-                continue
-            
-            # Find closest tower of this type
-            distance = ((x - tower.x)**2 + (y - tower.y)**2)**0.5
-            if distance < best_distance:
-                best_distance = distance
-                best_match = tower_id
+        assigned = []
+        for slot in range(len(TOWER_SLOTS)):
+            candidates = np.where(slot_idx == slot, dist, np.inf)
+            best = int(np.argmin(candidates))
+            if np.isfinite(candidates[best]):
+                assigned.append((slot, xs[best], ys[best], data[best, 2]))
+        return assigned
+    
+    def update(self, detections, now=None):
+        """Process new detections and update princess tower tracking
+        
+        Args:
+            detections: Tower detections
+            now: Time the detections were made (defaults to the tracker's clock)
+        """
+        now = self.clock.now() if now is None else now
+        self.last_update = now
+        
+        detected = set()
+        for slot, x, y, confidence in self._assign(detections):
+            key = TOWER_SLOTS[slot]
+            tower = self.slots[key]
+            tower.update(x, y, confidence, self.smoothing, now)
+            tower.hits += 1
+            tower.misses = 0
+            detected.add(key)
+            if tower.status == 'unseen' or (tower.status == 'destroyed' and tower.hits >= self.up_hits):
+                tower.status = 'active'
+        
+        for key, tower in self.slots.items():
+            if key not in detected:
+                tower.hits = 0
+                tower.misses += 1
         
-        return best_match
+        self._cleanup_old_towers(now, self.down_timeout)
     
     def _cleanup_old_towers(self, now, timeout=1.0):
-        """Mark towers as destroyed if not detected recently"""
-        for tid, t in self.towers.items():
-            if now - t.last_seen > timeout and t.status != 'destroyed':
+        """Mark towers as destroyed if missed by the last results and not detected recently"""
+        for t in self.slots.values():
+            if t.status == 'active' and t.misses >= self.down_misses and now - t.last_seen > timeout:
                 t.status = 'destroyed'
     
-    def _is_tower_down(self, tower_list):
-        """Check if any tower in the list is down"""
-        for tower in tower_list:
-            if tower.status == 'destroyed':
-                return True
-        return False
-    
     def get_towers_by_position(self):
         """Get towers organized by position"""
+        names = {
+            (TOWER_SIDE_LEFT, TOWER_OWNER_ENEMY): 'enemy_left',
+            (TOWER_SIDE_RIGHT, TOWER_OWNER_ENEMY): 'enemy_right',
+            (TOWER_SIDE_LEFT, TOWER_OWNER_FRIENDLY): 'friendly_left',
+            (TOWER_SIDE_RIGHT, TOWER_OWNER_FRIENDLY): 'friendly_right',
+        }
         return {
-            'enemy_left': [t for t in self.towers.values()
-                          if t.owner == TOWER_OWNER_ENEMY and t.side == TOWER_SIDE_LEFT],
-            'enemy_right': [t for t in self.towers.values()
-                           if t.owner == TOWER_OWNER_ENEMY and t.side == TOWER_SIDE_RIGHT],
-            'friendly_left': [t for t in self.towers.values()
-                             if t.owner == TOWER_OWNER_FRIENDLY and t.side == TOWER_SIDE_LEFT],
-            'friendly_right': [t for t in self.towers.values()
-                              if t.owner == TOWER_OWNER_FRIENDLY and t.side == TOWER_SIDE_RIGHT],
+            names[SLOT_POSITIONS[key]]: [tower] if tower.status != 'unseen' else []
+            for key, tower in self.slots.items()
         }
     
     def get_tower_states(self):
         """Get the 4 tower states as booleans (True if tower is down)"""
-        towers_by_pos = self.get_towers_by_position()
-        
-        current_states = {
-            'RE': self._is_tower_down(towers_by_pos['enemy_right']),
-            'LE': self._is_tower_down(towers_by_pos['enemy_left']),
-            'LF': self._is_tower_down(towers_by_pos['friendly_left']),
-            'RF': self._is_tower_down(towers_by_pos['friendly_right']),
+        return {
+            key: tower.status == 'destroyed' for key, tower in self.slots.items()
         }
-        
-        for key in self.state_changes:
-            self.state_changes[key] = None
-        
-        for state_key, current_value in current_states.items():
-            previous_value = self.previous_states.get(state_key, False)
-            if current_value and not previous_value:
-                self.state_changes[state_key] = 'down'
-            elif not current_value and previous_value:
-                self.state_changes[state_key] = 'up'
-        
-        self.previous_states = current_states.copy()
-        return current_states
 
 
 class StateManager:
     """Main state manager for tower detection"""
     
-    def __init__(self, frame_width=450, frame_height=800):
-        self.tower_tracker = PrincessTowerTracker(frame_width, frame_height)
+    def __init__(self, frame_width=450, frame_height=800, clock=None):
+        self.tower_tracker = PrincessTowerTracker(frame_width, frame_height, clock)
     
-    def update(self, detections):
+    def update(self, detections, now=None):
         """Update state with new detections"""
-        self.tower_tracker.update(detections)
+        self.tower_tracker.update(detections, now)
     
     def get_tower_states(self):
         """Get current tower states"""
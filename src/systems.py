@@ -0,0 +1,183 @@
+"""
+Overlay Subsystem Lifecycle
+Owns the grid, elixir and tower subsystems and reconfigures them in place.
+
+Each optional subsystem lives in a slot that is created lazily the first time
+it is enabled. Disabling a subsystem only hides it (its compositor layer is
+switched off and it is skipped during analysis); the instance is kept, so
+turning towers back on reuses the same detector session, worker pool and
+tracker history. Changing the grid opacity only updates a float on the grid
+layer.
+"""
+
+from src.vision import GridOverlay
+from src.events import GameEvents, apply_event_to_overlay
+from src.profiler import NULL_PROFILER
+from src.compositor import FrameCompositor, GridLayer, TowerLayer, ElixirLayer, ProfilerLayer
+
+
+class SubsystemSlot:
+    """One optional subsystem: lazily created, enabled/disabled in place."""
+
+    def __init__(self, name, factory, layer_factory=None):
+        """
+        Args:
+            name: Subsystem name ('elixir', 'towers')
+            factory: Callable creating the subsystem instance
+            layer_factory: Optional callable(instance) -> compositor Layer
+        """
+        self.name = name
+        self.factory = factory
+        self.layer_factory = layer_factory
+        self.instance = None
+        self.layer = None
+        self.enabled = False
+
+    def enable(self, compositor=None):
+        """Enable the subsystem, creating it on first use."""
+        if self.instance is None:
+            self.instance = self.factory()
+            if self.instance is None:
+                return False
+            if self.layer_factory and compositor is not None:
+                self.layer = compositor.add_layer(self.layer_factory(self.instance))
+        if self.layer is not None:
+            self.layer.enabled = True
+        self.enabled = True
+        return True
+
+    def disable(self):
+        """Disable the subsystem but keep its instance (and state) for re-enabling."""
+        if self.layer is not None:
+            self.layer.enabled = False
+        self.enabled = False
+
+    @property
+    def active(self):
+        """The instance if enabled, else None."""
+        return self.instance if self.enabled else None
+
+    def close(self):
+        """Release the instance's resources (worker pools, sessions)."""
+        if self.instance is not None and hasattr(self.instance, 'close'):
+            self.instance.close()
+        self.instance = None
+        self.layer = None
+        self.enabled = False
+
+
+class OverlaySystems:
+    """Grid, game events and optional subsystems plus the frame compositor."""
+
+    def __init__(self, frame_width, frame_height, factories, profiler=None):
+        """
+        Args:
+            frame_width: Width of captured frames
+            frame_height: Height of captured frames
+            factories: Dict of subsystem name -> callable creating it
+                       (may return None when unavailable)
+            profiler: Optional enabled Profiler (times layers, adds the latency HUD layer)
+        """
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.compositor = FrameCompositor(profiler)
+
+        # Grid is always present; opacity controls visibility
+        self.grid = GridOverlay(frame_width, frame_height)
+        self.events = GameEvents()
+        self.grid_layer = self.compositor.add_layer(GridLayer(self.grid))
+
+        self.profiler_layer = None
+        if profiler is not None:
+            self.profiler_layer = self.compositor.add_layer(ProfilerLayer(profiler))
+            self.profiler_layer.enabled = False
+
+        layers = {'towers': TowerLayer, 'elixir': ElixirLayer}
+        self.slots = {
+            name: SubsystemSlot(name, factory, layers.get(name))
+            for name, factory in factories.items()
+        }
+
+    def get(self, name):
+        """Return the enabled subsystem with this name, or None."""
+        slot = self.slots.get(name)
+        return slot.active if slot else None
+
+    def set_enabled(self, name, enabled):
+        """Enable or disable a subsystem in place."""
+        slot = self.slots.get(name)
+        if slot is None or slot.enabled == enabled:
+            return
+        if enabled:
+            slot.enable(self.compositor)
+        else:
+            slot.disable()
+            if name == 'towers':
+                # Without tower detection the grid shows every tower standing
+                self.events.reset_to_original()
+
+    def set_grid_opacity(self, opacity):
+        """Set the grid opacity (0.0-1.0); takes effect on the next frame."""
+        self.grid_layer.opacity = opacity
+
+    def configure(self, grid_opacity=None, profiler_hud=None, **enabled):
+        """
+        Apply settings in place.
+
+        Args:
+            grid_opacity: Grid opacity 0.0-1.0 (None = unchanged)
+            profiler_hud: Show the latency HUD (ignored without a profiler)
+            **enabled: Subsystem name -> enabled flag, e.g. towers=True
+        """
+        if grid_opacity is not None:
+            self.set_grid_opacity(grid_opacity)
+        if profiler_hud is not None and self.profiler_layer is not None:
+            self.profiler_layer.enabled = profiler_hud
+        for name, value in enabled.items():
+            self.set_enabled(name, value)
+
+    def close(self):
+        """Release resources held by every subsystem."""
+        for slot in self.slots.values():
+            slot.close()
+
+
+def analyze_frame(systems, screenshot, profiler=NULL_PROFILER, timestamp=None):
+    """
+    Run the analysis half of a frame (tower detection, elixir reading).
+
+    Args:
+        timestamp: Capture time of the frame (tower timeouts are measured in frame time)
+    """
+    towers = systems.get('towers')
+    if towers:
+        with profiler.stage('towers'):
+            towers.analyze(screenshot, timestamp=timestamp)
+
+    elixir = systems.get('elixir')
+    if elixir:
+        with profiler.stage('elixir'):
+            elixir.read(screenshot)
+
+
+def render_frame(systems, screenshot, profiler=NULL_PROFILER):
+    """
+    Draw all enabled overlays using the latest analysis results.
+
+    The returned frame is the compositor's reused buffer: it stays valid
+    until the next render_frame() call.
+    """
+    towers = systems.get('towers')
+    if towers:
+        # Switch to the precomputed tile variant for the current tower states
+        systems.events.set_tower_states(towers.get_tower_states())
+        towers.update()
+    apply_event_to_overlay(systems.grid, systems.events)
+
+    elixir = systems.get('elixir')
+    if elixir:
+        elixir.update()
+
+    # One copy of the screenshot; grid, towers and elixir HUD draw into it in place
+    with profiler.stage('composite'):
+        return systems.compositor.compose(screenshot)
@@ -0,0 +1,139 @@
+"""
+Tile Map
+Compact 18x32 uint8 representation of shaded_tiles.json.
+
+Each tile holds a state code (see TILE_NAMES). The JSON is parsed once and
+stored as a compiled .npy cache next to it (rebuilt when the JSON is newer).
+
+All 16 combinations of princess towers being up/down are precomputed: when a
+tower is down, its tiles (LE/RE/LF/RF) become 'empty'. Switching variants when
+a tower falls is a single index into the precomputed stack.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from src.config import SHADED_TILES_FILE
+
+GRID_WIDTH = 18
+GRID_HEIGHT = 32
+
+# State code -> name; index in this tuple is the code stored in the array
+TILE_NAMES = ('empty', 'red', 'LE', 'RE', 'LF', 'RF')
+TILE_CODES = {name: code for code, name in enumerate(TILE_NAMES)}
+
+# Bit order of the tower-down variant index
+TOWER_KEYS = ('LE', 'RE', 'LF', 'RF')
+
+
+def tower_variant_index(tower_states):
+    """
+    Convert tower states (as from StateManager.get_tower_states) to a variant index.
+
+    Args:
+        tower_states: Dict of LE/RE/LF/RF -> True if that tower is down
+
+    Returns:
+        Integer 0-15 (bit i set when TOWER_KEYS[i] is down)
+    """
+    index = 0
+    for bit, key in enumerate(TOWER_KEYS):
+        if tower_states.get(key):
+            index |= 1 << bit
+    return index
+
+
+class TileMap:
+    """18x32 tile state array plus precomputed tower-down variants."""
+
+    def __init__(self, tiles):
+        """
+        Args:
+            tiles: uint8 array of shape (GRID_WIDTH, GRID_HEIGHT) indexed [tile_x, tile_y]
+        """
+        self.tiles = np.ascontiguousarray(tiles, dtype=np.uint8)
+        self.variants = self._build_variants(self.tiles)
+
+    @staticmethod
+    def _build_variants(tiles):
+        variants = np.empty((1 << len(TOWER_KEYS),) + tiles.shape, dtype=np.uint8)
+        for index in range(len(variants)):
+            variant = tiles.copy()
+            for bit, key in enumerate(TOWER_KEYS):
+                if index & (1 << bit):
+                    variant[variant == TILE_CODES[key]] = TILE_CODES['empty']
+            variants[index] = variant
+        variants.setflags(write=False)
+        return variants
+
+    def variant(self, tower_states=None):
+        """
+        Return the (read-only) tile array for the given tower states.
+
+        Args:
+            tower_states: Dict of LE/RE/LF/RF -> down, or a variant index (default: all up)
+        """
+        if tower_states is None:
+            return self.variants[0]
+        if isinstance(tower_states, int):
+            return self.variants[tower_states]
+        return self.variants[tower_variant_index(tower_states)]
+
+    @staticmethod
+    def cache_path_for(json_path):
+        """Path of the compiled cache next to a tiles JSON file."""
+        return os.path.splitext(json_path)[0] + '.npy'
+
+    @staticmethod
+    def parse_json(json_path):
+        """Parse a shaded tiles JSON file ("x,y" -> state name) into a code array."""
+        tiles = np.zeros((GRID_WIDTH, GRID_HEIGHT), dtype=np.uint8)
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        for key, value in data.items():
+            tile_x, tile_y = map(int, key.split(','))
+            if 0 <= tile_x < GRID_WIDTH and 0 <= tile_y < GRID_HEIGHT:
+                tiles[tile_x, tile_y] = TILE_CODES.get(value, TILE_CODES['red'])
+        return tiles
+
+    @classmethod
+    def load(cls, json_path=SHADED_TILES_FILE):
+        """
+        Load the tile map, using the compiled cache when it is up to date.
+
+        Returns:
+            TileMap (all tiles empty if the JSON file is missing or unreadable)
+        """
+        cache_path = cls.cache_path_for(json_path)
+        if not os.path.exists(json_path):
+            return cls(np.zeros((GRID_WIDTH, GRID_HEIGHT), dtype=np.uint8))
+
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(json_path):
+            try:
+                tiles = np.load(cache_path, allow_pickle=False)
+                if tiles.shape == (GRID_WIDTH, GRID_HEIGHT):
+                    return cls(tiles)
+            except Exception as e:
+                print(f"[WARNING] Ignoring unreadable tile cache {cache_path}: {e}")
+
+        try:
+            tiles = cls.parse_json(json_path)
+        except Exception as e:
+            print(f"Error loading tile states: {e}")
+            return cls(np.zeros((GRID_WIDTH, GRID_HEIGHT), dtype=np.uint8))
+
+        try:
+            np.save(cache_path, tiles, allow_pickle=False)
+        except OSError as e:
+            print(f"[WARNING] Could not write tile cache {cache_path}: {e}")
+        return cls(tiles)
+
+    @staticmethod
+    def to_dict(tiles):
+        """Convert a tile array back to the JSON-style dict of (tile_x, tile_y) -> state name."""
+        return {
+            (int(x), int(y)): TILE_NAMES[tiles[x, y]]
+            for x in range(tiles.shape[0]) for y in range(tiles.shape[1])
+        }
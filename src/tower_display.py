@@ -10,26 +10,53 @@ from dotenv import load_dotenv
 class TowerDisplay:
     """Simplified tower detection display - wraps detector for consistent interface"""
     
-    def __init__(self, frame_width=450, frame_height=800):
+    def __init__(self, frame_width=450, frame_height=800, clock=None, detector=None):
         """Initialize tower detection
         
         Args:
             frame_width: Width of video frame
             frame_height: Height of video frame
+            clock: Clock used when analyze() gets no timestamp (defaults to the wall clock)
+            detector: Shared detector (e.g. a DetectorChannel) used instead of
+                      creating a RoboflowDetector in "model"/"both" mode
         """
         load_dotenv()
         
+        # Defaults that stay valid if initialization fails below (the display
+        # then just reports no detections and every tower standing)
+        self.detector = None
+        self.state_manager = None
+        self.detections_cache = []
+        self.detections_frame_id = None
+        
         # Import here to avoid circular imports
         try:
-            from src.detector import RoboflowDetector
+            from src.config import TOWER_STATE_SOURCE
+            from src.clock import SYSTEM_CLOCK
             from src.state_manager import StateManager
+            from src.detection_scheduler import DetectionScheduler
+            from src.tower_pixel_detector import TowerPixelDetector
             
-            self.detector = RoboflowDetector()
-            self.state_manager = StateManager(frame_width, frame_height)
+            # "model", "pixels" or "both" (see TOWER_STATE_SOURCE in config.py)
+            self.state_source = TOWER_STATE_SOURCE
+            self.detector = None
+            if self.state_source in ('model', 'both'):
+                if detector is None:
+                    from src.detector import RoboflowDetector
+                    detector = RoboflowDetector()
+                self.detector = detector
+            self.pixel_detector = TowerPixelDetector() if self.state_source in ('pixels', 'both') else None
+            self.validation_checks = 0  # Model results compared with the pixel detector
+            self.validation_mismatches = 0
+            self.scheduler = DetectionScheduler()
+            self.clock = clock or SYSTEM_CLOCK
+            self.state_manager = StateManager(frame_width, frame_height, self.clock)
             self.frame_width = frame_width
             self.frame_height = frame_height
             self.confidence_threshold = 0.4
             self.detections_cache = []
+            self.detections_frame_id = None  # Frame the cached detections came from
+            self._next_frame_id = 0
             self.enabled = True
         except Exception as e:
             print(f"[WARNING] Tower detection initialization warning: {e}")
@@ -51,46 +78,128 @@ class TowerDisplay:
         if not self.enabled or frame is None:
             return frame.copy() if frame is not None else None, []
         
+        detections = self.analyze(frame)
+        return self.draw(frame.copy()), detections
+    
+    def analyze(self, frame, frame_id=None, timestamp=None):
+        """Submit tower detection and apply the newest finished result (no drawing)
+        
+        Never waits for the detector: when the scheduler allows it the frame is
+        queued on the detector's worker pool (skipped if a request is already in
+        flight) and whatever result finished most recently is fed into the state
+        manager.
+        
+        With TOWER_STATE_SOURCE "pixels" the state comes from TowerPixelDetector
+        every frame and no model is called; with "both" the pixel detector drives
+        the state and model results are only compared against it.
+        
+        Args:
+            frame: Input video frame
+            frame_id: Optional id of the frame (defaults to an internal counter)
+            timestamp: Optional capture time of the frame
+            
+        Returns:
+            List of the most recent detections
+        """
+        if not self.enabled or frame is None:
+            return []
+        
         try:
-            display_frame = frame.copy()
+            if frame_id is None:
+                frame_id = self._next_frame_id
+            self._next_frame_id = frame_id + 1
+            now = timestamp if timestamp is not None else self.clock.now()
+            
+            # Tower state from pixels: microseconds, no model call
+            pixel_detections = None
+            if self.pixel_detector is not None:
+                pixel_detections = self.pixel_detector.detect(frame)
+                self.state_manager.update(pixel_detections, now)
+                if self.detector is None:
+                    self.detections_frame_id = frame_id
+                    self.detections_cache = pixel_detections
+                    return self.detections_cache
             
             # Get the Roboflow model ID from environment
             tower_model_id = os.getenv("ROBOFLOW_MODEL_ID")
             if not tower_model_id:
-                return display_frame, []
+                return []
             
-            # Run tower detection
-            detections = self.detector.detect_towers(frame)
-            self.detections_cache = detections if detections else []
+            # Queue tower detection only when the tower regions changed (or the
+            # last result went stale) and the rate budget allows it
+            if self.scheduler.should_dispatch('towers', frame, now):
+                if self.detector.submit(frame, self.detector.tower_model_id, frame_id, now,
+                                        detect_fn=self.detector.detect_towers):
+                    self.scheduler.mark_dispatched('towers', now)
+                else:
+                    self.scheduler.mark_busy('towers')
             
-            # Update state
-            if self.state_manager and detections:
-                self.state_manager.update(detections)
-            
-            # Visualize towers on display frame
-            display_frame = self._draw_towers(display_frame, detections)
+            # Apply the newest finished result once
+            result = self.detector.poll(self.detector.tower_model_id)
+            if result is not None and result.frame_id != self.detections_frame_id:
+                self.detections_frame_id = result.frame_id
+                self.detections_cache = result.detections if result.detections else []
+                
+                if pixel_detections is not None:
+                    # Model only validates the pixel detector
+                    self._validate(pixel_detections, self.detections_cache)
+                elif self.state_manager and result.detections:
+                    # Update state as of the frame the detections were made on
+                    self.state_manager.update(result.detections, result.timestamp)
             
-            return display_frame, detections
+            return self.detections_cache
             
         except Exception as e:
             print(f"[WARNING] Tower detection error: {e}")
-            return frame.copy() if frame is not None else None, []
+            return []
     
-    def _draw_towers(self, frame, detections):
-        """Draw tower detections on frame
+    def _validate(self, pixel_detections, model_detections):
+        """Count model results that disagree with the pixel detector on which towers stand"""
+        from src.state_manager import determine_tower_side, determine_tower_owner
+        
+        model_towers = set()
+        for det in model_detections:
+            tower_class = det.get('class', '').lower()
+            if 'princess' not in tower_class or 'tower' not in tower_class:
+                continue
+            if float(det.get('confidence', 0)) < self.confidence_threshold:
+                continue
+            x, y = det['box'][0], det['box'][1]
+            side = 'L' if determine_tower_side(x, self.frame_width) == 'left' else 'R'
+            owner = 'E' if determine_tower_owner(y, self.frame_height) == 'enemy' else 'F'
+            model_towers.add(side + owner)
+        
+        pixel_towers = {det['tower'] for det in pixel_detections}
+        self.validation_checks += 1
+        if model_towers != pixel_towers:
+            self.validation_mismatches += 1
+    
+    def get_validation_stats(self):
+        """Get how often the tower model disagreed with the pixel detector ("both" mode)"""
+        return {
+            'checks': getattr(self, 'validation_checks', 0),
+            'mismatches': getattr(self, 'validation_mismatches', 0),
+        }
+    
+    def draw(self, display_frame):
+        """Draw the most recent detections onto a display frame in place
         
         Args:
-            frame: Frame to draw on
-            detections: List of tower detections
+            display_frame: Frame to draw on (modified in place)
             
         Returns:
-            Frame with towers drawn
+            The same frame with towers drawn
         """
-        if not detections:
-            return frame
-        
-        display = frame.copy()
+        if not self.enabled or display_frame is None:
+            return display_frame
+        return self._draw_towers(display_frame, self.detections_cache)
+    
+    def _visible_towers(self, detections):
+        """Yield (x1, y1, x2, y2, label) for detections that should be drawn
         
+        Args:
+            detections: List of tower detections
+        """
         for det in detections:
             try:
                 tower_class = det.get('class', '').lower()
@@ -116,22 +225,75 @@ class TowerDisplay:
                 x2 = int(x + width / 2)
                 y2 = int(y + height / 2)
                 
-                # Draw bounding box
-                cv2.rectangle(display, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                
                 # Determine tower position
                 side = "L" if x < self.frame_width / 2 else "R"
                 owner = "E" if y < self.frame_height / 2 else "F"
                 
-                # Draw label
-                label = f"{side}{owner} {confidence:.2f}"
-                cv2.putText(display, label, (x1, y1 - 5), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+                yield x1, y1, x2, y2, f"{side}{owner} {confidence:.2f}"
                 
             except Exception as e:
                 continue
+    
+    def detections_rect(self, frame_shape):
+        """Get the rectangle draw() will touch for the current detections
         
-        return display
+        Args:
+            frame_shape: Shape of the frame being drawn on
+            
+        Returns:
+            (x1, y1, x2, y2) clipped to the frame, or None if nothing is drawn
+        """
+        if not self.enabled or not self.detections_cache:
+            return None
+        
+        x1 = y1 = float('inf')
+        x2 = y2 = float('-inf')
+        for bx1, by1, bx2, by2, label in self._visible_towers(self.detections_cache):
+            (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            # Box (2px line) plus the label drawn above it
+            x1 = min(x1, bx1 - 1)
+            y1 = min(y1, by1 - 5 - text_h - 1)
+            x2 = max(x2, bx2 + 2, bx1 + text_w + 1)
+            y2 = max(y2, by2 + 2)
+        if x1 == float('inf'):
+            return None
+        
+        h, w = frame_shape[:2]
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        if x1 >= x2 or y1 >= y2:
+            return None
+        return (x1, y1, x2, y2)
+    
+    def _draw_towers(self, frame, detections):
+        """Draw tower detections on frame in place
+        
+        Args:
+            frame: Frame to draw on (modified in place)
+            detections: List of tower detections
+            
+        Returns:
+            The same frame with towers drawn
+        """
+        for x1, y1, x2, y2, label in self._visible_towers(detections):
+            # Draw bounding box
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            
+            # Draw label
+            cv2.putText(frame, label, (x1, y1 - 5), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        
+        return frame
+    
+    def get_scheduler_stats(self):
+        """Get dispatched/skipped/stale counters of the tower detection scheduler"""
+        if getattr(self, 'scheduler', None):
+            return self.scheduler.get_stats('towers')
+        return {}
+    
+    def close(self):
+        """Release the detector's worker pool and connections"""
+        if getattr(self, 'detector', None):
+            self.detector.close()
     
     def get_tower_states(self):
         """Get current tower states"""
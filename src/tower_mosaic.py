@@ -0,0 +1,108 @@
+"""
+Tower Region Mosaic
+Packs the four princess tower regions (TOWER_ROIS) into one small image so the
+tower model can be run with a single, much smaller request.
+
+Layout (2 x 2 grid, cells padded to the largest region):
+
+    +----+----+
+    | LE | RE |
+    +----+----+
+    | LF | RF |
+    +----+----+
+
+Predictions on the mosaic are mapped back into frame coordinates by the cell
+their center falls in; boxes centered in padding are dropped.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from src.config import TOWER_ROIS
+
+MOSAIC_LAYOUT = (('LE', 'RE'), ('LF', 'RF'))
+
+# One region placed in the mosaic: where it sits in the mosaic and in the frame
+MosaicCell = namedtuple('MosaicCell', ['key', 'mosaic_x', 'mosaic_y', 'frame_x', 'frame_y', 'width', 'height'])
+
+
+class TowerMosaic:
+    """Builds tower mosaics and maps mosaic detections back to the frame."""
+
+    def __init__(self, rois=None, gap=4):
+        """
+        Args:
+            rois: Dict of LE/RE/LF/RF -> (x, y, width, height) (defaults to TOWER_ROIS)
+            gap: Blank pixels between cells so boxes cannot straddle two towers
+        """
+        self.rois = rois or TOWER_ROIS
+        self.gap = gap
+        self.cell_width = max(w for x, y, w, h in self.rois.values())
+        self.cell_height = max(h for x, y, w, h in self.rois.values())
+        self.width = 2 * self.cell_width + gap
+        self.height = 2 * self.cell_height + gap
+
+        self.cells = []
+        for row, keys in enumerate(MOSAIC_LAYOUT):
+            for col, key in enumerate(keys):
+                x, y, w, h = self.rois[key]
+                self.cells.append(MosaicCell(
+                    key,
+                    col * (self.cell_width + gap),
+                    row * (self.cell_height + gap),
+                    x, y, w, h
+                ))
+
+    def build(self, frame):
+        """
+        Copy the four tower regions of frame into the mosaic.
+
+        Returns:
+            BGR mosaic image of shape (height, width, 3)
+        """
+        # Fresh (small) buffer per call so concurrent detector workers never share one
+        mosaic = np.zeros((self.height, self.width, 3), dtype=frame.dtype)
+
+        fh, fw = frame.shape[:2]
+        for cell in self.cells:
+            w = min(cell.width, fw - cell.frame_x)
+            h = min(cell.height, fh - cell.frame_y)
+            if w <= 0 or h <= 0:
+                continue
+            mosaic[cell.mosaic_y:cell.mosaic_y + h, cell.mosaic_x:cell.mosaic_x + w] = \
+                frame[cell.frame_y:cell.frame_y + h, cell.frame_x:cell.frame_x + w]
+        return mosaic
+
+    def cell_at(self, x, y):
+        """Return the cell containing mosaic point (x, y), or None if it is padding."""
+        for cell in self.cells:
+            if (cell.mosaic_x <= x < cell.mosaic_x + cell.width and
+                    cell.mosaic_y <= y < cell.mosaic_y + cell.height):
+                return cell
+        return None
+
+    def map_detections(self, detections, scale=1.0):
+        """
+        Map detections made on the mosaic back into frame coordinates.
+
+        Args:
+            detections: Detection dicts with center-based boxes in mosaic pixels
+            scale: Factor the mosaic was resized by before detection
+
+        Returns:
+            List of detection dicts in frame coordinates, each tagged with 'tower' (LE/RE/LF/RF)
+        """
+        mapped = []
+        for det in detections:
+            cx, cy, w, h = det['box']
+            cx, cy, w, h = cx / scale, cy / scale, w / scale, h / scale
+            cell = self.cell_at(cx, cy)
+            if cell is None:
+                continue
+            mapped.append({
+                **det,
+                'box': [cell.frame_x + cx - cell.mosaic_x, cell.frame_y + cy - cell.mosaic_y, w, h],
+                'tower': cell.key,
+            })
+        return mapped
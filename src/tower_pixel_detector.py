@@ -0,0 +1,198 @@
+"""
+Pixel-Based Tower Status Detector
+Decides whether each princess tower is standing from the colours in its region,
+without any model call.
+
+Each tower region (TOWER_ROIS, built from the LE/RE/LF/RF tiles) is reduced to a
+small hue/saturation histogram and compared with a reference histogram of the
+standing tower. A destroyed tower leaves rubble with a very different colour
+distribution, so the correlation drops well below TOWER_PIXEL_THRESHOLD.
+
+References come from TOWER_REFERENCE_DIR (LE.png, RE.png, LF.png, RF.png crops
+of standing towers, saved with 't' in tools/capture_assets.py) when present;
+otherwise TOWER_CALIBRATION_FRAMES frames are averaged. Only frames that look
+like an arena with all four towers standing are used for that: left and right
+towers of each player must match, and clearly better than enemy towers match
+friendly ones, which rejects menus, loading screens and frames with a tower down.
+
+detect() returns detection dicts shaped like RoboflowDetector.detect_towers(),
+so its output can be fed straight into StateManager.update().
+"""
+
+import os
+
+import cv2
+
+from src.config import (
+    TOWER_ROIS, TOWER_REFERENCE_DIR, TOWER_PIXEL_THRESHOLD,
+    TOWER_PIXEL_BINS, TOWER_CALIBRATION_FRAMES, TOWER_ARENA_MARGIN
+)
+
+
+class TowerPixelDetector:
+    """Histogram comparison of the four tower regions against standing towers."""
+
+    def __init__(self, rois=None, reference_dir=TOWER_REFERENCE_DIR, threshold=TOWER_PIXEL_THRESHOLD,
+                 bins=TOWER_PIXEL_BINS, calibration_frames=TOWER_CALIBRATION_FRAMES):
+        """
+        Args:
+            rois: Dict of LE/RE/LF/RF -> (x, y, width, height) (defaults to TOWER_ROIS)
+            reference_dir: Folder with <key>.png crops of standing towers (optional)
+            threshold: Minimum histogram correlation (-1..1) for a tower to count as up
+            bins: (hue bins, saturation bins)
+            calibration_frames: Frames averaged into a reference when no image exists
+        """
+        self.rois = rois or TOWER_ROIS
+        self.threshold = threshold
+        self.bins = list(bins)
+        self.calibration_frames = calibration_frames
+
+        self.references = {}
+        self._calibration = {}  # key -> (histogram sum, frames seen)
+        if reference_dir and os.path.isdir(reference_dir):
+            for key in self.rois:
+                path = os.path.join(reference_dir, f"{key}.png")
+                image = cv2.imread(path) if os.path.exists(path) else None
+                if image is not None:
+                    self.references[key] = self.histogram(image)
+        self._loaded_references = dict(self.references)
+
+        self.last_scores = {}
+
+    @property
+    def calibrated(self):
+        """True once every tower has a reference histogram."""
+        return all(key in self.references for key in self.rois)
+
+    def histogram(self, region):
+        """Normalized hue/saturation histogram of a BGR region."""
+        # Subsample large regions; the colour distribution barely changes
+        step = max(1, min(region.shape[:2]) // 24)
+        hsv = cv2.cvtColor(region[::step, ::step], cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, self.bins, [0, 180, 0, 256])
+        cv2.normalize(hist, hist, 1.0, 0.0, cv2.NORM_L1)
+        return hist
+
+    def _region(self, frame, key):
+        x, y, w, h = self.rois[key]
+        fh, fw = frame.shape[:2]
+        region = frame[max(0, y):min(fh, y + h), max(0, x):min(fw, x + w)]
+        return region if region.size else None
+
+    def looks_like_arena(self, hists):
+        """
+        Check whether tower histograms look like a match with every tower standing.
+
+        Args:
+            hists: Dict of LE/RE/LF/RF -> histogram of the tower region
+
+        Returns:
+            True if each player's left and right towers correlate with each
+            other, by at least TOWER_ARENA_MARGIN more than enemy and friendly
+            towers correlate (a uniform menu screen matches everywhere)
+        """
+        if not all(key in hists for key in ('LE', 'RE', 'LF', 'RF')):
+            return False
+
+        def correl(a, b):
+            return float(cv2.compareHist(hists[a], hists[b], cv2.HISTCMP_CORREL))
+
+        mirrored = min(correl('LE', 'RE'), correl('LF', 'RF'))
+        crossed = max(correl('LE', 'LF'), correl('RE', 'RF'))
+        return mirrored >= self.threshold and mirrored - crossed >= TOWER_ARENA_MARGIN
+
+    def save_references(self, frame, reference_dir=TOWER_REFERENCE_DIR):
+        """
+        Save the tower regions of a frame as reference crops and use them.
+
+        Args:
+            frame: BGR frame of a match with all four towers standing
+            reference_dir: Folder the <key>.png crops are written to
+
+        Returns:
+            True if saved, False if the frame does not look like an arena
+            with every tower standing
+        """
+        regions = {key: self._region(frame, key) for key in self.rois}
+        regions = {key: region for key, region in regions.items() if region is not None}
+        hists = {key: self.histogram(region) for key, region in regions.items()}
+        if len(regions) < len(self.rois) or not self.looks_like_arena(hists):
+            return False
+
+        os.makedirs(reference_dir, exist_ok=True)
+        for key, region in regions.items():
+            cv2.imwrite(os.path.join(reference_dir, f"{key}.png"), region)
+        self.references.update(hists)
+        self._loaded_references = dict(self.references)
+        self._calibration = {}
+        return True
+
+    def _calibrate(self, key, hist):
+        total, count = self._calibration.get(key, (None, 0))
+        total = hist.copy() if total is None else total + hist
+        count += 1
+        if count >= self.calibration_frames:
+            self.references[key] = total / count
+            self._calibration.pop(key, None)
+        else:
+            self._calibration[key] = (total, count)
+
+    def scores(self, frame):
+        """
+        Histogram correlation of each tower region with its reference.
+
+        Returns:
+            Dict of LE/RE/LF/RF -> score (-1..1); towers still calibrating are omitted
+        """
+        hists = {}
+        for key in self.rois:
+            region = self._region(frame, key)
+            if region is not None:
+                hists[key] = self.histogram(region)
+
+        scores = {}
+        arena = None
+        for key, hist in hists.items():
+            reference = self.references.get(key)
+            if reference is None:
+                # Calibrate only on frames of a match with every tower standing
+                if arena is None:
+                    arena = self.looks_like_arena(hists)
+                if arena:
+                    self._calibrate(key, hist)
+                continue
+            scores[key] = float(cv2.compareHist(reference, hist, cv2.HISTCMP_CORREL))
+        self.last_scores = scores
+        return scores
+
+    def detect(self, frame):
+        """
+        Detect standing princess towers.
+
+        While calibrating, every tower is reported as standing.
+
+        Returns:
+            List of detection dicts ({'class', 'confidence', 'box', 'tower'}) for
+            towers that are up, boxes center-based in frame coordinates
+        """
+        if frame is None:
+            return []
+
+        scores = self.scores(frame)
+        detections = []
+        for key, (x, y, w, h) in self.rois.items():
+            score = scores.get(key)
+            if score is not None and score < self.threshold:
+                continue
+            detections.append({
+                'class': 'princess tower',
+                'confidence': 1.0 if score is None else max(0.0, score),
+                'box': [x + w / 2, y + h / 2, w, h],
+                'tower': key,
+            })
+        return detections
+
+    def reset(self):
+        """Forget self-calibrated references (e.g. at the start of a new match)."""
+        self.references = dict(self._loaded_references)
+        self._calibration = {}
@@ -1,91 +1,151 @@
 import cv2
 import numpy as np
-import time
 import json
 import os
+from collections import namedtuple
+from .tile_map import TileMap, TILE_CODES, TILE_NAMES
+from .clock import SYSTEM_CLOCK
 from .config import (
     ELIXIR_BAR_ROI, ELIXIR_RECOVERY_RATE_SINGLE, ELIXIR_RECOVERY_RATE_DOUBLE,
     ELIXIR_MAX, ELIXIR_START, PURPLE_LOWER, PURPLE_UPPER, ELIXIR_SEGMENT_THRESHOLD
 )
 
+# Result of reading the elixir bar: whole segments filled and a fractional estimate
+ElixirReading = namedtuple('ElixirReading', ['count', 'estimate'])
+
+
+class ElixirReader:
+    """
+    Reads the elixir bar with segment geometry precomputed per ROI size.
+    
+    The bar is split into 10 segments where the first is double width
+    (2 + 9 = 11 units). Per ROI size we precompute the segment starts, the
+    exact minimum purple-pixel count each segment needs, and a lookup table
+    from fill-edge column to fractional elixir. Each frame then needs one
+    HSV purple mask, one column reduction and one np.add.reduceat.
+    """
+    
+    # First box needs to be "fully filled" to count (often shows 1 when empty due to noise/numbers)
+    FIRST_SEGMENT_THRESHOLD = 0.75
+    
+    def __init__(self, roi=ELIXIR_BAR_ROI):
+        self.roi = roi
+        self._size = None
+        self._lower = np.array(PURPLE_LOWER, dtype=np.uint8)
+        self._upper = np.array(PURPLE_UPPER, dtype=np.uint8)
+    
+    @staticmethod
+    def _min_count(total, threshold):
+        """Smallest integer pixel count c with c / total >= threshold (same test as the ratio)."""
+        if total <= 0:
+            return np.iinfo(np.int64).max  # Zero-width segments never count
+        count = max(0, int(np.ceil(threshold * total)) - 1)
+        while count / total < threshold:
+            count += 1
+        return count
+    
+    def _prepare(self, w, h):
+        """Precompute segment boundaries, thresholds and the edge lookup table for a w x h bar."""
+        unit_width = w / 11.0
+        starts = [0] + [int((2 + (i - 1)) * unit_width) for i in range(1, 10)]
+        ends = starts[1:] + [w]
+        thresholds = [self.FIRST_SEGMENT_THRESHOLD] + [ELIXIR_SEGMENT_THRESHOLD] * 9
+        
+        self._starts = np.array(starts, dtype=np.intp)
+        # Mask values are 0/255, so compare sums against 255 * pixel counts
+        self._min_fill = np.array(
+            [self._min_count((end - start) * h, t) * 255 for start, end, t in zip(starts, ends, thresholds)],
+            dtype=np.float64
+        )
+        self._column_threshold = ELIXIR_SEGMENT_THRESHOLD * h * 255
+        
+        # Fill edge (number of filled columns, 0..w) -> fractional elixir
+        edge_values = np.zeros(w + 1, dtype=np.float64)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            if end > start:
+                edges = np.arange(start + 1, end + 1)
+                edge_values[edges] = i + (edges - start) / (end - start)
+        self._edge_values = np.minimum(edge_values, ELIXIR_MAX)
+        self._size = (w, h)
+    
+    def read_roi(self, roi):
+        """
+        Read an already cropped elixir bar ROI.
+        
+        Returns:
+            ElixirReading(count, estimate)
+        """
+        if roi is None or roi.size == 0:
+            return ElixirReading(0, 0.0)
+        h, w = roi.shape[:2]
+        if self._size != (w, h):
+            self._prepare(w, h)
+        
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, self._lower, self._upper)
+        
+        # Purple fill per column, then per segment in one pass
+        column_fill = cv2.reduce(mask, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S)[0]
+        segment_fill = np.add.reduceat(column_fill, self._starts)
+        count = int(np.count_nonzero(segment_fill >= self._min_fill))
+        
+        # Fill edge: one past the rightmost column that is filled enough
+        filled = np.flatnonzero(column_fill >= self._column_threshold)
+        estimate = float(self._edge_values[filled[-1] + 1]) if filled.size else 0.0
+        
+        return ElixirReading(count, estimate)
+    
+    def read(self, frame):
+        """
+        Read the elixir bar from a full frame.
+        
+        Returns:
+            ElixirReading(count, estimate); zeros if the ROI is outside the frame
+        """
+        if frame is None:
+            return ElixirReading(0, 0.0)
+        
+        x, y, w, h = self.roi
+        
+        # Safety check for frame bounds
+        if y+h > frame.shape[0] or x+w > frame.shape[1]:
+            return ElixirReading(0, 0.0)
+        
+        return self.read_roi(frame[y:y+h, x:x+w])
+
+
+_default_reader = ElixirReader()
+
+
 def get_user_elixir(frame):
     """
     Estimates user elixir based on purple pixel count in the elixir bar ROI.
-    Returns a float between 0.0 and 10.0.
+    Returns the number of filled segments (0-10).
     """
-    if frame is None:
-        return 0.0
-
-    # 1. Define ROI (Imported from config)
-    x, y, w, h = ELIXIR_BAR_ROI
-    
-    # Safety check for frame bounds
-    if y+h > frame.shape[0] or x+w > frame.shape[1]:
-        # ROI is outside frame, return 0 or log warning
-        return 0.0
+    return _default_reader.read(frame).count
 
-    roi = frame[y:y+h, x:x+w]
-    
-    # 2. Convert to HSV
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-    
-    # 3. Create Mask for Purple
-    # PURPLE_LOWER/UPPER are defined in config.py
-    mask = cv2.inRange(hsv, PURPLE_LOWER, PURPLE_UPPER)
-    
-    # 5. Calculate Elixir using Segment Logic
-    # User Request: First box is double the length of the others.
-    # Total units = 2 (first) + 9 (others) = 11 units.
-    unit_width = w / 11.0
-    elixir_count = 0
-    
-    for i in range(10):
-        # Define segment boundaries
-        if i == 0:
-            start_x = 0
-            end_x = int(2 * unit_width)
-        else:
-            # i=1 starts at 2 units, i=2 starts at 3 units, etc.
-            start_x = int((2 + (i - 1)) * unit_width)
-            end_x = int((2 + i) * unit_width)
-            
-        # Clamp end_x to width to avoid rounding errors
-        if i == 9:
-            end_x = w
-        
-        # Extract segment mask
-        segment_mask = mask[:, start_x:end_x]
-        
-        # Count pixels in this segment
-        seg_purple = cv2.countNonZero(segment_mask)
-        seg_w = end_x - start_x
-        seg_total = seg_w * h
-        
-        if seg_total > 0:
-            ratio = seg_purple / seg_total
-            
-            # User Request: First box needs to be "fully filled" to count.
-            # It often shows 1 when empty due to noise/numbers.
-            # So we use a stricter threshold for the first segment.
-            threshold = 0.75 if i == 0 else ELIXIR_SEGMENT_THRESHOLD
-            
-            if ratio >= threshold:
-                elixir_count += 1
-                
-    return elixir_count
+def get_user_elixir_estimate(frame):
+    """
+    Fractional elixir estimate (0.0-10.0) from the fill edge of the bar.
+    """
+    return _default_reader.read(frame).estimate
 
 class ElixirTracker:
     """
     Tracks the opponent's estimated elixir.
+    
+    Regeneration uses the given clock (see src/clock.py), so replays driven
+    by frame timestamps regenerate exactly as the recorded match did.
     """
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
         self.opponent_elixir = ELIXIR_START
-        self.last_update = time.time()
+        self.last_update = self.clock.now()
         self.double_elixir_mode = False 
 
-    def update(self):
-        now = time.time()
-        dt = now - self.last_update
+    def update(self, now=None):
+        now = self.clock.now() if now is None else now
+        dt = max(0.0, now - self.last_update)
         self.last_update = now
         
         rate = ELIXIR_RECOVERY_RATE_DOUBLE if self.double_elixir_mode else ELIXIR_RECOVERY_RATE_SINGLE
@@ -132,6 +192,13 @@ class GridOverlay:
         # Auto-adjust offsets if they're out of bounds for this frame size
         self._validate_and_adjust_config()
         
+        # Cached pre-rendered grid layer (see blend_into)
+        self._tiles_version = None
+        self._layer_key = None
+        self._bbox = None
+        self._layer = None
+        self._mask = None
+        
         self.tile_states = self._load_tile_states()
     
     def _validate_and_adjust_config(self):
@@ -173,70 +240,169 @@ class GridOverlay:
         return default_config
     
     def _load_tile_states(self):
-        """Load tile states from shaded_tiles.json."""
-        if os.path.exists(self.SHADED_TILES_FILE):
-            try:
-                with open(self.SHADED_TILES_FILE, 'r') as f:
-                    data = json.load(f)
-                    states = {}
-                    for key, value in data.items():
-                        tile_tuple = tuple(map(int, key.split(',')))
-                        states[tile_tuple] = value
-                    return states
-            except Exception as e:
-                return {}
-        return {}
+        """Load tile states from shaded_tiles.json (compiled array, all towers up)."""
+        return TileMap.load(self.SHADED_TILES_FILE).variant(0)
     
-    def draw_overlay(self, frame):
-        """
-        Draw grid overlay on frame with shaded tiles.
+    @property
+    def tile_states(self):
+        """Current tile states: uint8 array [tile_x, tile_y] of codes (see tile_map.TILE_NAMES)."""
+        return self._tile_states
+    
+    @tile_states.setter
+    def tile_states(self, states):
+        if states is not getattr(self, '_tile_states', None):
+            self._tile_states = states
+            self.invalidate()
+    
+    def set_tile_states(self, states, version=None):
+        """Replace tile states; the cached layer is rebuilt only if they changed.
         
         Args:
-            frame (np.ndarray): Input frame (BGR format)
-        
-        Returns:
-            np.ndarray: Frame with grid overlay applied
+            states: Tile code array [tile_x, tile_y] (see tile_map.TILE_NAMES)
+            version: Change counter of the states' owner (e.g. GameEvents.version);
+                     pass it so in-place edits of the same dict are noticed
         """
-        overlay = frame.copy()
-        
-        # Get scale and offset from config
+        self.tile_states = states
+        if version != self._tiles_version:
+            self._tiles_version = version
+            self.invalidate()
+    
+    def invalidate(self):
+        """Force the cached grid layer to be re-rendered on next use."""
+        self._layer_key = None
+    
+    def _grid_geometry(self):
+        """Return (offset_x, offset_y, scaled_tile_width, scaled_tile_height)."""
         scale_x = self.grid_config.get('scale_x', 0.85)
         scale_y = self.grid_config.get('scale_y', 0.85)
         offset_x = self.grid_config.get('offset_x', 0.0)
         offset_y = self.grid_config.get('offset_y', 0.0)
+        return offset_x, offset_y, self.tile_width * scale_x, self.tile_height * scale_y
+    
+    def _current_layer_key(self, frame_shape):
+        return (
+            self._tiles_version,
+            tuple(sorted(self.grid_config.items())),
+            frame_shape[:2],
+        )
+    
+    def _render_layer(self, frame_shape):
+        """Render tiles + grid lines once into a colour layer and mask cropped to the grid."""
+        frame_h, frame_w = frame_shape[:2]
+        offset_x, offset_y, scaled_tile_width, scaled_tile_height = self._grid_geometry()
         
-        scaled_tile_width = self.tile_width * scale_x
-        scaled_tile_height = self.tile_height * scale_y
-        
-        # Draw shaded tiles
-        for (tile_x, tile_y), state in self.tile_states.items():
-            if state == 'empty':  # Skip empty tiles - keep transparent
-                continue
-            color = self.TILE_STATES.get(state, (0, 0, 255))
-            x1 = int(offset_x + tile_x * scaled_tile_width)
-            y1 = int(offset_y + tile_y * scaled_tile_height)
-            x2 = int(offset_x + (tile_x + 1) * scaled_tile_width)
-            y2 = int(offset_y + (tile_y + 1) * scaled_tile_height)
-            cv2.rectangle(overlay, (x1, y1), (x2, y2), color, -1)
-        
-        # Draw grid lines (only within the scaled grid area)
-        # Calculate grid boundaries
+        # Grid boundaries
         grid_left = int(offset_x)
         grid_top = int(offset_y)
         grid_right = int(offset_x + self.GRID_WIDTH * scaled_tile_width)
         grid_bottom = int(offset_y + self.GRID_HEIGHT * scaled_tile_height)
         
+        # Bounding box of everything drawn (lines are 1px, inclusive end), clipped to frame
+        x1, y1 = max(0, grid_left), max(0, grid_top)
+        x2, y2 = min(frame_w, grid_right + 1), min(frame_h, grid_bottom + 1)
+        if x2 <= x1 or y2 <= y1:
+            self._bbox = None
+            self._layer = self._mask = None
+            return
+        
+        # Draw in frame coordinates on a canvas shifted by the bbox origin
+        layer = np.zeros((y2 - y1, x2 - x1, 3), dtype=np.uint8)
+        mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        shift = (-x1, -y1)
+        
+        def rect(p1, p2, color):
+            p1 = (p1[0] + shift[0], p1[1] + shift[1])
+            p2 = (p2[0] + shift[0], p2[1] + shift[1])
+            cv2.rectangle(layer, p1, p2, color, -1)
+            cv2.rectangle(mask, p1, p2, 255, -1)
+        
+        def line(p1, p2):
+            p1 = (p1[0] + shift[0], p1[1] + shift[1])
+            p2 = (p2[0] + shift[0], p2[1] + shift[1])
+            cv2.line(layer, p1, p2, (255, 255, 255), 1)
+            cv2.line(mask, p1, p2, 255, 1)
+        
+        # Draw shaded tiles (empty tiles are skipped - keep transparent)
+        tile_xs, tile_ys = np.nonzero(self.tile_states != TILE_CODES['empty'])
+        for tile_x, tile_y in zip(tile_xs.tolist(), tile_ys.tolist()):
+            state = TILE_NAMES[self.tile_states[tile_x, tile_y]]
+            color = self.TILE_STATES.get(state, (0, 0, 255))
+            rect((int(offset_x + tile_x * scaled_tile_width), int(offset_y + tile_y * scaled_tile_height)),
+                 (int(offset_x + (tile_x + 1) * scaled_tile_width), int(offset_y + (tile_y + 1) * scaled_tile_height)),
+                 color)
+        
         # Draw vertical lines
         for col in range(self.GRID_WIDTH + 1):
             x = int(offset_x + col * scaled_tile_width)
             if grid_left <= x <= grid_right:
-                cv2.line(overlay, (x, grid_top), (x, grid_bottom), (255, 255, 255), 1)
+                line((x, grid_top), (x, grid_bottom))
         
         # Draw horizontal lines
         for row in range(self.GRID_HEIGHT + 1):
             y = int(offset_y + row * scaled_tile_height)
             if grid_top <= y <= grid_bottom:
-                cv2.line(overlay, (grid_left, y), (grid_right, y), (255, 255, 255), 1)
+                line((grid_left, y), (grid_right, y))
         
+        self._bbox = (x1, y1, x2, y2)
+        self._layer = layer
+        self._mask = mask
+    
+    def _ensure_layer(self, frame_shape):
+        """Re-render the cached layer if tile states, grid config or frame size changed."""
+        key = self._current_layer_key(frame_shape)
+        if key != self._layer_key:
+            self._render_layer(frame_shape)
+            self._layer_key = key
+    
+    def layer_bbox(self, frame_shape):
+        """
+        Get the rectangle the grid layer covers for a frame size.
+        
+        Returns:
+            (x1, y1, x2, y2) or None if the grid is entirely off-frame
+        """
+        self._ensure_layer(frame_shape)
+        return self._bbox
+    
+    def blend_into(self, frame, opacity):
+        """
+        Blend the cached grid layer into frame in place at the given opacity.
+        
+        Only pixels inside the grid's bounding box that are covered by a tile
+        or line are touched, so the cost does not depend on the tile count.
+        Equivalent to blending draw_overlay(frame) with frame over the full frame.
+        
+        Args:
+            frame (np.ndarray): Frame to draw on (BGR, modified in place)
+            opacity: 0.0 (invisible) to 1.0 (fully opaque grid)
+        
+        Returns:
+            np.ndarray: The same frame
+        """
+        if opacity <= 0:
+            return frame
+        self._ensure_layer(frame.shape)
+        if self._bbox is None:
+            return frame
+        
+        x1, y1, x2, y2 = self._bbox
+        roi = frame[y1:y2, x1:x2]
+        if opacity >= 1:
+            blended = self._layer
+        else:
+            blended = cv2.addWeighted(self._layer, opacity, roi, 1 - opacity, 0)
+        cv2.copyTo(blended, self._mask, roi)
+        return frame
+    
+    def draw_overlay(self, frame):
+        """
+        Draw grid overlay on frame with shaded tiles.
+        
+        Args:
+            frame (np.ndarray): Input frame (BGR format)
+        
+        Returns:
+            np.ndarray: Frame with grid overlay applied
+        """
         # Return overlay without blending (opacity controlled by main.py slider)
-        return overlay
+        return self.blend_into(frame.copy(), 1.0)
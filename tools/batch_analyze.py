@@ -0,0 +1,165 @@
+"""
+Batch Match Analyzer
+Reprocesses many recorded matches in parallel with the overlay's own elixir,
+tower state and detector code (src/match_analysis.py).
+
+Each match is analyzed in its own worker process and written to
+<output>/<name>.json (elixir timeline, tower-down events, detection summary).
+Results are written atomically, so after an interruption --resume skips every
+match that already has a result and only redoes the rest. A run summary is
+appended to <output>/batch_log.jsonl.
+
+Matches are independent, so throughput scales with --workers up to the number
+of cores; OpenCV's own thread pool is limited to one thread per worker to
+avoid oversubscription.
+
+Usage:
+    python tools/batch_analyze.py recordings/*.crrec --output analysis/
+    python tools/batch_analyze.py recordings/ --output analysis/ --resume --workers 8
+    python tools/batch_analyze.py recordings/ --output analysis/ --tower-source recorded
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add the project root to path so we can import src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.match_analysis import TOWER_SOURCES, analyze_match, match_source_spec
+
+LOG_NAME = 'batch_log.jsonl'
+
+
+def find_matches(inputs):
+    """
+    Expand input paths into match paths.
+
+    Files and image directories are matches themselves; any other directory is
+    searched (one level) for recordings, videos and image directories.
+    """
+    matches = []
+    for path in inputs:
+        if match_source_spec(path):
+            matches.append(path)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                child = os.path.join(path, name)
+                if match_source_spec(child):
+                    matches.append(child)
+        else:
+            print(f"[WARNING] Skipping {path}: not a recording, video or image directory")
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(os.path.abspath(m) for m in matches))
+
+
+def result_path(output_dir, match):
+    """Result file of a match: its name plus a short hash of the full path (names may repeat)."""
+    stem = os.path.splitext(os.path.basename(match.rstrip(os.sep)))[0]
+    digest = hashlib.sha1(match.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(output_dir, f"{stem}-{digest}.json")
+
+
+def _init_worker():
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def process_match(match, output, tower_source, analyze_every, max_frames):
+    """
+    Worker: analyze one match and write its result file.
+
+    Returns:
+        (match, status, seconds, frames or error message)
+    """
+    start = time.perf_counter()
+    try:
+        result = analyze_match(match, tower_source, analyze_every, max_frames)
+    except Exception as e:
+        return match, 'error', time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    result['match'] = match
+    result['elapsed'] = round(time.perf_counter() - start, 3)
+    tmp = f"{output}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp, output)  # Never leaves a half-written result behind
+    return match, 'ok', time.perf_counter() - start, result['frames']
+
+
+def run(args):
+    matches = find_matches(args.inputs)
+    if not matches:
+        print("No matches found")
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = {match: result_path(args.output, match) for match in matches}
+    if args.resume:
+        done = [m for m, out in jobs.items() if os.path.exists(out)]
+        for match in done:
+            del jobs[match]
+        print(f"Resuming: {len(done)} of {len(matches)} matches already analyzed")
+    if not jobs:
+        return 0
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Analyzing {len(jobs)} matches on {workers} workers (towers: {args.tower_source})")
+
+    start = time.perf_counter()
+    frames = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(process_match, match, output, args.tower_source, args.every, args.max_frames)
+            for match, output in jobs.items()
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            match, status, seconds, detail = future.result()
+            if status == 'ok':
+                frames += detail
+                print(f"[{i}/{len(jobs)}] {os.path.basename(match)}: {detail} frames in {seconds:.1f}s")
+            else:
+                failures.append({'match': match, 'error': detail})
+                print(f"[{i}/{len(jobs)}] [ERROR] {os.path.basename(match)}: {detail}")
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'timestamp': time.time(),
+        'matches': len(jobs),
+        'failed': len(failures),
+        'frames': frames,
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+        'workers': workers,
+        'tower_source': args.tower_source,
+        'failures': failures,
+    }
+    with open(os.path.join(args.output, LOG_NAME), 'a') as f:
+        f.write(json.dumps(summary) + '\n')
+    print(f"Done: {len(jobs) - len(failures)} ok, {len(failures)} failed, "
+          f"{frames} frames in {elapsed:.1f}s ({summary['fps']} fps)")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded matches in parallel")
+    parser.add_argument('inputs', nargs='+',
+                        help="Recordings (.crrec), videos, image directories or folders containing them")
+    parser.add_argument('--output', required=True, help="Directory for per-match JSON results")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--tower-source', default='pixels', choices=TOWER_SOURCES,
+                        help="Tower detections: pixel detector, detections stored in the recording, or the model")
+    parser.add_argument('--every', type=int, default=1, help="Run tower detection on every Nth frame")
+    parser.add_argument('--max-frames', type=int, help="Analyze at most this many frames per match")
+    parser.add_argument('--resume', action='store_true', help="Skip matches that already have a result")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
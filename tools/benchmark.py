@@ -0,0 +1,267 @@
+"""
+Benchmark Runner
+Times the hot paths of the overlay on a frame corpus plus generated frames.
+
+Benchmarks:
+    elixir.get_user_elixir      Elixir bar reading (vision.get_user_elixir)
+    grid.draw_overlay           Grid overlay with the cached layer
+    grid.render_layer           Grid overlay after invalidation (layer re-render)
+    tracker.update              PrincessTowerTracker.update on four towers
+    tracker.get_tower_states    PrincessTowerTracker.get_tower_states
+    detector.encode_towers      Tower mosaic build + JPEG/base64 request body
+    detector.encode_troops      Arena crop/downscale + JPEG/base64 request body
+    detector.frame_hash         Detection cache key (perceptual hash)
+    towers.pixel_detect         TowerPixelDetector.detect (model-free tower state)
+    loop.headless               One main.py analyze + render iteration (no network)
+
+Usage:
+    python tools/benchmark.py --output results.json
+    python tools/benchmark.py --compare baseline.json results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add the project root to path so we can import src
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from src.config import RESIZE_WIDTH, RESIZE_HEIGHT, TOWER_ROIS, DETECTION_PLANS
+from src.frame_sources import create_frame_source, synthetic_frames
+
+DEFAULT_CORPUS = os.path.join(ROOT, 'benchmarks', 'corpus')
+
+
+def load_corpus(directory):
+    """Load every frame of a corpus directory (normalized like live capture)."""
+    if not os.path.isdir(directory):
+        return []
+    source = create_frame_source(f"images:{directory}")
+    if not source.is_ready():
+        return []
+    frames = []
+    while not source.exhausted:
+        frame = source.get_screenshot()
+        if frame is not None:
+            frames.append(frame)
+    source.close()
+    return frames
+
+
+def tower_detections(rng):
+    """Four princess tower detections jittered around TOWER_ROIS centers."""
+    detections = []
+    for x, y, w, h in TOWER_ROIS.values():
+        detections.append({
+            'class': 'princess tower',
+            'confidence': float(rng.uniform(0.6, 0.95)),
+            'box': [x + w / 2 + rng.normal(0, 2), y + h / 2 + rng.normal(0, 2), w * 0.8, h * 0.8],
+        })
+    return detections
+
+
+class _HeadlessSettings:
+    """Settings window stand-in: grid at 20%, elixir on, towers off (no network)."""
+
+    def get_grid_opacity(self):
+        return 0.2
+
+    def is_elixir_enabled(self):
+        return True
+
+    def is_towers_enabled(self):
+        return False
+
+    def is_profiler_hud_enabled(self):
+        return False
+
+
+def build_benchmarks(frame_shape):
+    """Return {name: callable(frame)} for every benchmark."""
+    from src.vision import get_user_elixir, GridOverlay
+    from src.state_manager import PrincessTowerTracker
+    from src.tower_mosaic import TowerMosaic
+    from src.detection_planner import prepare_crop
+    from src.detection_cache import frame_hash
+    from src.inference_backends import encode_frame
+    from src.tower_pixel_detector import TowerPixelDetector
+    import main
+
+    height, width = frame_shape[:2]
+    grid = GridOverlay(width, height)
+    tracker = PrincessTowerTracker(width, height)
+    mosaic = TowerMosaic()
+    pixel_detector = TowerPixelDetector()
+    troops_plan = DETECTION_PLANS.get('troops', {})
+    systems = main.initialize_systems(width, height, _HeadlessSettings())
+    rng = np.random.default_rng(0)
+    detections = [tower_detections(rng) for _ in range(64)]
+    counter = {'i': 0}
+
+    def tracker_update(frame):
+        counter['i'] += 1
+        tracker.update(detections[counter['i'] % len(detections)])
+
+    def grid_render_layer(frame):
+        grid.invalidate()
+        grid.draw_overlay(frame)
+
+    def loop_headless(frame):
+        main.analyze_frame(systems, frame)
+        main.render_frame(systems, frame)
+
+    return {
+        'elixir.get_user_elixir': get_user_elixir,
+        'grid.draw_overlay': grid.draw_overlay,
+        'grid.render_layer': grid_render_layer,
+        'tracker.update': tracker_update,
+        'tracker.get_tower_states': lambda frame: tracker.get_tower_states(),
+        'detector.encode_towers': lambda frame: encode_frame(mosaic.build(frame)),
+        'detector.encode_troops': lambda frame: encode_frame(
+            prepare_crop(frame, troops_plan.get('roi'), troops_plan.get('max_width')).image),
+        'detector.frame_hash': frame_hash,
+        'towers.pixel_detect': pixel_detector.detect,
+        'loop.headless': loop_headless,
+    }, systems
+
+
+def time_benchmark(fn, frames, repeat, warmup=3):
+    """Run fn over frames repeat times; return latency stats in milliseconds."""
+    for frame in frames[:warmup]:
+        fn(frame)
+
+    samples = np.empty(repeat * len(frames), dtype=np.float64)
+    i = 0
+    for _ in range(repeat):
+        for frame in frames:
+            start = time.perf_counter()
+            fn(frame)
+            samples[i] = (time.perf_counter() - start) * 1000.0
+            i += 1
+
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+    return {
+        'count': int(samples.size),
+        'mean': float(samples.mean()),
+        'min': float(samples.min()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+    }
+
+
+def run(args):
+    corpus = load_corpus(args.corpus)
+    generated = list(synthetic_frames(args.synthetic, RESIZE_WIDTH, RESIZE_HEIGHT))
+    frames = corpus + generated
+    if not frames:
+        print("No frames to benchmark (empty corpus and --synthetic 0)")
+        return 1
+
+    # All benchmarks share one frame size: corpus frames are normalized to RESIZE_WIDTH
+    shape = frames[0].shape
+    frames = [f for f in frames if f.shape == shape]
+
+    benchmarks, systems = build_benchmarks(shape)
+    if args.only:
+        benchmarks = {name: fn for name, fn in benchmarks.items()
+                      if any(name.startswith(prefix) for prefix in args.only)}
+
+    results = {}
+    try:
+        for name, fn in benchmarks.items():
+            results[name] = time_benchmark(fn, frames, args.repeat)
+            stats = results[name]
+            print(f"{name:<28} p50 {stats['p50']:8.3f} ms   p95 {stats['p95']:8.3f} ms   "
+                  f"mean {stats['mean']:8.3f} ms")
+    finally:
+        systems.close()
+
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'corpus': os.path.relpath(args.corpus, ROOT) if os.path.isdir(args.corpus) else None,
+            'corpus_frames': len(corpus),
+            'synthetic_frames': len(generated),
+            'frame_shape': list(shape),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def compare(baseline_path, current_path, threshold, metric='p50'):
+    """
+    Compare two result files and flag benchmarks that got slower.
+
+    Returns:
+        Number of regressions (benchmarks whose metric grew by more than threshold)
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    with open(current_path) as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    print(f"{'benchmark':<28}{'base':>10}{'new':>10}{'change':>9}")
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"{name:<28}{'(only in ' + ('new' if name in current else 'base') + ')':>29}")
+            continue
+        base, new = baseline[name][metric], current[name][metric]
+        change = (new - base) / base if base > 0 else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:<28}{base:10.3f}{new:10.3f}{change:+9.1%}{flag}")
+
+    print(f"{regressions} regression(s) above {threshold:.0%} ({metric})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlay benchmark runner")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS,
+                        help="Directory of recorded PNG/JPG frames (see benchmarks/corpus/README.md)")
+    parser.add_argument('--synthetic', type=int, default=60,
+                        help="Number of generated frames added to the corpus")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Passes over the frame set per benchmark")
+    parser.add_argument('--only', nargs='+',
+                        help="Only run benchmarks whose name starts with one of these prefixes")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Compare two result files instead of running")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative slowdown flagged as a regression in --compare (default 0.10)")
+    parser.add_argument('--metric', default='p50', choices=['p50', 'p95', 'p99', 'mean', 'min'],
+                        help="Statistic compared in --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold, args.metric)
+        sys.exit(1 if regressions else 0)
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
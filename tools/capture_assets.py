@@ -1,3 +1,4 @@
+import argparse
 import cv2
 import os
 import time
@@ -6,17 +7,23 @@ import sys
 # Add parent dir to path to import src
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.capture import WindowCapture
-from src.config import ARENA_ROI
+from src.frame_sources import create_frame_source
+from src.config import ARENA_ROI, FRAME_SOURCE, TOWER_REFERENCE_DIR
+from src.tower_pixel_detector import TowerPixelDetector
 
 def main():
+    parser = argparse.ArgumentParser(description="Asset Capture Tool")
+    parser.add_argument('--source', default=FRAME_SOURCE,
+                        help="Frame source: window, video:<path>, images:<dir> or synthetic[:<count>]")
+    args = parser.parse_args()
+
     print("Asset Capture Tool")
     print("Press 's' to save the current Arena ROI as a template candidate.")
+    print(f"Press 't' (in a match, all towers standing) to save tower references to {TOWER_REFERENCE_DIR}.")
     print("Press 'q' to quit.")
     
-    cap = WindowCapture()
-    while not cap.hwnd:
-        cap.find_window()
+    cap = create_frame_source(args.source, realtime=True)
+    while not cap.is_ready():
         time.sleep(1)
         
     save_dir = "assets/cards_raw"
@@ -24,10 +31,13 @@ def main():
         os.makedirs(save_dir)
         
     count = 0
+    towers = TowerPixelDetector(reference_dir=None)
     
     while True:
         frame = cap.get_screenshot()
         if frame is None:
+            if cap.exhausted:
+                break
             print("Waiting for window...")
             time.sleep(1)
             continue
@@ -45,7 +55,13 @@ def main():
             cv2.imwrite(filename, roi)
             print(f"Saved {filename}")
             count += 1
+        elif key == ord('t'):
+            if towers.save_references(frame, TOWER_REFERENCE_DIR):
+                print(f"Saved LE/RE/LF/RF.png tower references to {TOWER_REFERENCE_DIR}")
+            else:
+                print("[WARNING] Frame does not look like a match with all four towers standing; nothing saved")
             
+    cap.close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import argparse
 import cv2
 import numpy as np
 import sys
@@ -7,24 +8,25 @@ import time
 # Add the project root to path so we can import src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.capture import WindowCapture
-from src.config import ELIXIR_BAR_ROI, PURPLE_LOWER, PURPLE_UPPER
-from src.vision import get_user_elixir
+from src.frame_sources import create_frame_source
+from src.config import ELIXIR_BAR_ROI, PURPLE_LOWER, PURPLE_UPPER, FRAME_SOURCE
+from src.vision import ElixirReader
 
-def debug_elixir_view():
-    cap = WindowCapture()
+def debug_elixir_view(source=FRAME_SOURCE):
+    cap = create_frame_source(source, realtime=True)
+    reader = ElixirReader()
     print("Debug Mode: ON. Press 'q' to quit.")
     
     # Wait for window
-    while not cap.hwnd:
-        cap.find_window()
-        if not cap.hwnd:
-            print("Waiting for window...")
-            time.sleep(1)
+    while not cap.is_ready():
+        print("Waiting for window...")
+        time.sleep(1)
 
     while True:
         screenshot = cap.get_screenshot()
         if screenshot is None:
+            if cap.exhausted:
+                break
             continue
 
         # 1. Visualize the ROI (Draw a rectangle on the main screen)
@@ -73,7 +75,8 @@ def debug_elixir_view():
         mask = cv2.inRange(hsv, np.array(PURPLE_LOWER), np.array(PURPLE_UPPER))
 
         # 3. Calculate Value using the ACTUAL function
-        elixir_val = get_user_elixir(screenshot)
+        reading = reader.read(screenshot)
+        elixir_val = f"{reading.count} ({reading.estimate:.2f})"
         
         # 4. Display Everything
         cv2.imshow("Main View (Green Box = ROI)", debug_frame)
@@ -89,7 +92,11 @@ def debug_elixir_view():
         if cv2.waitKey(1) == ord('q'):
             break
 
+    cap.close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    debug_elixir_view()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Elixir bar debug view")
+    parser.add_argument('--source', default=FRAME_SOURCE,
+                        help="Frame source: window, video:<path>, images:<dir> or synthetic[:<count>]")
+    debug_elixir_view(parser.parse_args().source)
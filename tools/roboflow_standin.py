@@ -0,0 +1,259 @@
+"""
+Roboflow Stand-in Server
+Local HTTP server speaking the Roboflow hosted inference protocol, for load
+testing RoboflowDetector and the tower path without the real API.
+
+Protocol: POST /{model_id}?api_key=... with a base64 JPEG body; the response is
+{"time", "image": {"width", "height"}, "predictions": [{x, y, width, height,
+confidence, class, class_id}, ...]} with boxes in request image pixels.
+
+Predictions come from (first match wins):
+    --replay   JSONL log, one {"model_id": ..., "predictions": [...]} per line,
+               served in order per model (and looped)
+    --fixture  JSON {model_id: [predictions], "*": [predictions]}
+    default    Four princess towers at the TOWER_ROIS centers (or at the mosaic
+               cell centers when the request image is a tower mosaic)
+
+Faults: --latency picks a delay per request, --error-rate answers HTTP 500,
+--timeout-rate holds the request for --hang seconds (longer than the
+detector's DETECTOR_TIMEOUT) before answering.
+
+Usage:
+    python tools/roboflow_standin.py --port 9001 --latency normal:120,30 --error-rate 0.05
+    ROBOFLOW_API_URL=http://127.0.0.1:9001 python main.py --source synthetic --profile
+
+GET /stats returns request counters as JSON.
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+# Add the project root to path so we can import src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import TOWER_ROIS
+from src.tower_mosaic import TowerMosaic
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler returning seconds.
+
+    Specs (milliseconds):
+        fixed:50            always 50 ms
+        uniform:20,200      uniform between 20 and 200 ms
+        normal:120,30       mean 120 ms, std 30 ms (clipped at 0)
+        lognormal:100,0.5   median 100 ms, log-space sigma 0.5 (long tail)
+    """
+    kind, _, params = (spec or 'fixed:0').partition(':')
+    values = [float(v) for v in params.split(',') if v] or [0.0]
+    if kind == 'fixed':
+        return lambda rng: values[0] / 1000.0
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000.0
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000.0
+    if kind == 'lognormal':
+        return lambda rng: rng.lognormvariate(np.log(values[0]), values[1]) / 1000.0
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+def _prediction(cx, cy, w, h, confidence=0.9, cls='princess tower'):
+    return {'x': cx, 'y': cy, 'width': w, 'height': h,
+            'confidence': confidence, 'class': cls, 'class_id': 0}
+
+
+class PredictionSource:
+    """Chooses the predictions returned for a request."""
+
+    def __init__(self, fixture=None, replay=None):
+        self.fixture = {}
+        if fixture:
+            with open(fixture, 'r') as f:
+                self.fixture = json.load(f)
+
+        self._replay = {}
+        if replay:
+            logs = {}
+            with open(replay, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        logs.setdefault(entry.get('model_id', '*'), []).append(entry.get('predictions', []))
+            self._replay = {model_id: itertools.cycle(entries) for model_id, entries in logs.items()}
+        self._lock = threading.Lock()
+
+        self.mosaic = TowerMosaic()
+
+    def default_predictions(self, width, height):
+        """Four princess towers, placed for a tower mosaic or a full frame."""
+        if (width, height) == (self.mosaic.width, self.mosaic.height):
+            return [_prediction(c.mosaic_x + c.width / 2, c.mosaic_y + c.height / 2,
+                                c.width * 0.8, c.height * 0.8)
+                    for c in self.mosaic.cells]
+        return [_prediction(x + w / 2, y + h / 2, w * 0.8, h * 0.8)
+                for x, y, w, h in TOWER_ROIS.values()]
+
+    def predictions_for(self, model_id, width, height):
+        with self._lock:
+            replay = self._replay.get(model_id) or self._replay.get('*')
+            if replay is not None:
+                return next(replay)
+        if model_id in self.fixture:
+            return self.fixture[model_id]
+        if '*' in self.fixture:
+            return self.fixture['*']
+        return self.default_predictions(width, height)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the fault settings and counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, predictions, latency='fixed:0', error_rate=0.0,
+                 timeout_rate=0.0, hang=10.0, api_key=None, seed=None):
+        super().__init__(address, StandinHandler)
+        self.predictions = predictions
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.api_key = api_key
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'timeouts': 0, 'bad_requests': 0, 'unauthorized': 0}
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def draw(self):
+        """Sample (latency seconds, fault) for one request."""
+        with self.rng_lock:
+            latency = self.sample_latency(self.rng)
+            roll = self.rng.random()
+        if roll < self.timeout_rate:
+            return self.hang, 'timeout'
+        if roll < self.timeout_rate + self.error_rate:
+            return latency, 'error'
+        return latency, None
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the hosted API
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/stats':
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {'message': 'Not found'})
+
+    def do_POST(self):
+        server = self.server
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        model_id = url.path.strip('/')
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server.count('requests')
+
+        if server.api_key and parse_qs(url.query).get('api_key', [None])[0] != server.api_key:
+            server.count('unauthorized')
+            self._send_json(401, {'message': 'Unauthorized api_key'})
+            return
+
+        try:
+            data = np.frombuffer(base64.b64decode(body), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        except Exception:
+            image = None
+        if image is None:
+            server.count('bad_requests')
+            self._send_json(400, {'message': 'Could not decode image'})
+            return
+
+        latency, fault = server.draw()
+        if fault == 'timeout':
+            server.count('timeouts')
+        time.sleep(latency)
+        if fault == 'error':
+            server.count('errors')
+            self._send_json(500, {'message': 'Injected error'})
+            return
+
+        height, width = image.shape[:2]
+        predictions = server.predictions.predictions_for(model_id, width, height)
+        if fault is None:
+            server.count('ok')
+        try:
+            self._send_json(200, {
+                'time': time.perf_counter() - start,
+                'image': {'width': width, 'height': height},
+                'predictions': predictions,
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timeout fault)
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Roboflow-compatible stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--fixture', help="JSON file of model_id -> predictions ('*' = any model)")
+    parser.add_argument('--replay', help="JSONL log of {model_id, predictions} served in order")
+    parser.add_argument('--latency', default='fixed:0',
+                        help="fixed:MS, uniform:MIN,MAX, normal:MEAN,STD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="Fraction of requests held for --hang seconds")
+    parser.add_argument('--hang', type=float, default=10.0, help="Seconds a 'timed out' request is held")
+    parser.add_argument('--api-key', help="Reject requests with a different api_key (default: accept any)")
+    parser.add_argument('--seed', type=int, help="Random seed for latency and fault sampling")
+    args = parser.parse_args()
+
+    server = StandinServer(
+        (args.host, args.port),
+        PredictionSource(args.fixture, args.replay),
+        latency=args.latency, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+        hang=args.hang, api_key=args.api_key, seed=args.seed
+    )
+    print(f"Roboflow stand-in listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency}, errors {args.error_rate:.0%}, timeouts {args.timeout_rate:.0%})")
+    print(f"Use: ROBOFLOW_API_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stats: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()